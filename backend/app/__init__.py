@@ -4,12 +4,12 @@ from dotenv import load_dotenv
 from flask_cors import CORS
 from .config import Config
 from .extensions import flask_session_ext, neo4j_driver
+from . import database
+from .commands import register_commands
 from .auth.routes import auth_bp
 from .aml.routes import aml_bp
 from app.api.routes import api_bp
 from app.users.routes import users_bp
-from apscheduler.schedulers.background import BackgroundScheduler
-from .services.scheduler import run_all_detectors
 
 def create_app():
     load_dotenv()
@@ -29,14 +29,23 @@ def create_app():
     # Initialize extensions
     flask_session_ext.init_app(app)
     neo4j_driver.init_app(app)
+    database.init_app(app)
 
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(aml_bp)
     app.register_blueprint(api_bp)
     app.register_blueprint(users_bp)
-    return app
 
-# scheduler = BackgroundScheduler(timezone='Asia/Jakarta')
-# scheduler.add_job(run_all_detectors, 'cron', minute=0)  # tiap jam
-# scheduler.start()
\ No newline at end of file
+    register_commands(app)
+
+    # Muat model di proses master agar worker hasil fork berbagi memori (gunicorn --preload)
+    if os.getenv("MODEL_PRELOAD", "false").lower() in ("1", "true", "yes"):
+        from .services.model_registry import preload
+        preload()
+
+    # Sapuan detektor tiap jam; aman di semua worker karena dikunci advisory lock
+    if os.getenv("DETECTOR_SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes"):
+        from .services.scheduler import start_background_scheduler
+        start_background_scheduler()
+    return app
\ No newline at end of file
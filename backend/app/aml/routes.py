@@ -1,6 +1,3 @@
-import os
-import joblib
-import requests
 from flask import Blueprint, render_template, request, flash, redirect, url_for, session, abort
 from ..database import get_db_connection
 from ..services.transaction_service import (
@@ -12,31 +9,24 @@ from ..services.transaction_service import (
     get_hourly_transaction_count,
     get_transactions_from_neo4j,
     get_color,
-    get_transitive_risk_graph
+    get_transitive_risk_graph,
+    get_transactions_page,
+    get_anomaly_page,
+    estimate_transaction_count,
 )
 from ..services.kyc_service import (
-    get_wallet_summary,
     check_wallet_in_history,
-    get_top_transactions,
-    get_top_receivers,
-    get_top_senders,
     is_wallet_blacklisted, 
 )
-from ..services.neo4j_sync import migrate_transactions, label_blacklisted_wallets
-from ..services.risk_analysis import calculate_wallet_risk
+from ..services.wallet_aggregate import get_wallet_aggregate
+from ..services.address_search import resolve_address_query, MIN_SUBSTRING_LEN
+from ..services.job_service import enqueue_job
+from ..services.wallet_service import fetch_and_analyze_wallet
 from flask import (
     Blueprint, render_template, request,
     flash, redirect, url_for, current_app
 )
 
-# Load model & scaler sekali saat import
-BASE_DIR      = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-MODEL_DIR     = os.path.join(BASE_DIR, 'models')
-IF_MODEL_PATH = os.path.join(MODEL_DIR, 'isolation_forest_best_model.pkl')
-SCALER_PATH   = os.path.join(MODEL_DIR, 'scaler_if.pkl')
-if_model  = joblib.load(IF_MODEL_PATH)
-if_scaler = joblib.load(SCALER_PATH)
-
 aml_bp = Blueprint('aml', __name__, template_folder='../templates/aml')
 
 @aml_bp.route('/')
@@ -58,10 +48,8 @@ def dashboard():
 
 @aml_bp.route('/sync', methods=['POST'])
 def sync():
-    migrate_transactions()
-    label_blacklisted_wallets()
-    calculate_wallet_risk()
-    flash("✅ Sinkronisasi database berhasil!", "success")
+    job_id = enqueue_job('sync_neo4j', created_by=session.get('username'))
+    flash(f"⏳ Sinkronisasi database berjalan di latar belakang (job {job_id}).", "info")
     return redirect(url_for('aml.dashboard'))
 
 @aml_bp.route('/wallet', methods=['GET', 'POST'])
@@ -85,63 +73,46 @@ def transaction_analysis():
     wallet = request.args.get('wallet', '').strip().lower()
     sort_by = request.args.get('sort_by', 'timestamp')
     order = request.args.get('order', 'desc')
-    page = int(request.args.get('page', 1))
+    cursor = request.args.get('cursor')
+    direction = request.args.get('dir', 'next')
+    anomaly_cursor = request.args.get('a_cursor')
+    anomaly_direction = request.args.get('a_dir', 'next')
     per_page = 10
 
     valid_columns = ['value', 'timestamp']
     if sort_by not in valid_columns:
         sort_by = 'timestamp'
-
-    order_query = "ASC" if order == "asc" else "DESC"
+    if order != 'asc':
+        order = 'desc'
+
+    # Teks pencarian → alamat konkret (exact / prefix / substring ber-index)
+    match = resolve_address_query(wallet)
+    addresses = match.addresses if wallet else None
+    if match.strategy == 'too_short':
+        flash(f"Potongan alamat terlalu pendek; masukkan minimal {MIN_SUBSTRING_LEN} karakter atau awalan 0x.",
+              "warning")
+    elif match.truncated:
+        flash(f"Pencarian cocok dengan lebih dari {len(match.addresses)} alamat; "
+              "hanya sebagian yang ditampilkan, perjelas pencarian.", "warning")
+
+    # Keyset pagination: biaya halaman tidak bergantung pada seberapa jauh halamannya
+    tx_page = get_transactions_page(addresses, sort_by, order,
+                                    cursor, direction, per_page)
+    transactions = [row[1:] for row in tx_page['rows']]
+
+    anomaly_page = get_anomaly_page(addresses, anomaly_cursor,
+                                    anomaly_direction, per_page)
+    anomaly_transactions = [row[1:] for row in anomaly_page['rows']]
+
+    # Total hanya perkiraan (statistik planner / wallet_stats / hitungan ter-cache)
+    total_rows = estimate_transaction_count(addresses)
 
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # Query transaksi dengan filter pencarian dan pagination
-    offset = (page - 1) * per_page
-    sql_query = f"""
-        SELECT sender, receiver, value, timestamp
-        FROM transactions
-        {" WHERE sender ILIKE %s OR receiver ILIKE %s" if wallet else ""}
-        ORDER BY {sort_by} {order_query}
-        LIMIT %s OFFSET %s
-    """
-    params = (f"%{wallet}%", f"%{wallet}%", per_page, offset) if wallet else (per_page, offset)
-
-    cur.execute(sql_query, params)
-    transactions = cur.fetchall()
-    
-    # Query untuk transaksi anomaly
-    anomaly_query = """
-        SELECT sender, receiver, value, timestamp
-        FROM transactions
-        WHERE is_anomaly = TRUE
-    """
-    # Jika ada wallet, tambahkan kondisi pencarian
-    if wallet:
-        anomaly_query += " AND (sender ILIKE %s OR receiver ILIKE %s)"
-
-    anomaly_query += " ORDER BY timestamp ASC"
-    
-    # Tentukan parameter pencarian untuk anomaly
-    anomaly_params = (f"%{wallet}%", f"%{wallet}%",) if wallet else ()
-    
-    cur.execute(anomaly_query, anomaly_params)
-    anomaly_transactions = cur.fetchall()
-    
-    # Hitung total halaman secara lebih optimal
-    if wallet:
-        cur.execute("SELECT COUNT(*) FROM transactions WHERE sender ILIKE %s OR receiver ILIKE %s",
-                    (f"%{wallet}%", f"%{wallet}%"))
-    else:
-        cur.execute("SELECT COUNT(*) FROM transactions")
-    
-    total_rows = cur.fetchone()[0]
-    total_pages = (total_rows // per_page) + (1 if total_rows % per_page > 0 else 0)
-
     # Ambil data untuk grafik (hanya jika wallet adalah alamat wallet yang spesifik)
     timestamps, values, point_colors = [], [], []
-    if wallet and not ('%' in wallet or '_' in wallet):  # Pastikan ini alamat wallet, bukan wildcard search
+    if match.strategy == 'exact':  # Pastikan ini alamat wallet lengkap, bukan potongan
         cur.execute("""
             SELECT timestamp, value, is_anomaly
             FROM transactions 
@@ -163,8 +134,11 @@ def transaction_analysis():
                            wallet=wallet,
                            sort_by=sort_by,
                            order=order,
-                           page=page,
-                           total_pages=total_pages,
+                           total_rows=total_rows,
+                           next_cursor=tx_page['next_cursor'],
+                           prev_cursor=tx_page['prev_cursor'],
+                           anomaly_next_cursor=anomaly_page['next_cursor'],
+                           anomaly_prev_cursor=anomaly_page['prev_cursor'],
                            timestamps=timestamps,
                            values=values,
                            point_colors=point_colors,
@@ -220,10 +194,11 @@ def kyc():
                 cur.close()
                 conn.close()
 
-            wallet_summary = get_wallet_summary(wallet)
-            top_transactions = get_top_transactions(wallet)
-            top_receivers = get_top_receivers(wallet)
-            top_senders = get_top_senders(wallet)
+            aggregate = get_wallet_aggregate(wallet)
+            wallet_summary = aggregate.as_summary()
+            top_transactions = aggregate.top_transactions
+            top_receivers = aggregate.top_receivers
+            top_senders = aggregate.top_senders
             risky_interactions = get_risky_interactions(wallet)
             recurring_pattern = detect_recurring_transactions_raw(wallet)
             blacklist_interactions = get_blacklist_interactions(wallet)
@@ -270,62 +245,8 @@ def update_all_wallets():
         flash("🔑 Etherscan API key is not set in config!", "danger")
         return redirect(url_for('aml.wallet'))
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute("SELECT address FROM wallet_history")
-    wallets = cur.fetchall()
-
-    success_count = 0
-    fail_count = 0
-
-    for (wallet_address,) in wallets:
-        try:
-            url = (
-                "https://api.etherscan.io/api"
-                f"?module=account&action=txlist"
-                f"&address={wallet_address}"
-                f"&sort=asc&apikey={key}"
-            )
-            response = requests.get(url).json()
-
-            if response.get("status") != "1" or "result" not in response:
-                fail_count += 1
-                continue
-
-            transactions = response["result"]
-
-            for tx in transactions:
-                tx_hash = tx["hash"]
-                sender = tx["from"]
-                receiver = tx["to"]
-                value = int(tx["value"]) / 1e18
-                timestamp = tx["timeStamp"]
-
-                cur.execute("""
-                    INSERT INTO transactions (tx_hash, sender, receiver, value, timestamp)
-                    VALUES (%s, %s, %s, %s, TO_TIMESTAMP(%s))
-                    ON CONFLICT (tx_hash) DO NOTHING
-                """, (tx_hash, sender, receiver, value, timestamp))
-
-            # update queried_at
-            cur.execute("""
-                UPDATE wallet_history
-                SET queried_at = NOW()
-                WHERE address = %s
-            """, (wallet_address,))
-            conn.commit()
-            success_count += 1
-
-        except Exception as e:
-            print(f"Error saat update {wallet_address}: {e}")
-            fail_count += 1
-            conn.rollback()
-
-    cur.close()
-    conn.close()
-
-    flash(f"🔄 Selesai update {success_count} wallet. Gagal: {fail_count}", "info")
+    job_id = enqueue_job('refresh_wallets', created_by=session.get('username'))
+    flash(f"🔄 Update semua wallet berjalan di latar belakang (job {job_id}).", "info")
     return redirect(url_for('aml.wallet'))
 
 @aml_bp.route('/transaction_graph', methods=['GET'])
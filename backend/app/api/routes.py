@@ -1,8 +1,11 @@
 import json
-from flask import Blueprint, request, abort, make_response
+import os
+import uuid
+from flask import Blueprint, request, abort, make_response, session
 from flask_restx import Api, Resource, Namespace, fields
 from .users import api as ns_users
 from .auth import api as ns_auth
+from ..utils import roles_required
 
 from ..services.transaction_service import (
     get_high_risk_address_count,
@@ -10,7 +13,11 @@ from ..services.transaction_service import (
     get_anomaly_cases,
     get_transaction_details,
     get_first_large_tx_api,
+    get_transactions_page,
+    get_anomaly_page,
+    estimate_transaction_count,
 )
+from ..services.address_search import resolve_address_query
 from ..services.risk_analysis import (
     get_risk_distribution,
     get_wallet_risk_cases,
@@ -26,6 +33,22 @@ from ..services.search_service import (
     save_search_query,
     get_recent_searches
 )
+from ..services.job_service import (
+    enqueue_job,
+    get_job,
+    list_jobs,
+    JOB_HANDLERS,
+    load_job_handlers,
+)
+from ..services.model_registry import (
+    list_models,
+    reload_model,
+    MODEL_ARTIFACTS,
+    MODEL_RELOAD_CHECK_INTERVAL,
+)
+from ..services.inference import inference_metrics, restart_inference_service
+from ..services.scheduler import list_detector_runs
+from ..services.detector_metrics import list_detector_metrics, profile_detector
 from ..services.darkweb_service import (
     search_ahmia,
     search_dread,
@@ -58,6 +81,9 @@ ns_tx = Namespace('transactions', description='Transaction endpoints')
 ns_wallets = Namespace('wallets', description='Wallet endpoints')
 ns_search = Namespace('search', description='Search history endpoints')
 ns_darkweb = Namespace('darkweb', description='Dark Web search endpoints')
+ns_jobs = Namespace('jobs', description='Background job endpoints')
+ns_models = Namespace('models', description='ML model registry endpoints')
+ns_detectors = Namespace('detectors', description='Detector run & profiling endpoints')
 
 # Models for documentation
 risk_count_model = api.model('HighRiskCount', {
@@ -115,6 +141,67 @@ class AMLWalletRisk(Resource):
         return get_wallet_risk_cases(limit)
 
 # Transaction endpoints
+def _page_json(page, per_page):
+    return {
+        'items': [
+            {
+                'tx_hash': tx_hash,
+                'sender': sender,
+                'receiver': receiver,
+                'amount': float(value),
+                'timestamp': int(ts.timestamp())
+            }
+            for tx_hash, sender, receiver, value, ts in page['rows']
+        ],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'limit': per_page
+    }
+
+@ns_tx.route('')
+class TransactionList(Resource):
+    @ns_tx.param('wallet', 'Filter alamat (sender/receiver)')
+    @ns_tx.param('sort_by', 'timestamp | value')
+    @ns_tx.param('order', 'asc | desc')
+    @ns_tx.param('cursor', 'Cursor dari respons sebelumnya')
+    @ns_tx.param('dir', 'next | prev')
+    @ns_tx.param('limit', 'Jumlah baris per halaman (maks 100)')
+    def get(self):
+        """List transactions with cursor (keyset) pagination"""
+        wallet = request.args.get('wallet', '').strip()
+        addresses = resolve_address_query(wallet).addresses if wallet else None
+        per_page = max(1, min(request.args.get('limit', default=10, type=int), 100))
+        page = get_transactions_page(
+            addresses,
+            request.args.get('sort_by', 'timestamp'),
+            request.args.get('order', 'desc'),
+            request.args.get('cursor'),
+            request.args.get('dir', 'next'),
+            per_page
+        )
+        data = _page_json(page, per_page)
+        data['estimated_total'] = estimate_transaction_count(addresses)
+        return data
+
+@ns_tx.route('/anomalies')
+class AnomalyTransactionList(Resource):
+    @ns_tx.param('wallet', 'Filter alamat (sender/receiver)')
+    @ns_tx.param('cursor', 'Cursor dari respons sebelumnya')
+    @ns_tx.param('dir', 'next | prev')
+    @ns_tx.param('limit', 'Jumlah baris per halaman (maks 100)')
+    def get(self):
+        """List anomaly transactions with cursor (keyset) pagination"""
+        wallet = request.args.get('wallet', '').strip()
+        addresses = resolve_address_query(wallet).addresses if wallet else None
+        per_page = max(1, min(request.args.get('limit', default=10, type=int), 100))
+        page = get_anomaly_page(
+            addresses,
+            request.args.get('cursor'),
+            request.args.get('dir', 'next'),
+            per_page
+        )
+        return _page_json(page, per_page)
+
 @ns_tx.route('/<string:tx_hash>')
 @ns_tx.param('tx_hash', 'Transaction hash')
 class TransactionDetail(Resource):
@@ -194,6 +281,18 @@ class UnifiedSearch(Resource):
             return {'type': 'wallet', 'data': summary}
         abort(404, 'No transaction or wallet found')
 
+@ns_search.route('/addresses')
+class AddressSearch(Resource):
+    @ns_search.param('q', 'Alamat lengkap, awalan 0x…, atau potongan alamat')
+    def get(self):
+        """Resolve a wallet search text to known addresses"""
+        q = request.args.get('q', '').strip()
+        if not q:
+            abort(400, 'Query "q" is required')
+        match = resolve_address_query(q)
+        return {'strategy': match.strategy, 'addresses': match.addresses,
+                'truncated': match.truncated}
+
 @ns_search.route('/recent')
 class RecentSearches(Resource):
     @ns_search.marshal_with(search_list_model)
@@ -235,6 +334,127 @@ class DarkwebStoredBySource(Resource):
         """Get stored Dark Web results filtered by source"""
         return get_darkweb_results(address, source)
 
+# Background job endpoints
+job_create_model = api.model('JobCreate', {
+    'kind': fields.String(required=True, description='Jenis job, mis. refresh_wallets, score_anomalies, rescore_anomalies'),
+    'params': fields.Raw(description='Parameter handler job (opsional)')
+})
+
+@ns_jobs.route('')
+class JobList(Resource):
+    @ns_jobs.param('status', 'queued | running | succeeded | failed')
+    @ns_jobs.param('kind', 'Jenis job')
+    @ns_jobs.param('limit', 'Jumlah job (default 20, max 100)')
+    def get(self):
+        """List recent background jobs"""
+        limit = min(request.args.get('limit', default=20, type=int), 100)
+        return list_jobs(limit=limit,
+                         status=request.args.get('status') or None,
+                         kind=request.args.get('kind') or None)
+
+    @ns_jobs.expect(job_create_model)
+    @roles_required('admin')
+    def post(self):
+        """Enqueue a background job (admin only)"""
+        body = request.get_json(silent=True) or {}
+        kind = body.get('kind')
+        load_job_handlers()
+        if kind not in JOB_HANDLERS:
+            abort(400, f'Unknown job kind; expected one of: {", ".join(sorted(JOB_HANDLERS))}')
+        params = body.get('params') or {}
+        if not isinstance(params, dict):
+            abort(400, '"params" must be an object')
+        job_id = enqueue_job(kind, params, created_by=session.get('username'))
+        return get_job(job_id), 202
+
+@ns_jobs.route('/<string:job_id>')
+@ns_jobs.param('job_id', 'Job id (UUID)')
+class JobDetail(Resource):
+    def get(self, job_id):
+        """Get status, progress and result of a background job"""
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            abort(404, 'Job not found')
+        job = get_job(job_id)
+        if not job:
+            abort(404, 'Job not found')
+        return job
+
+# Model registry endpoints
+@ns_models.route('')
+class ModelList(Resource):
+    def get(self):
+        """List ML artifacts with version and load time (for this worker process)"""
+        return list_models()
+
+@ns_models.route('/reload')
+class ModelReload(Resource):
+    @ns_models.param('name', 'Nama model (kosong = semua)')
+    @ns_models.param('force', 'Muat ulang walaupun versi file sama')
+    @roles_required('admin')
+    def post(self):
+        """
+        Hot-reload model artifacts from disk in this worker process only (admin only).
+        Other gunicorn workers are not notified: they pick up changed files through the
+        mtime check within MODEL_RELOAD_CHECK_INTERVAL seconds (never when it is 0),
+        and `force` has no effect on them.
+        """
+        name = request.args.get('name') or None
+        if name and name not in MODEL_ARTIFACTS:
+            abort(404, 'Model not found')
+        force = request.args.get('force', 'false').lower() == 'true'
+        try:
+            reloaded = reload_model(name, force=force)
+        except OSError as e:
+            abort(500, f'Gagal memuat model: {e}')
+        # Worker inferensi memuat model sendiri: pool diganti agar ikut memakai model baru
+        workers_restarted = restart_inference_service() if (reloaded or force) else False
+        return {'reloaded': reloaded, 'inference_workers_restarted': workers_restarted,
+                'pid': os.getpid(), 'other_workers_check_interval': MODEL_RELOAD_CHECK_INTERVAL}
+
+@ns_models.route('/inference')
+class InferenceMetrics(Resource):
+    def get(self):
+        """Inference service metrics: queue depth, in-flight requests, batch sizes, latency"""
+        return inference_metrics()
+
+# Detector instrumentation endpoints
+@ns_detectors.route('/runs')
+class DetectorRuns(Resource):
+    @ns_detectors.param('limit', 'Jumlah run (default 20, max 100)')
+    def get(self):
+        """List recent scheduled detector runs with per-shard timing and failures"""
+        limit = min(request.args.get('limit', default=20, type=int), 100)
+        return list_detector_runs(limit=limit)
+
+@ns_detectors.route('/metrics')
+class DetectorMetricsList(Resource):
+    @ns_detectors.param('runs', 'Jumlah run terakhir (default 10, max 100)')
+    @ns_detectors.param('detector', 'Nama detektor (kosong = semua)')
+    def get(self):
+        """Per-detector wall time, DB time, query count, rows read and alerts per run"""
+        runs = min(request.args.get('runs', default=10, type=int), 100)
+        return list_detector_metrics(runs=runs, detector=request.args.get('detector') or None)
+
+@ns_detectors.route('/profile')
+class DetectorProfile(Resource):
+    @ns_detectors.param('detector', 'Nama detektor', required=True)
+    @ns_detectors.param('wallet', 'Alamat wallet', required=True)
+    @ns_detectors.param('limit', 'Jumlah baris pstats (default 30)')
+    @roles_required('admin')
+    def get(self):
+        """Run one detector for one wallet under cProfile (admin only)"""
+        detector = request.args.get('detector', '')
+        wallet = request.args.get('wallet', '').strip()
+        if not wallet:
+            abort(400, 'Query "wallet" is required')
+        limit = min(request.args.get('limit', default=30, type=int), 200)
+        try:
+            return profile_detector(detector, wallet, limit=limit)
+        except KeyError:
+            abort(404, 'Detector not found')
+
 # Register namespaces
 api.add_namespace(ns_anomalies)
 api.add_namespace(ns_risk)
@@ -243,5 +463,8 @@ api.add_namespace(ns_tx)
 api.add_namespace(ns_wallets)
 api.add_namespace(ns_search)
 api.add_namespace(ns_darkweb)
+api.add_namespace(ns_jobs)
+api.add_namespace(ns_models)
+api.add_namespace(ns_detectors)
 api.add_namespace(ns_users)
 api.add_namespace(ns_auth)
\ No newline at end of file
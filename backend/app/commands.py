@@ -0,0 +1,243 @@
+# app/commands.py
+
+import time
+
+import click
+
+from . import migrate
+from .services.wallet_stats import rebuild_wallet_stats
+from .services import job_service
+
+
+def register_commands(app):
+    """Daftarkan perintah `flask ...` untuk operasi pemeliharaan."""
+
+    @app.cli.command('db-upgrade')
+    @click.option('--to', 'target', type=int, default=None, help='Berhenti di versi ini.')
+    def db_upgrade_command(target):
+        """Terapkan migrasi skema yang belum dijalankan."""
+        applied = migrate.upgrade(target=target, echo=click.echo)
+        if applied:
+            click.echo(f"✅ {len(applied)} migrasi diterapkan.")
+        else:
+            click.echo("Skema sudah versi terbaru.")
+
+    @app.cli.command('db-status')
+    def db_status_command():
+        """Tampilkan status setiap migrasi."""
+        for version, name, applied in migrate.status():
+            mark = '✅' if applied else '⏳'
+            click.echo(f"{mark} {version:04d}_{name}")
+
+    @app.cli.command('db-explain-check')
+    @click.option('--seed-rows', type=int, default=100000, show_default=True,
+                  help='Jumlah transaksi sintetis (di-rollback setelah cek); 0 = pakai data yang ada.')
+    def db_explain_check_command(seed_rows):
+        """Pastikan query service memakai index scan (EXPLAIN)."""
+        failures = migrate.explain_check(seed_rows=seed_rows, echo=click.echo)
+        if failures:
+            raise click.ClickException(f"{len(failures)} query masih memakai Seq Scan.")
+
+    @app.cli.command('rebuild-wallet-stats')
+    def rebuild_wallet_stats_command():
+        """Backfill ulang wallet_stats dari seluruh tabel transactions."""
+        count = rebuild_wallet_stats()
+        click.echo(f"✅ wallet_stats dibangun ulang untuk {count} alamat.")
+
+    @app.cli.command('jobs-worker')
+    @click.option('--once', is_flag=True, help='Berhenti saat antrian kosong.')
+    @click.option('--poll-interval', type=float, default=job_service.JOB_POLL_INTERVAL, show_default=True)
+    def jobs_worker_command(once, poll_interval):
+        """Jalankan job latar belakang yang diantrikan (dipakai saat JOB_EXECUTION=worker)."""
+        click.echo("Worker job berjalan. Ctrl+C untuk berhenti.")
+        job_service.run_worker(poll_interval=poll_interval, once=once)
+
+    @app.cli.command('score-anomalies')
+    @click.option('--all', 'rescore_all', is_flag=True,
+                  help='Nilai ulang semua transaksi (mis. setelah model diganti).')
+    @click.option('--chunk-rows', type=int, default=None, help='Baris per panggilan predict.')
+    def score_anomalies_command(rescore_all, chunk_rows):
+        """Beri skor anomaly secara batch untuk transaksi yang belum dinilai."""
+        from .services.batch_scoring import score_transactions, SCORE_CHUNK_ROWS
+
+        stats = score_transactions(rescore_all=rescore_all,
+                                   chunk_rows=chunk_rows or SCORE_CHUNK_ROWS, echo=click.echo)
+        click.echo(f"✅ {stats['scored']} transaksi dari {stats['wallets']} wallet dinilai "
+                   f"({stats['anomalies']} anomaly, {stats['predict_calls']} panggilan predict, "
+                   f"{stats['elapsed']}s).")
+
+    @app.cli.command('rescore')
+    @click.argument('target', type=click.Choice(['anomalies', 'blacklist', 'status']))
+    @click.option('--chunk', type=int, default=None,
+                  help='Baris transaksi (anomalies) atau wallet (blacklist) per potongan.')
+    @click.option('--restart', is_flag=True, help='Abaikan checkpoint dan mulai dari awal.')
+    @click.option('--sleep', type=float, default=0.0, show_default=True,
+                  help='Jeda antar potongan (detik) untuk meringankan beban database.')
+    @click.option('--max-chunks', type=int, default=None, help='Berhenti setelah N potongan.')
+    def rescore_command(target, chunk, restart, sleep, max_chunks):
+        """Backfill skor dengan versi model aktif; bisa dihentikan dan dilanjutkan."""
+        from .services import rescoring
+
+        if target == 'status':
+            for cp in rescoring.checkpoint_status():
+                state = 'selesai' if cp['finished_at'] else 'berjalan/terhenti'
+                click.echo(f"{cp['name']}: model {cp['model_version']}, {cp['rows_processed']} dibaca, "
+                           f"{cp['rows_updated']} dinilai, posisi {cp['last_key']} ({state})")
+            return
+        if target == 'anomalies':
+            stats = rescoring.rescore_anomalies(chunk_rows=chunk or rescoring.RESCORE_CHUNK_ROWS,
+                                                restart=restart, sleep=sleep,
+                                                max_chunks=max_chunks, echo=click.echo)
+        else:
+            stats = rescoring.rescore_blacklist(chunk_wallets=chunk or rescoring.RESCORE_WALLET_CHUNK,
+                                                restart=restart, sleep=sleep,
+                                                max_chunks=max_chunks, echo=click.echo)
+        click.echo(f"✅ {stats}")
+
+    @app.cli.command('profile-features')
+    @click.argument('wallet')
+    @click.option('--chunk-rows', type=int, default=None, help='Baris per potongan server-side cursor.')
+    @click.option('--compare', is_flag=True, help='Bandingkan dengan mode in-memory (pd.read_sql).')
+    def profile_features_command(wallet, chunk_rows, compare):
+        """Ukur puncak memori ekstraksi fitur chunked untuk satu wallet."""
+        import tracemalloc
+        from .services.chunked_features import profile_chunked_extraction, FEATURE_CHUNK_ROWS
+
+        report = profile_chunked_extraction(wallet.lower(), chunk_rows or FEATURE_CHUNK_ROWS)
+        click.echo(f"chunked: {report['rows']} baris, {report['chunks']} potongan, "
+                   f"{report['seconds']}s, puncak {report['peak_mb']} MB")
+        if compare:
+            from .services.wallet_service import fetch_transactions_df, prepare_features
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                prepare_features(fetch_transactions_df(wallet.lower()))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            click.echo(f"in-memory: {time.perf_counter() - started:.3f}s, puncak {peak / 2 ** 20:.2f} MB")
+
+    @app.cli.command('bench-refresh')
+    @click.option('--wallets', 'wallet_count', type=int, default=100, show_default=True)
+    @click.option('--workers', type=int, default=8, show_default=True)
+    @click.option('--rate', type=float, default=5, show_default=True,
+                  help='Batas panggilan/detik di sisi klien (tier API key).')
+    @click.option('--server-rate', type=int, default=5, show_default=True,
+                  help='Batas panggilan/detik server palsu (0 = tanpa batas).')
+    @click.option('--latency', type=float, default=0.05, show_default=True,
+                  help='Latensi simulasi server palsu (detik).')
+    @click.option('--sequential', is_flag=True, help='Bandingkan dengan 1 worker tanpa rate limit klien.')
+    def bench_refresh_command(wallet_count, workers, rate, server_rate, latency, sequential):
+        """Benchmark fase jaringan refresh engine terhadap server Etherscan palsu."""
+        from .devtools.fake_etherscan import FakeEtherscanServer
+        from .services.refresh_engine import fetch_many
+
+        server = FakeEtherscanServer(latency=latency, rate=server_rate)
+        server.start_background()
+        wallets = [f"0x{i:040x}" for i in range(1, wallet_count + 1)]
+        runs = [("paralel", workers, rate)]
+        if sequential:
+            runs.insert(0, ("sekuensial", 1, 1e9))
+        try:
+            for label, run_workers, run_rate in runs:
+                before = dict(server.stats)
+                started = time.monotonic()
+                results = fetch_many(wallets, api_key='bench', workers=run_workers,
+                                     rate_limit=run_rate, api_url=server.url)
+                elapsed = time.monotonic() - started
+                failed = sum(1 for r in results.values() if isinstance(r, Exception))
+                tx_total = sum(r for r in results.values() if not isinstance(r, Exception))
+                click.echo(
+                    f"{label}: {wallet_count} wallet, {tx_total} tx dalam {elapsed:.2f}s "
+                    f"({wallet_count / elapsed:.1f} wallet/s), gagal {failed}, "
+                    f"request {server.stats['requests'] - before['requests']}, "
+                    f"kena rate limit {server.stats['rate_limited'] - before['rate_limited']}"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @app.cli.command('bench-features')
+    @click.option('--sizes', default='1000,100000,1000000', show_default=True,
+                  help='Jumlah baris, dipisah koma.')
+    @click.option('--legacy-max-rows', type=int, default=1000000, show_default=True,
+                  help='Implementasi lama (df.apply) hanya diukur sampai ukuran ini.')
+    @click.option('--repeat', type=int, default=3, show_default=True)
+    def bench_features_command(sizes, legacy_max_rows, repeat):
+        """Cek parity & benchmark pipeline fitur vektor vs implementasi lama."""
+        from .devtools.bench_features import run
+
+        run(sizes=[int(s) for s in sizes.split(',') if s.strip()],
+            legacy_max_rows=legacy_max_rows, repeat=repeat, echo=click.echo)
+
+    @app.cli.command('run-detectors')
+    @click.option('--full', is_flag=True, help='Abaikan watermark dan pindai ulang seluruh riwayat.')
+    @click.option('--shards', type=int, default=None, help='Jumlah shard hash wallet.')
+    @click.option('--workers', type=int, default=None, help='Proses paralel (0 = berurutan).')
+    def run_detectors_command(full, shards, workers):
+        """Jalankan sapuan detektor sekali (incremental, sharded, satu run per cluster)."""
+        from .services.scheduler import run_scheduled_detectors, DETECTOR_SHARDS, DETECTOR_WORKERS
+
+        run = run_scheduled_detectors(full=full,
+                                      shards=DETECTOR_SHARDS if shards is None else shards,
+                                      workers=DETECTOR_WORKERS if workers is None else workers)
+        if run is None:
+            raise click.ClickException("Sapuan detektor lain sedang berjalan (advisory lock dipegang).")
+        for shard in run["shards"]:
+            mark = '✅' if shard["status"] == 'done' else '❌'
+            elapsed = '-' if shard["elapsed"] is None else f"{shard['elapsed']:.1f}s"
+            click.echo(f"{mark} shard {shard['shard']}: {shard['wallets']} wallet, "
+                       f"{shard['inserted']} alert baru, {shard['duplicates']} duplikat, {elapsed}")
+            if shard["error"]:
+                click.echo(shard["error"])
+        click.echo(f"Run #{run['run_id']} {run['status']} dalam {run['elapsed']:.1f}s")
+
+    @app.cli.command('profile-detector')
+    @click.argument('detector')
+    @click.argument('wallet')
+    @click.option('--limit', type=int, default=30, show_default=True, help='Baris pstats.')
+    @click.option('--output', type=click.Path(dir_okay=False), default=None,
+                  help='Simpan data cProfile mentah (.prof).')
+    def profile_detector_command(detector, wallet, limit, output):
+        """Jalankan satu detektor untuk satu wallet di bawah cProfile."""
+        from .services.detector_metrics import profile_detector
+
+        try:
+            result = profile_detector(detector, wallet, limit=limit, output=output)
+        except KeyError:
+            raise click.ClickException(f"Detektor tidak dikenal: {detector}")
+        click.echo(f"{detector} @ {wallet}: wall {result['wall_time']:.3f}s, "
+                   f"DB {result['db_time']:.3f}s, {result['queries']} query, "
+                   f"{result['rows_read']} baris, {result['alerts']} alert")
+        click.echo(result["profile"])
+
+    @app.cli.command('check-detectors')
+    @click.option('--sample', type=int, default=200, show_default=True,
+                  help='Jumlah wallet acak dari wallet_history.')
+    def check_detectors_command(sample):
+        """Cek parity detektor bulk vs per wallet dan bandingkan waktunya."""
+        from .devtools.check_detectors import run
+
+        mismatched = run(sample=sample, echo=click.echo)
+        if mismatched:
+            raise click.ClickException(f"Detektor bulk berbeda: {', '.join(mismatched)}")
+
+    @app.cli.command('bench-ml')
+    @click.option('--sizes', default='10000,100000,500000', show_default=True,
+                  help='Jumlah baris transaksi sintetis, dipisah koma.')
+    @click.option('--repeat', type=int, default=3, show_default=True)
+    @click.option('--baseline', 'baseline_path', default='instance/bench_ml_baseline.json',
+                  show_default=True, help='File JSON baseline.')
+    @click.option('--save-baseline', is_flag=True, help='Simpan hasil sebagai baseline baru.')
+    @click.option('--tolerance', type=float, default=0.3, show_default=True,
+                  help='Penurunan throughput / kenaikan memori yang masih diterima.')
+    def bench_ml_command(sizes, repeat, baseline_path, save_baseline, tolerance):
+        """Benchmark fitur, scaling & predict (model pengganti sintetis) dan cek regresi."""
+        from .devtools.bench_ml import run
+
+        regressions = run(sizes=[int(s) for s in sizes.split(',') if s.strip()], repeat=repeat,
+                          baseline_path=baseline_path, save=save_baseline,
+                          tolerance=tolerance, echo=click.echo)
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} masalah performa ML (regresi atau baseline hilang).")
@@ -1,13 +1,270 @@
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import contextvars
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from flask import g, has_app_context
 
 load_dotenv()
-def get_db_connection():
-    """Membuat koneksi ke database PostgreSQL."""
-    return psycopg2.connect(
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))          # detik menunggu slot kosong
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", 30))  # detik idle sebelum di-ping
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_slots = None
+_last_used = {}
+
+_query_stats = contextvars.ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """Jumlah query, waktu di database, dan baris hasil selama collect_query_stats() aktif."""
+    __slots__ = ('queries', 'db_time', 'rows')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+    def add(self, other):
+        self.queries += other.queries
+        self.db_time += other.db_time
+        self.rows += other.rows
+
+
+@contextmanager
+def collect_query_stats():
+    """
+    Ukur semua query yang dijalankan di konteks ini (thread/task yang sama).
+    Statistik blok bersarang ikut dijumlahkan ke blok luarnya.
+    """
+    parent = _query_stats.get()
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+        if parent is not None:
+            parent.add(stats)
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor default semua koneksi pool; hanya mengukur saat collect_query_stats() aktif."""
+
+    def _timed(self, method, query, vars):
+        stats = _query_stats.get()
+        if stats is None:
+            return method(query, vars)
+        started = time.perf_counter()
+        try:
+            return method(query, vars)
+        finally:
+            stats.db_time += time.perf_counter() - started
+            stats.queries += 1
+            # Cursor klien sudah menerima semua baris di execute; named cursor dihitung saat fetch
+            if not self.name and self.description is not None and self.rowcount > 0:
+                stats.rows += self.rowcount
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def _fetched(self, rows):
+        stats = _query_stats.get()
+        if stats is not None and self.name:
+            stats.rows += len(rows)
+        return rows
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany(size) if size is not None else super().fetchmany())
+
+    def fetchall(self):
+        return self._fetched(super().fetchall())
+
+
+def _connect_kwargs():
+    return dict(
         host=os.getenv("DB_HOST"),
         database=os.getenv("DB_NAME"),
         user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
-    )
\ No newline at end of file
+        password=os.getenv("DB_PASSWORD"),
+        cursor_factory=InstrumentedCursor
+    )
+
+
+def get_pool():
+    """
+    Mengembalikan pool koneksi PostgreSQL milik proses ini.
+    Pool dibuat ulang setelah fork supaya koneksi tidak dipakai bersama antar proses.
+    """
+    global _pool, _pool_pid, _pool_slots
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, **_connect_kwargs()
+                )
+                _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+                _pool_pid = pid
+                _last_used.clear()
+    return _pool
+
+
+def _is_healthy(raw):
+    """Cek koneksi sebelum dipinjamkan; ping hanya jika sudah lama idle."""
+    if raw.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(raw), 0) < DB_POOL_PING_INTERVAL:
+        return True
+    try:
+        cur = raw.cursor()
+        cur.execute("SELECT 1")
+        cur.close()
+        raw.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    pool = get_pool()
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise psycopg2.pool.PoolError("Timeout menunggu koneksi database dari pool")
+    try:
+        raw = pool.getconn()
+        while not _is_healthy(raw):
+            _last_used.pop(id(raw), None)
+            pool.putconn(raw, close=True)
+            raw = pool.getconn()
+        return raw
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def _release(raw):
+    """Kembalikan koneksi ke pool; transaksi yang belum di-commit di-rollback."""
+    pool = get_pool()
+    discard = bool(raw.closed)
+    if not discard:
+        try:
+            if raw.autocommit:
+                raw.autocommit = False
+            if raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                raw.rollback()
+        except psycopg2.Error:
+            discard = True
+    if discard:
+        _last_used.pop(id(raw), None)
+    else:
+        _last_used[id(raw)] = time.monotonic()
+    try:
+        pool.putconn(raw, close=discard)
+    finally:
+        _pool_slots.release()
+
+
+class PooledConnection:
+    """
+    Proxy tipis di atas koneksi psycopg2. Semua atribut diteruskan ke koneksi asli,
+    hanya close() yang diganti sehingga koneksi kembali ke pool, bukan diputus.
+    """
+
+    def __init__(self, raw, on_close):
+        self._raw = raw
+        self._on_close = on_close
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        # Atribut internal disimpan di proxy, sisanya (mis. autocommit) ke koneksi asli
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+    @property
+    def closed(self):
+        return 1 if self._released else self._raw.closed
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._on_close(self._raw)
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+
+class _RequestConnection:
+    """Koneksi yang dipinjam sekali per request dan dipakai bersama semua service."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.depth = 0
+
+    def leave(self, raw):
+        self.depth -= 1
+        # Sama seperti close() biasa: pekerjaan yang belum di-commit dibuang,
+        # tapi hanya saat peminjam terluar selesai agar transaksi pemanggil tetap utuh.
+        if self.depth == 0 and not raw.closed:
+            if raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                raw.rollback()
+
+
+def get_db_connection():
+    """
+    Membuat koneksi ke database PostgreSQL.
+    Di dalam konteks Flask, semua pemanggil berbagi satu koneksi dari pool per request;
+    di luar konteks (scheduler, thread latar) koneksi dipinjam langsung dari pool.
+    Pemanggil tetap wajib memanggil conn.close() seperti biasa.
+    """
+    if not has_app_context():
+        return PooledConnection(_checkout(), _release)
+
+    shared = g.get('_db_conn')
+    if shared is None or shared.raw.closed:
+        if shared is not None:
+            _release(shared.raw)
+        shared = g._db_conn = _RequestConnection(_checkout())
+    shared.depth += 1
+    return PooledConnection(shared.raw, shared.leave)
+
+
+def release_request_connection(exc=None):
+    """Kembalikan koneksi milik request ke pool (dipanggil saat teardown)."""
+    shared = g.pop('_db_conn', None)
+    if shared is not None:
+        _release(shared.raw)
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+
+def init_app(app):
+    app.teardown_appcontext(release_request_connection)
@@ -0,0 +1 @@
+# app/devtools: alat bantu pengembangan & benchmark (tidak dipakai di produksi)
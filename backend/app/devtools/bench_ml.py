@@ -0,0 +1,202 @@
+# app/devtools/bench_ml.py
+"""
+Benchmark & cek regresi jalur inferensi ML: ekstraksi fitur, scaling, dan predict
+untuk Isolation Forest (detect_anomalies / prepare_features) dan XGBoost
+(klasifikasi wallet di update_all_wallets_logic).
+
+Model pengganti kecil dilatih saat itu juga dari data sintetis, jadi tidak butuh
+file .pkl produksi. Hasil (baris/detik + puncak memori tracemalloc) dibandingkan
+dengan baseline JSON; penurunan melebihi toleransi dianggap regresi.
+
+    flask bench-ml --save-baseline
+    flask bench-ml                  # gagal (exit 1) jika ada regresi atau baseline belum ada
+"""
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ..services.features import FEATURE_COLUMNS, build_feature_matrix
+from ..services.inference import scale_features
+from .bench_features import synthetic_transactions
+
+DEFAULT_BASELINE = os.path.join('instance', 'bench_ml_baseline.json')
+DEFAULT_SIZES = (10000, 100000, 500000)
+TRAIN_ROWS = 20000
+# Wallet per ukuran untuk jalur XGBoost: tiap wallet diekstrak terpisah seperti di produksi
+WALLET_SAMPLE = 200
+
+
+def train_standin_models(seed=7):
+    """
+    Scaler + IsolationForest dan scaler + XGBClassifier kecil dengan hyperparameter
+    mendekati model produksi. Mengembalikan dict jenis → (scaler, model).
+    """
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    features = build_feature_matrix(synthetic_transactions(TRAIN_ROWS, seed=seed))
+    scaler_if = StandardScaler().fit(features)
+    isolation_forest = IsolationForest(n_estimators=100, contamination=0.01, random_state=seed)
+    isolation_forest.fit(pd.DataFrame(scaler_if.transform(features), columns=FEATURE_COLUMNS))
+
+    wallet_features = build_feature_matrix(synthetic_transactions(TRAIN_ROWS, seed=seed + 1),
+                                           fill_missing=True)
+    rng = np.random.default_rng(seed)
+    labels = (wallet_features['log_value'] + rng.normal(0, 1, len(wallet_features)) > 2).astype(int)
+    scaler_xgb = StandardScaler().fit(wallet_features)
+    xgboost = XGBClassifier(n_estimators=100, max_depth=6, learning_rate=0.1,
+                            n_jobs=1, random_state=seed)
+    xgboost.fit(scaler_xgb.transform(wallet_features), labels)
+    return {'anomaly': (scaler_if, isolation_forest), 'classifier': (scaler_xgb, xgboost)}
+
+
+def _wallet_frames(df, count):
+    """Frame riwayat per wallet (sender atau receiver) untuk `count` wallet teraktif."""
+    wallets = df['sender'].value_counts().index[:count]
+    return [df[(df['sender'] == w) | (df['receiver'] == w)] for w in wallets]
+
+
+def _stages(df, models):
+    """(nama tahap, jumlah baris, fungsi tanpa argumen) — urutan sama dengan jalur produksi."""
+    (scaler_if, isolation_forest), (scaler_xgb, xgboost) = models['anomaly'], models['classifier']
+    tx_features = build_feature_matrix(df).to_numpy(dtype='float64')
+    tx_scaled = scale_features('anomaly', scaler_if, tx_features)
+    frames = _wallet_frames(df, WALLET_SAMPLE)
+    vectors = np.vstack([build_feature_matrix(f, fill_missing=True).to_numpy(dtype='float64')[0]
+                         for f in frames])
+    # Scaling & predict XGBoost: satu batch untuk seluruh wallet (seperti rescore_blacklist)
+    wallet_count = max(len(frames), df['sender'].nunique())
+    wallet_matrix = np.resize(vectors, (wallet_count, len(FEATURE_COLUMNS)))
+    wallet_scaled = scale_features('classifier', scaler_xgb, wallet_matrix)
+    wallet_rows = sum(len(f) for f in frames)
+
+    return [
+        ('if_features', len(df), lambda: build_feature_matrix(df)),
+        ('if_scale', len(df), lambda: scale_features('anomaly', scaler_if, tx_features)),
+        ('if_predict', len(df), lambda: isolation_forest.predict(tx_scaled)),
+        ('xgb_features', wallet_rows,
+         lambda: [build_feature_matrix(f, fill_missing=True) for f in frames]),
+        ('xgb_scale', wallet_count, lambda: scale_features('classifier', scaler_xgb, wallet_matrix)),
+        ('xgb_predict', wallet_count, lambda: xgboost.predict(wallet_scaled)),
+    ]
+
+
+def _measure(fn, repeat):
+    """
+    Satu pemanasan, waktu terbaik dari `repeat` percobaan, lalu satu percobaan
+    terpisah di bawah tracemalloc (alokasi native XGBoost tidak ikut terhitung).
+    """
+    fn()
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def environment():
+    import sklearn
+    import xgboost
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=3, echo=print):
+    """Jalankan semua tahap untuk setiap ukuran. Mengembalikan dict 'tahap@baris' → metrik."""
+    models = train_standin_models()
+    results = {}
+    for size in sizes:
+        df = synthetic_transactions(size)
+        for stage, rows, fn in _stages(df, models):
+            elapsed, peak = _measure(fn, repeat)
+            key = f"{stage}@{size}"
+            results[key] = {
+                'rows': rows,
+                'seconds': round(elapsed, 6),
+                'rows_per_sec': round(rows / elapsed, 1) if elapsed else None,
+                'peak_mb': round(peak / 2**20, 2),
+            }
+            echo(f"{key:>22}: {results[key]['rows_per_sec']:>14,.0f} baris/s, "
+                 f"puncak {results[key]['peak_mb']:>8.2f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance=0.3):
+    """
+    Bandingkan dengan baseline. Regresi = baris/detik turun lebih dari `tolerance`
+    atau puncak memori naik lebih dari `tolerance`. Mengembalikan list pesan regresi.
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base['rows_per_sec'] and current['rows_per_sec'] < base['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{key}: {current['rows_per_sec']:,.0f} baris/s "
+                               f"(baseline {base['rows_per_sec']:,.0f})")
+        # Abaikan tahap yang alokasinya sangat kecil; fluktuasinya tidak bermakna
+        if base['peak_mb'] >= 1 and current['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{key}: puncak {current['peak_mb']:.2f} MB "
+                               f"(baseline {base['peak_mb']:.2f} MB)")
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, baseline_path=DEFAULT_BASELINE, save=False,
+        tolerance=0.3, echo=print):
+    """
+    Benchmark lalu bandingkan dengan baseline (atau simpan baseline baru jika `save`).
+    Mengembalikan list pesan regresi (kosong = lolos); baseline yang belum ada juga gagal.
+    """
+    results = run_benchmarks(sizes=sizes, repeat=repeat, echo=echo)
+    if save:
+        save_baseline(baseline_path, results)
+        echo(f"Baseline disimpan ke {baseline_path}")
+        return []
+
+    baseline = load_baseline(baseline_path)
+    if baseline is None:
+        # Tanpa baseline tidak ada yang dibandingkan: gagal, bukan lolos diam-diam
+        message = f"Baseline {baseline_path} belum ada; jalankan dengan --save-baseline."
+        echo(f"❌ {message}")
+        return [message]
+    if baseline.get('environment') != environment():
+        echo("⚠️  Versi library/mesin berbeda dari saat baseline dibuat; perbandingan kurang akurat.")
+    regressions = compare(results, baseline['results'], tolerance)
+    for message in regressions:
+        echo(f"❌ {message}")
+    if not regressions:
+        echo("✅ Tidak ada regresi terhadap baseline.")
+    return regressions
@@ -0,0 +1,45 @@
+# app/devtools/check_detectors.py
+"""
+Parity check detektor: hasil versi bulk harus sama dengan versi per wallet
+untuk sampel wallet dari wallet_history, sekaligus membandingkan waktunya.
+
+    flask check-detectors --sample 200
+"""
+import time
+
+from ..database import get_db_connection
+from ..services.detectors import DETECTORS, BULK_DETECTORS
+
+
+def _normalize(alerts):
+    return sorted(repr(sorted(alert['data'].items())) for alert in alerts)
+
+
+def run(sample=200, echo=print):
+    """Bandingkan per detektor yang punya dua versi. Mengembalikan list nama detektor yang beda."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT address FROM wallet_history ORDER BY random() LIMIT %s", (sample,))
+    wallets = [row[0] for row in cur.fetchall()]
+    cur.close()
+
+    mismatched = []
+    try:
+        for name in sorted(set(DETECTORS) & set(BULK_DETECTORS)):
+            started = time.perf_counter()
+            per_wallet = {wallet: DETECTORS[name](wallet, conn) for wallet in wallets}
+            per_wallet_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            bulk = BULK_DETECTORS[name](wallets, conn)
+            bulk_s = time.perf_counter() - started
+
+            diff = [w for w in wallets if _normalize(per_wallet[w]) != _normalize(bulk.get(w, []))]
+            mark = '❌' if diff else '✅'
+            echo(f"{mark} {name}: {len(wallets)} wallet, per wallet {per_wallet_s:.3f}s, "
+                 f"bulk {bulk_s:.3f}s" + (f", beda di {len(diff)} wallet (mis. {diff[0]})" if diff else ""))
+            if diff:
+                mismatched.append(name)
+    finally:
+        conn.close()
+    return mismatched
@@ -0,0 +1,173 @@
+# app/devtools/fake_etherscan.py
+"""
+Server Etherscan palsu untuk tes & benchmark offline refresh engine.
+
+Hanya mendukung module=account&action=txlist. Transaksi dibuat deterministik
+dari alamat (jumlah, blok, counterparty), sehingga hasilnya bisa dibandingkan
+antar run. Latensi dan rate limit per API key bisa disimulasikan.
+
+    python -m app.devtools.fake_etherscan --port 8545 --latency 0.05 --rate 5
+    ETHERSCAN_API_URL=http://127.0.0.1:8545/api flask ...
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MAX_RESULT_WINDOW = 10000
+TX_PER_BLOCK = 3
+
+
+def _seed(address):
+    return int(hashlib.sha256(address.lower().encode()).hexdigest(), 16)
+
+
+def synthetic_txlist(address, tx_count=None):
+    """Daftar tx sintetis (format Etherscan) untuk `address`, urut blok naik."""
+    seed = _seed(address)
+    if tx_count is None:
+        tx_count = 5 + seed % 400
+    txs = []
+    for i in range(tx_count):
+        h = hashlib.sha256(f"{address}:{i}".encode()).hexdigest()
+        counterparty = "0x" + hashlib.sha1(f"{seed % 97}:{i % 13}".encode()).hexdigest()
+        outgoing = int(h[:2], 16) % 2 == 0
+        txs.append({
+            "blockNumber": str(1_000_000 + i // TX_PER_BLOCK),
+            "timeStamp": str(1_600_000_000 + i * 600),
+            "hash": "0x" + h,
+            "from": address if outgoing else counterparty,
+            "to": counterparty if outgoing else address,
+            "value": str(int(h[2:10], 16) * 10 ** 9),
+        })
+    return txs
+
+
+class _RateLimiter:
+    """Jendela 1 detik per API key, seperti batas panggilan/detik Etherscan."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        if not self.rate:
+            return True
+        now = int(time.monotonic())
+        with self._lock:
+            window, count = self._windows.get(key, (now, 0))
+            if window != now:
+                window, count = now, 0
+            self._windows[key] = (window, count + 1)
+            return count < self.rate
+
+
+class FakeEtherscanHandler(BaseHTTPRequestHandler):
+    server_version = "FakeEtherscan/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        server = self.server
+        with server.stats_lock:
+            server.stats["requests"] += 1
+
+        if server.latency:
+            time.sleep(server.latency)
+        if not server.limiter.allow(params.get("apikey", "")):
+            with server.stats_lock:
+                server.stats["rate_limited"] += 1
+            return self._send({"status": "0", "message": "NOTOK",
+                               "result": "Max rate limit reached"})
+        if params.get("module") != "account" or params.get("action") != "txlist":
+            return self._send({"status": "0", "message": "NOTOK",
+                               "result": "Error! Unsupported action"})
+
+        address = params.get("address", "").lower()
+        start = int(params.get("startblock", 0))
+        end = int(params.get("endblock", 99999999))
+        page = int(params.get("page", 1))
+        offset = int(params.get("offset", MAX_RESULT_WINDOW))
+        if page * offset > MAX_RESULT_WINDOW:
+            return self._send({"status": "0", "message": "NOTOK",
+                               "result": "Result window is too large"})
+
+        txs = [tx for tx in server.txlist(address)
+               if start <= int(tx["blockNumber"]) <= end]
+        if params.get("sort") == "desc":
+            txs.reverse()
+        txs = txs[(page - 1) * offset: page * offset]
+        if not txs:
+            return self._send({"status": "0", "message": "No transactions found", "result": []})
+        self._send({"status": "1", "message": "OK", "result": txs})
+
+
+class FakeEtherscanServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, rate=0,
+                 tx_count=None, verbose=False):
+        super().__init__((host, port), FakeEtherscanHandler)
+        self.latency = latency
+        self.limiter = _RateLimiter(rate)
+        self.tx_count = tx_count
+        self.verbose = verbose
+        self.stats = {"requests": 0, "rate_limited": 0}
+        self.stats_lock = threading.Lock()
+        self._cache = {}
+
+    def txlist(self, address):
+        if address not in self._cache:
+            self._cache[address] = synthetic_txlist(address, self.tx_count)
+        return self._cache[address]
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start_background(self):
+        """Jalankan server di thread daemon (untuk benchmark dalam satu proses)."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server Etherscan palsu (txlist).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency", type=float, default=0.05, help="detik per request")
+    parser.add_argument("--rate", type=int, default=5, help="panggilan/detik per API key (0 = tanpa batas)")
+    parser.add_argument("--tx-count", type=int, default=None, help="jumlah tx per alamat (default acak per alamat)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeEtherscanServer(args.host, args.port, args.latency, args.rate,
+                                 args.tx_count, args.verbose)
+    print(f"Fake Etherscan berjalan di {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# app/migrate.py
+"""
+Migrasi skema berversi.
+
+File SQL ada di app/migrations dengan nama NNNN_nama.sql dan dijalankan berurutan.
+Versi yang sudah diterapkan dicatat di tabel schema_migrations.
+File yang diawali komentar `-- migrate: no-transaction` dijalankan per statement
+dalam mode autocommit (dibutuhkan CREATE INDEX CONCURRENTLY).
+"""
+import json
+import os
+import re
+
+from .database import get_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+_FILENAME_RE = re.compile(r'^(\d{4})_([\w-]+)\.sql$')
+
+# Kunci advisory lock agar dua proses tidak meng-upgrade bersamaan.
+MIGRATION_LOCK_KEY = 7301001
+
+
+def list_migrations():
+    """Daftar (version, name, path) semua file migrasi, urut versi."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+
+def _ensure_version_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL,
+            applied_at  TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+
+
+def applied_versions(conn):
+    cur = conn.cursor()
+    _ensure_version_table(cur)
+    conn.commit()
+    cur.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    cur.close()
+    return versions
+
+
+def _split_statements(sql):
+    """Pisahkan file no-transaction menjadi statement tunggal (tanpa blok $$)."""
+    body = "\n".join(line for line in sql.splitlines() if not line.strip().startswith('--'))
+    return [stmt.strip() for stmt in body.split(';') if stmt.strip()]
+
+
+def _apply(conn, version, name, path):
+    with open(path, encoding='utf-8') as f:
+        sql = f.read()
+    cur = conn.cursor()
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        conn.autocommit = True
+        try:
+            for stmt in _split_statements(sql):
+                cur.execute(stmt)
+        finally:
+            conn.autocommit = False
+    else:
+        cur.execute(sql)
+    cur.execute(
+        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+        (version, name)
+    )
+    conn.commit()
+    cur.close()
+
+
+def upgrade(target=None, echo=print):
+    """Terapkan semua migrasi yang belum dijalankan (sampai `target` jika diberikan)."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    applied = []
+    try:
+        done = applied_versions(conn)
+        for version, name, path in list_migrations():
+            if version in done or (target is not None and version > target):
+                continue
+            echo(f"→ {version:04d}_{name}")
+            _apply(conn, version, name, path)
+            applied.append(version)
+    finally:
+        conn.rollback()
+        cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+        cur.close()
+        conn.close()
+    return applied
+
+
+def status():
+    """List (version, name, applied) untuk semua migrasi."""
+    conn = get_db_connection()
+    done = applied_versions(conn)
+    conn.close()
+    return [(version, name, version in done) for version, name, _ in list_migrations()]
+
+
+# ---------------------------------------------------------------------------
+# Pemeriksaan EXPLAIN: query service harus memakai index, bukan Seq Scan.
+# ---------------------------------------------------------------------------
+
+SEED_WALLET = '0xseed1'
+
+_SEED_SQL = [
+    """
+    INSERT INTO transactions (tx_hash, sender, receiver, value, timestamp, is_anomaly)
+    SELECT 'seed-' || g,
+           '0xseed' || (g %% 5000),
+           '0xseed' || ((g * 7 + 3) %% 5000),
+           (g %% 20000)::numeric / 10,
+           TIMESTAMP '2020-01-01' + g * INTERVAL '1 minute',
+           g %% 97 = 0
+    FROM generate_series(1, %(rows)s) g
+    ON CONFLICT (tx_hash) DO NOTHING
+    """,
+    """
+    INSERT INTO wallet_stats (address, inbound_tx, outbound_tx)
+    SELECT '0xseed' || g, 1, 1 FROM generate_series(0, 4999) g
+    ON CONFLICT (address) DO NOTHING
+    """,
+    "ANALYZE transactions",
+    "ANALYZE wallet_stats",
+]
+
+
+def hot_queries():
+    """
+    (nama, sql, params) untuk query service yang harus memakai index. SQL diambil
+    langsung dari konstanta modul service supaya pemeriksaan tidak menyimpang dari kode.
+    """
+    from .services import address_search, detectors, large_tx, transaction_service as ts
+    from .services.chunked_features import _STREAM_SQL
+    from .services.detector_delta import delta_params
+    from .services.wallet_aggregate import _AGGREGATE_SQL, _TOP_LISTS_SQL, TOP_N
+    from .services.wallet_stats import _STATS_SQL
+
+    w = SEED_WALLET
+    threshold = large_tx.large_tx_threshold()
+    # Jendela delta: wallet dengan watermark (index ingested_at) dan tanpa (riwayat penuh)
+    delta = delta_params([w, '0xseed2'], {w: '2020-01-01 00:00:00'})
+    return [
+        ("wallet_stream", _STREAM_SQL, (w, w)),
+        ("wallet_timestamps", ts._WALLET_TIMESTAMPS_SQL, (w, w)),
+        ("wallet_aggregate",
+         _AGGREGATE_SQL.format(top_lists=_TOP_LISTS_SQL),
+         {"wallet": w, "top_n": TOP_N}),
+        ("wallet_stats_lookup", _STATS_SQL, (w,)),
+        ("hourly_sender_count", ts._HOURLY_SENDER_SQL, (w, ts.HOURLY_TX_SPIKE_THRESHOLD)),
+        ("hourly_receiver_count", ts._HOURLY_RECEIVER_SQL, (w, ts.HOURLY_TX_SPIKE_THRESHOLD)),
+        ("large_tx_first_per_pair", large_tx._WALLET_SQL, {"wallet": w, "threshold": threshold}),
+        ("large_tx_bulk", large_tx._BULK_SQL, {**delta, "threshold": threshold}),
+        ("hourly_tx_spike_bulk", detectors._HOURLY_BULK_SQL,
+         {**delta, "threshold": ts.HOURLY_TX_SPIKE_THRESHOLD}),
+        ("recurring_tx_bulk", detectors._RECURRING_BULK_SQL, delta),
+        ("transactions_keyset_page",
+         ts._keyset_page_sql(ts._TRANSACTIONS_PAGE_SQL, "timestamp", True, True),
+         ('2020-02-01 00:00:00', 'seed-1', 11)),
+        ("anomaly_keyset_page",
+         ts._keyset_page_sql(ts._ANOMALY_PAGE_SQL, "timestamp", False, True),
+         ('2020-01-01 00:00:00', 'seed-1', 11)),
+        ("address_prefix_search", address_search._LIKE_SQL,
+         ('0xseed12%', address_search.MAX_MATCHES + 1)),
+        ("anomaly_cases", ts._ANOMALY_CASES_SQL, (10,)),
+    ]
+
+
+def _seq_scans(plan, tables):
+    """Kumpulkan nama relasi yang dibaca dengan Seq Scan di pohon plan."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in tables:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(_seq_scans(child, tables))
+    return found
+
+
+def explain_check(seed_rows=100000, echo=print):
+    """
+    Seed data sintetis (di dalam transaksi yang di-rollback), jalankan EXPLAIN
+    untuk setiap hot query, dan laporkan query yang masih memakai Seq Scan.
+    Mengembalikan list nama query yang gagal.
+    """
+    tables = {'transactions', 'alerts', 'wallet_stats', 'wallet_history', 'wallet_risk'}
+    failures = []
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        if seed_rows:
+            for sql in _SEED_SQL:
+                cur.execute(sql, {"rows": seed_rows})
+        for name, sql, params in hot_queries():
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            seq = _seq_scans(plan[0]['Plan'], tables)
+            if seq:
+                failures.append(name)
+                echo(f"❌ {name}: Seq Scan pada {', '.join(sorted(set(seq)))}")
+            else:
+                echo(f"✅ {name}")
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+    return failures
@@ -0,0 +1,91 @@
+-- Skema dasar semua tabel yang dipakai service.
+-- Memakai IF NOT EXISTS supaya aman dijalankan di database yang sudah ada.
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+CREATE TABLE IF NOT EXISTS users (
+    id          SERIAL PRIMARY KEY,
+    username    TEXT UNIQUE NOT NULL,
+    password    TEXT NOT NULL,
+    role        TEXT NOT NULL DEFAULT 'public',
+    created_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    tx_hash     TEXT PRIMARY KEY,
+    sender      TEXT,
+    receiver    TEXT,
+    value       NUMERIC NOT NULL DEFAULT 0,
+    timestamp   TIMESTAMP NOT NULL,
+    is_anomaly  BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS wallet_history (
+    address     TEXT PRIMARY KEY,
+    queried_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS wallet_risk (
+    address       TEXT PRIMARY KEY,
+    risk_score    INTEGER,
+    risk_profile  TEXT,
+    last_updated  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS blacklist_addresses (
+    address   TEXT PRIMARY KEY,
+    source    TEXT,
+    reason    TEXT,
+    added_on  TIMESTAMP NOT NULL DEFAULT NOW(),
+    category  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS suspicious_addresses (
+    address     TEXT PRIMARY KEY,
+    risk_score  NUMERIC
+);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id              BIGSERIAL PRIMARY KEY,
+    wallet_address  TEXT NOT NULL,
+    detector_name   TEXT NOT NULL,
+    payload         JSONB NOT NULL,
+    created_at      TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS search_history (
+    id          BIGSERIAL PRIMARY KEY,
+    query       TEXT NOT NULL,
+    created_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS darkweb_results (
+    id          BIGSERIAL PRIMARY KEY,
+    address     TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    title       TEXT,
+    url         TEXT,
+    created_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS wallet_stats (
+    address          TEXT PRIMARY KEY,
+    inbound_tx       BIGINT  NOT NULL DEFAULT 0,
+    outbound_tx      BIGINT  NOT NULL DEFAULT 0,
+    inbound_value    NUMERIC NOT NULL DEFAULT 0,
+    outbound_value   NUMERIC NOT NULL DEFAULT 0,
+    unique_senders   BIGINT  NOT NULL DEFAULT 0,
+    unique_receivers BIGINT  NOT NULL DEFAULT 0,
+    first_tx_at      TIMESTAMP,
+    first_tx_hash    TEXT,
+    last_tx_at       TIMESTAMP,
+    last_tx_hash     TEXT,
+    updated_at       TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS wallet_counterparties (
+    address      TEXT NOT NULL,
+    direction    TEXT NOT NULL,  -- 'in' (counterparty = sender) / 'out' (counterparty = receiver)
+    counterparty TEXT NOT NULL,
+    PRIMARY KEY (address, direction, counterparty)
+);
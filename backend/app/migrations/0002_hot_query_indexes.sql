@@ -0,0 +1,41 @@
+-- migrate: no-transaction
+-- Index untuk query per-wallet, alert, dan dashboard.
+-- CONCURRENTLY agar tabel besar tetap bisa ditulis selama index dibangun.
+
+-- WHERE sender = %s OR receiver = %s ORDER BY timestamp → BitmapOr dua index ini,
+-- juga dipakai GROUP BY DATE_TRUNC('hour', timestamp) per sender/receiver.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_sender_ts
+    ON transactions (sender, timestamp);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_receiver_ts
+    ON transactions (receiver, timestamp);
+
+-- Subquery MIN(timestamp) per pasangan sender-receiver di detect_large_tx_for_wallet.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_pair_ts
+    ON transactions (sender, receiver, timestamp);
+
+-- get_anomaly_cases / hitungan anomaly.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_anomaly_ts
+    ON transactions (timestamp) WHERE is_anomaly;
+
+-- alert_exists: filter pada (payload->>'timestamp')::float.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_wallet_detector_ts
+    ON alerts (wallet_address, detector_name, ((payload->>'timestamp')::float));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_wallet_created
+    ON alerts (wallet_address, created_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wallet_history_queried_at
+    ON wallet_history (queried_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wallet_risk_last_updated
+    ON wallet_risk (last_updated DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wallet_risk_profile
+    ON wallet_risk (risk_profile);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_history_query_id
+    ON search_history (query, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_darkweb_results_address
+    ON darkweb_results (address, source, created_at DESC);
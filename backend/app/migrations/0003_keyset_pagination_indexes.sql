@@ -0,0 +1,14 @@
+-- migrate: no-transaction
+-- Index keyset pagination /aml/transaction_analysis: ORDER BY (kolom, tx_hash).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_ts_hash
+    ON transactions (timestamp, tx_hash);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_value_hash
+    ON transactions (value, tx_hash);
+
+-- Daftar anomaly dipaginasi pada (timestamp, tx_hash); menggantikan index parsial lama.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_anomaly_ts_hash
+    ON transactions (timestamp, tx_hash) WHERE is_anomaly;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_transactions_anomaly_ts;
@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+-- Pencarian alamat berbasis awalan di tabel alamat unik (wallet_stats),
+-- menggantikan ILIKE '%wallet%' atas seluruh tabel transactions.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wallet_stats_address_pattern
+    ON wallet_stats (address text_pattern_ops);
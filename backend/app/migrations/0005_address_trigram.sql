@@ -0,0 +1,14 @@
+-- Opsional: pencarian substring alamat dengan pg_trgm.
+-- Jika ekstensi tidak tersedia / tidak ada hak akses, migrasi tetap lolos
+-- dan pencarian alamat jatuh ke strategi prefix.
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS idx_wallet_stats_address_trgm
+        ON wallet_stats USING gin (address gin_trgm_ops);
+EXCEPTION
+    WHEN insufficient_privilege OR undefined_file OR feature_not_supported THEN
+        RAISE NOTICE 'pg_trgm tidak tersedia: pencarian substring alamat dinonaktifkan';
+END
+$$;
@@ -0,0 +1,2 @@
+-- Watermark sinkronisasi Etherscan: blok tertinggi yang sudah diambil per wallet.
+ALTER TABLE wallet_history ADD COLUMN IF NOT EXISTS last_synced_block BIGINT;
@@ -0,0 +1,25 @@
+-- Job latar belakang (refresh wallet, hitung risiko, sinkronisasi Neo4j).
+CREATE TABLE IF NOT EXISTS jobs (
+    id              UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind            TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'queued'
+                    CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    params          JSONB NOT NULL DEFAULT '{}'::jsonb,
+    progress_done   INTEGER NOT NULL DEFAULT 0,
+    progress_total  INTEGER,
+    message         TEXT,
+    result          JSONB,
+    error           TEXT,
+    created_by      TEXT,
+    worker          TEXT,
+    created_at      TIMESTAMP NOT NULL DEFAULT NOW(),
+    started_at      TIMESTAMP,
+    updated_at      TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at     TIMESTAMP
+);
+
+-- Antrian: klaim job queued tertua (FOR UPDATE SKIP LOCKED)
+CREATE INDEX IF NOT EXISTS idx_jobs_queued
+    ON jobs (created_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at
+    ON jobs (created_at DESC);
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- Batch scoring mencari transaksi yang belum diberi flag anomaly (is_anomaly IS NULL).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_unscored
+    ON transactions (sender, receiver) WHERE is_anomaly IS NULL;
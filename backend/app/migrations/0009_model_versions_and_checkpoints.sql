@@ -0,0 +1,15 @@
+-- Versi model yang menghasilkan flag anomaly / entri blacklist ML,
+-- dan checkpoint backfill rescoring yang bisa dilanjutkan.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS anomaly_model_version TEXT;
+ALTER TABLE blacklist_addresses ADD COLUMN IF NOT EXISTS model_version TEXT;
+
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    name            TEXT PRIMARY KEY,
+    model_version   TEXT NOT NULL,
+    last_key        JSONB,
+    rows_processed  BIGINT NOT NULL DEFAULT 0,
+    rows_updated    BIGINT NOT NULL DEFAULT 0,
+    started_at      TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at      TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at     TIMESTAMP
+);
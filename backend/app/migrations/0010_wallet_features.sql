@@ -0,0 +1,11 @@
+-- Feature store: vektor fitur per wallet (input XGBoost) beserta watermark
+-- transaksi yang dicakup. Valid selama watermark sama dengan wallet_stats.
+CREATE TABLE IF NOT EXISTS wallet_features (
+    address          TEXT PRIMARY KEY,
+    feature_version  INTEGER NOT NULL,
+    features         DOUBLE PRECISION[] NOT NULL,
+    tx_count         BIGINT NOT NULL,
+    last_tx_hash     TEXT,
+    last_tx_at       TIMESTAMP,
+    computed_at      TIMESTAMP NOT NULL DEFAULT NOW()
+);
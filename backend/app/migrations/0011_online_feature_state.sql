@@ -0,0 +1,18 @@
+-- State engine fitur online: counter per wallet konteks yang diperbarui O(1)
+-- per transaksi baru dan di-checkpoint di transaksi ingest yang sama.
+CREATE TABLE IF NOT EXISTS online_feature_wallets (
+    wallet      TEXT PRIMARY KEY,
+    tx_count    BIGINT NOT NULL,              -- -1 = belum di-bootstrap dari riwayat
+    value_hist  INTEGER[] NOT NULL,
+    inter_hist  INTEGER[] NOT NULL,
+    updated_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS online_feature_counters (
+    wallet     TEXT NOT NULL,
+    kind       TEXT NOT NULL,                 -- sender | receiver | pair | sender_value
+    key        TEXT NOT NULL,
+    count      BIGINT NOT NULL,
+    last_seen  TIMESTAMP,                     -- hanya kind = 'sender' (untuk inter_time)
+    PRIMARY KEY (wallet, kind, key)
+);
@@ -0,0 +1,13 @@
+-- Run detektor incremental: waktu masuk setiap transaksi (bukan timestamp blok,
+-- karena riwayat lama bisa masuk belakangan) dan watermark per detektor per wallet.
+-- Default NOW() tidak volatile sehingga ADD COLUMN tidak menulis ulang tabel;
+-- baris lama dianggap masuk saat migrasi dijalankan.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMP NOT NULL DEFAULT NOW();
+
+CREATE TABLE IF NOT EXISTS detector_watermarks (
+    detector_name   TEXT NOT NULL,
+    wallet_address  TEXT NOT NULL,
+    processed_until TIMESTAMP NOT NULL,     -- ingested_at yang sudah diproses
+    updated_at      TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (detector_name, wallet_address)
+);
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- Delta detektor: transaksi yang masuk setelah watermark.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_ingested_at
+    ON transactions (ingested_at);
@@ -0,0 +1,24 @@
+-- Dedup alert di database: fingerprint = md5 field identitas kejadian per detektor
+-- (lihat register_detector(key=...) dan alert_service.alert_fingerprint).
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
+UPDATE alerts SET fingerprint = CASE detector_name
+    WHEN 'large_tx' THEN md5(concat_ws('|',
+        COALESCE(payload->>'sender', 'None'), COALESCE(payload->>'receiver', 'None'),
+        COALESCE((payload->>'timestamp')::numeric(20,6)::text, 'None')))
+    WHEN 'hourly_tx_spike' THEN md5(concat_ws('|',
+        COALESCE(payload->>'direction', 'None'), COALESCE(payload->>'hour_bucket', 'None')))
+    WHEN 'recurring_tx' THEN md5(COALESCE(payload->>'pattern', 'None'))
+    ELSE md5(payload::text)
+END
+WHERE fingerprint IS NULL;
+
+-- Duplikat lama (sebelum dedup) dibuang, yang paling awal disimpan
+DELETE FROM alerts a
+USING alerts b
+WHERE a.wallet_address = b.wallet_address
+  AND a.detector_name = b.detector_name
+  AND a.fingerprint = b.fingerprint
+  AND a.id > b.id;
+
+ALTER TABLE alerts ALTER COLUMN fingerprint SET NOT NULL;
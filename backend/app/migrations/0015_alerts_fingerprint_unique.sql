@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- Target ON CONFLICT AlertSink.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_fingerprint
+    ON alerts (wallet_address, detector_name, fingerprint);
@@ -0,0 +1,26 @@
+-- Riwayat run detektor terjadwal dan waktu/kegagalan per shard.
+CREATE TABLE IF NOT EXISTS detector_runs (
+    id           BIGSERIAL PRIMARY KEY,
+    status       TEXT NOT NULL DEFAULT 'running',   -- running | done | failed
+    shards       INTEGER NOT NULL,
+    full_scan    BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at  TIMESTAMP,
+    summary      JSONB
+);
+
+CREATE TABLE IF NOT EXISTS detector_run_shards (
+    run_id       BIGINT NOT NULL REFERENCES detector_runs(id) ON DELETE CASCADE,
+    shard        INTEGER NOT NULL,
+    status       TEXT NOT NULL,                     -- done | failed
+    wallets      INTEGER NOT NULL DEFAULT 0,
+    inserted     INTEGER NOT NULL DEFAULT 0,
+    duplicates   INTEGER NOT NULL DEFAULT 0,
+    elapsed      DOUBLE PRECISION,
+    detectors    JSONB,                             -- per detektor: wallets, inserted, duplicates
+    error        TEXT,
+    finished_at  TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (run_id, shard)
+);
+
+CREATE INDEX IF NOT EXISTS idx_detector_runs_started ON detector_runs (started_at DESC);
@@ -0,0 +1,17 @@
+-- Metrik per detektor per run (satu baris per shard): waktu, query, baris, alert.
+CREATE TABLE IF NOT EXISTS detector_metrics (
+    id             BIGSERIAL PRIMARY KEY,
+    run_id         BIGINT REFERENCES detector_runs(id) ON DELETE CASCADE,
+    shard          INTEGER,
+    detector_name  TEXT NOT NULL,
+    calls          INTEGER NOT NULL DEFAULT 0,
+    wallets        INTEGER NOT NULL DEFAULT 0,
+    wall_time      DOUBLE PRECISION NOT NULL DEFAULT 0,
+    db_time        DOUBLE PRECISION NOT NULL DEFAULT 0,
+    queries        INTEGER NOT NULL DEFAULT 0,
+    rows_read      BIGINT NOT NULL DEFAULT 0,
+    alerts         INTEGER NOT NULL DEFAULT 0,
+    recorded_at    TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_detector_metrics_run ON detector_metrics (run_id, detector_name);
@@ -0,0 +1,43 @@
+-- Backfill wallet_stats dan wallet_counterparties dari seluruh tabel transactions.
+-- Ingest hanya menambahkan delta (wallet_stats.apply_new_transactions), jadi tanpa
+-- backfill baris pertama sebuah wallet hanya berisi transaksi baru. Sama dengan
+-- `flask rebuild-wallet-stats`; baris delta-only yang sudah terlanjur dibuat ikut dihitung ulang.
+LOCK TABLE wallet_counterparties, wallet_stats IN EXCLUSIVE MODE;
+TRUNCATE wallet_counterparties, wallet_stats;
+
+INSERT INTO wallet_counterparties (address, direction, counterparty)
+SELECT sender, 'out', receiver FROM transactions
+WHERE sender IS NOT NULL AND receiver IS NOT NULL
+UNION
+SELECT receiver, 'in', sender FROM transactions
+WHERE sender IS NOT NULL AND receiver IS NOT NULL;
+
+WITH edges AS (
+    SELECT sender AS address, receiver AS counterparty, 'out' AS direction,
+           tx_hash, value, timestamp
+    FROM transactions WHERE sender IS NOT NULL
+    UNION ALL
+    SELECT receiver, sender, 'in', tx_hash, value, timestamp
+    FROM transactions WHERE receiver IS NOT NULL
+)
+INSERT INTO wallet_stats (
+    address, inbound_tx, outbound_tx, inbound_value, outbound_value,
+    unique_senders, unique_receivers,
+    first_tx_at, first_tx_hash, last_tx_at, last_tx_hash, updated_at
+)
+SELECT address,
+       COUNT(*) FILTER (WHERE direction = 'in'),
+       COUNT(*) FILTER (WHERE direction = 'out'),
+       COALESCE(SUM(value) FILTER (WHERE direction = 'in'), 0),
+       COALESCE(SUM(value) FILTER (WHERE direction = 'out'), 0),
+       COUNT(DISTINCT counterparty) FILTER (WHERE direction = 'in'),
+       COUNT(DISTINCT counterparty) FILTER (WHERE direction = 'out'),
+       MIN(timestamp),
+       (ARRAY_AGG(tx_hash ORDER BY timestamp ASC))[1],
+       MAX(timestamp),
+       (ARRAY_AGG(tx_hash ORDER BY timestamp DESC))[1],
+       NOW()
+FROM edges
+GROUP BY address;
+
+ANALYZE wallet_stats;
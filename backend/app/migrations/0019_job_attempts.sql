@@ -0,0 +1,6 @@
+-- Reclaim job yang macet: job running memperbarui updated_at secara berkala (heartbeat);
+-- yang berhenti diperbarui diantrikan ulang sampai batas `attempts`.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_running_updated
+    ON jobs (updated_at) WHERE status = 'running';
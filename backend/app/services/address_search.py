@@ -0,0 +1,72 @@
+import re
+from collections import namedtuple
+
+from ..database import get_db_connection
+
+FULL_ADDRESS_RE = re.compile(r'^0x[0-9a-f]{40}$')
+MIN_SUBSTRING_LEN = 3
+MAX_MATCHES = 50
+
+# strategy: 'exact' | 'prefix' | 'substring' | 'too_short' | 'none'
+# truncated: True jika ada lebih dari `limit` alamat yang cocok (hanya `limit` pertama dikembalikan)
+AddressMatch = namedtuple('AddressMatch', ['strategy', 'addresses', 'truncated'], defaults=(False,))
+
+
+_LIKE_SQL = """
+    SELECT address FROM wallet_stats
+    WHERE address LIKE %s
+    ORDER BY address
+    LIMIT %s
+"""
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_addresses_by_prefix(prefix, limit=MAX_MATCHES):
+    """Alamat yang diawali `prefix` (index text_pattern_ops di wallet_stats)."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(_LIKE_SQL, (_escape_like(prefix) + '%', limit))
+    rows = [row[0] for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
+
+
+def search_addresses_by_substring(fragment, limit=MAX_MATCHES):
+    """
+    Alamat yang mengandung `fragment` (index trigram GIN di wallet_stats;
+    tanpa pg_trgm query yang sama tetap benar, hanya berupa scan tabel).
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(_LIKE_SQL, ('%' + _escape_like(fragment) + '%', limit))
+    rows = [row[0] for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
+
+
+def resolve_address_query(query, limit=MAX_MATCHES):
+    """
+    Ubah teks pencarian wallet menjadi daftar alamat konkret dengan strategi termurah:
+    alamat 0x lengkap → exact (tanpa query), awalan 0x → prefix, potongan lain
+    minimal MIN_SUBSTRING_LEN karakter → substring (ber-index jika pg_trgm ada).
+    Potongan yang lebih pendek → 'too_short' tanpa query.
+    """
+    q = (query or '').strip().lower()
+    if not q:
+        return AddressMatch('none', [])
+    if FULL_ADDRESS_RE.match(q):
+        return AddressMatch('exact', [q])
+    if q.startswith('0x') or '0x'.startswith(q):
+        strategy, search = 'prefix', search_addresses_by_prefix
+    elif len(q) < MIN_SUBSTRING_LEN:
+        return AddressMatch('too_short', [])
+    else:
+        strategy, search = 'substring', search_addresses_by_substring
+    # Ambil satu baris lebih untuk mendeteksi hasil yang terpotong
+    addresses = search(q, limit + 1)
+    return AddressMatch(strategy, addresses[:limit], len(addresses) > limit)
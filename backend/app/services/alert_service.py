@@ -1,30 +1,118 @@
+import hashlib
 import json
+import os
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import psycopg2.extras
+
 from ..database import get_db_connection
+from .detectors import ALERT_KEYS
+
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 1000))
+
+_INSERT_SQL = """
+    INSERT INTO alerts (wallet_address, detector_name, payload, fingerprint)
+    VALUES %s
+    ON CONFLICT (wallet_address, detector_name, fingerprint) DO NOTHING
+    RETURNING 1
+"""
+
+
+def _epoch(ts):
+    # TIMESTAMP tanpa zona di database = UTC (sama dengan EXTRACT(EPOCH FROM ...))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def normalize_payload(payload):
+    """Payload siap JSON: datetime → epoch detik (float), Decimal → float."""
+    normalized = {}
+    for key, value in payload.items():
+        if isinstance(value, datetime):
+            value = _epoch(value)
+        elif isinstance(value, date):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        normalized[key] = value
+    return normalized
+
+
+def _key_value(value):
+    # Angka diformat tetap agar fingerprint sama dengan backfill SQL (numeric(20,6))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{float(value):.6f}"
+    return str(value)
+
+
+def alert_fingerprint(payload, key):
+    """
+    md5 dari field identitas kejadian (`key`, lihat register_detector) pada payload
+    yang sudah dinormalisasi, sama dengan backfill SQL di migrasi 0014.
+    """
+    if not key:
+        raise ValueError("Fingerprint alert butuh key detektor (register_detector(key=...))")
+    identity = '|'.join(_key_value(payload.get(field)) for field in key)
+    return hashlib.md5(identity.encode('utf-8')).hexdigest()
+
+
+class AlertSink:
+    """
+    Penampung alert: di-dedup lewat fingerprint lalu ditulis per batch dengan satu
+    INSERT ... ON CONFLICT DO NOTHING di koneksi pemanggil. Unique index
+    (wallet_address, detector_name, fingerprint) yang menjamin tidak ada duplikat,
+    juga antar proses. Commit diserahkan ke pemanggil.
+    """
+
+    def __init__(self, conn, batch_size=ALERT_BATCH_SIZE, keys=None):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.keys = ALERT_KEYS if keys is None else keys
+        self.inserted = 0
+        self.duplicates = 0
+        self._buffer = {}
+
+    def add(self, wallet, detector, payload):
+        """Tambahkan alert; detektor tanpa key terdaftar ditolak (ValueError)."""
+        payload = normalize_payload(payload)
+        fingerprint = alert_fingerprint(payload, self.keys.get(detector))
+        row_key = (wallet, detector, fingerprint)
+        if row_key in self._buffer:
+            self.duplicates += 1
+        else:
+            self._buffer[row_key] = payload
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return 0
+        cur = self.conn.cursor()
+        rows = psycopg2.extras.execute_values(
+            cur, _INSERT_SQL,
+            [(wallet, detector, json.dumps(payload, default=str), fingerprint)
+             for (wallet, detector, fingerprint), payload in self._buffer.items()],
+            page_size=self.batch_size, fetch=True
+        )
+        cur.close()
+        inserted = len(rows)
+        self.inserted += inserted
+        self.duplicates += len(self._buffer) - inserted
+        self._buffer.clear()
+        return inserted
+
+    def stats(self):
+        return {"inserted": self.inserted, "duplicates": self.duplicates}
+
 
 def save_alert(wallet, detector, payload):
+    """Simpan satu alert (diabaikan jika kejadian yang sama sudah tersimpan)."""
     conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO alerts(wallet_address, detector_name, payload)
-        VALUES (%s, %s, %s)
-    """, (wallet, detector, json.dumps(payload)))
+    sink = AlertSink(conn)
+    sink.add(wallet, detector, payload)
+    sink.flush()
     conn.commit()
-    cur.close()
     conn.close()
-    
-def alert_exists(conn, wallet_address, detector_name, timestamp):
-    """
-    Cek apakah alert dengan wallet, nama detektor, dan timestamp yang sama
-    sudah ada di tabel alerts.
-    """
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT 1
-        FROM alerts
-        WHERE wallet_address = %s
-          AND detector_name = %s
-          AND (payload->>'timestamp')::float = %s
-    """, (wallet_address, detector_name, timestamp))
-    exists = cur.fetchone() is not None
-    cur.close()
-    return exists
+    return sink.inserted == 1
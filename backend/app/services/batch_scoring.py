@@ -0,0 +1,154 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2.extras
+
+from ..database import get_db_connection
+from .features import build_feature_matrix_with_order
+from .inference import predict
+
+SCORE_CHUNK_ROWS = int(os.getenv("SCORE_CHUNK_ROWS", 50000))       # baris per panggilan predict
+SCORE_WALLETS_PER_QUERY = int(os.getenv("SCORE_WALLETS_PER_QUERY", 200))
+
+# Wallet konteks sebuah transaksi: endpoint yang dipantau (wallet_history), sender lebih dulu.
+# Fitur dihitung atas riwayat wallet konteks, sama seperti saat fetch_and_analyze_wallet.
+CONTEXT_WALLET_SQL = """
+    CASE
+        WHEN EXISTS (SELECT 1 FROM wallet_history WHERE address = t.sender) THEN t.sender
+        WHEN EXISTS (SELECT 1 FROM wallet_history WHERE address = t.receiver) THEN t.receiver
+        ELSE t.sender
+    END
+"""
+
+_CONTEXT_WALLETS_SQL = f"""
+    SELECT DISTINCT {CONTEXT_WALLET_SQL} AS wallet
+    FROM transactions t
+    {{where}}
+"""
+
+_HISTORY_SQL = f"""
+    SELECT t.tx_hash, t.sender, t.receiver, t.value, t.timestamp,
+           t.is_anomaly IS NULL AS pending,
+           {CONTEXT_WALLET_SQL} AS context
+    FROM transactions t
+    WHERE t.sender = ANY(%s) OR t.receiver = ANY(%s)
+"""
+
+_UPDATE_SQL = """
+    UPDATE transactions AS t
+    SET is_anomaly = v.flag, anomaly_model_version = v.model_version
+    FROM (VALUES %s) AS v(tx_hash, flag, model_version)
+    WHERE t.tx_hash = v.tx_hash {only_pending}
+"""
+
+
+def _context_wallets(cur, rescore_all):
+    where = "" if rescore_all else "WHERE t.is_anomaly IS NULL"
+    cur.execute(_CONTEXT_WALLETS_SQL.format(where=where))
+    return [row[0] for row in cur.fetchall() if row[0]]
+
+
+def load_wallet_frames(cur, wallets):
+    """Riwayat semua wallet di `wallets` dalam satu query, dipecah per wallet."""
+    cur.execute(_HISTORY_SQL, (wallets, wallets))
+    rows = cur.fetchall()
+    if not rows:
+        return
+    df = pd.DataFrame(rows, columns=['tx_hash', 'sender', 'receiver', 'value',
+                                     'timestamp', 'pending', 'context'])
+    df['value'] = df['value'].astype('float64')
+    batch = set(wallets)
+    # Satu baris bisa masuk riwayat dua wallet (sender dan receiver sama-sama di batch)
+    long = pd.concat([
+        df[df['sender'].isin(batch)].assign(wallet=lambda f: f['sender']),
+        df[df['receiver'].isin(batch)].assign(wallet=lambda f: f['receiver']),
+    ], ignore_index=True).drop_duplicates(['wallet', 'tx_hash'])
+    for wallet, frame in long.groupby('wallet', sort=False):
+        yield wallet, frame.reset_index(drop=True)
+
+
+def context_features(wallet, frame, rescore_all):
+    """Fitur + tx_hash baris yang harus diberi skor dalam konteks `wallet` (matriks float64, array hash)."""
+    features, order = build_feature_matrix_with_order(frame)
+    ordered = frame.iloc[order]
+    mask = ordered['context'].to_numpy() == wallet
+    if not rescore_all:
+        mask = mask & ordered['pending'].to_numpy(dtype=bool)
+    return features.to_numpy(dtype='float64')[mask], ordered['tx_hash'].to_numpy()[mask]
+
+
+def score_matrices(matrices):
+    """Satu transform + satu predict untuk semua matriks fitur. Mengembalikan (flags, versi model)."""
+    predictions, version = predict('anomaly', np.vstack(matrices))
+    return predictions == -1, version
+
+
+def write_flags(cur, tx_hashes, flags, model_version, only_pending=False, page_size=5000):
+    """Tulis flag anomaly + versi model untuk banyak transaksi dengan UPDATE ... FROM (VALUES ...)."""
+    sql = _UPDATE_SQL.format(only_pending="AND t.is_anomaly IS NULL" if only_pending else "")
+    psycopg2.extras.execute_values(
+        cur, sql,
+        [(tx_hash, bool(flag), model_version) for tx_hash, flag in zip(tx_hashes, flags)],
+        template="(%s, %s, %s)", page_size=page_size
+    )
+
+
+def score_transactions(wallets=None, rescore_all=False, chunk_rows=SCORE_CHUNK_ROWS, echo=None):
+    """
+    Beri skor anomaly lintas wallet secara batch. Default: semua baris is_anomaly IS NULL;
+    `rescore_all` menilai ulang seluruh tabel (mis. setelah model diganti).
+    Fitur dibangun per wallet konteks, lalu diprediksi per potongan `chunk_rows`
+    baris dalam satu panggilan predict dan ditulis balik secara bulk (commit per potongan).
+    Mengembalikan dict jumlah wallet, baris, anomaly, dan durasi.
+    """
+    started = time.monotonic()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    if wallets is None:
+        wallets = _context_wallets(cur, rescore_all)
+        conn.commit()
+
+    stats = {"wallets": len(wallets), "scored": 0, "anomalies": 0, "predict_calls": 0}
+    matrices, hashes, buffered = [], [], 0
+
+    def flush():
+        nonlocal matrices, hashes, buffered
+        if not buffered:
+            return
+        flags, version = score_matrices(matrices)
+        tx_hashes = np.concatenate(hashes)
+        write_flags(cur, tx_hashes, flags, version, only_pending=not rescore_all)
+        conn.commit()
+        stats["scored"] += len(tx_hashes)
+        stats["anomalies"] += int(flags.sum())
+        stats["predict_calls"] += 1
+        if echo:
+            echo(f"  {stats['scored']} baris diberi skor ({stats['anomalies']} anomaly)")
+        matrices, hashes, buffered = [], [], 0
+
+    try:
+        for i in range(0, len(wallets), SCORE_WALLETS_PER_QUERY):
+            batch = wallets[i:i + SCORE_WALLETS_PER_QUERY]
+            for wallet, frame in load_wallet_frames(cur, batch):
+                # Setiap baris punya tepat satu wallet konteks, jadi tidak dinilai dua kali
+                matrix, tx_hashes = context_features(wallet, frame, rescore_all)
+                if len(tx_hashes) == 0:
+                    continue
+                matrices.append(matrix)
+                hashes.append(tx_hashes)
+                buffered += len(tx_hashes)
+                if buffered >= chunk_rows:
+                    flush()
+            conn.rollback()  # tutup transaksi baca antar batch wallet
+        flush()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    stats["elapsed"] = round(time.monotonic() - started, 2)
+    return stats
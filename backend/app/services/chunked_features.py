@@ -0,0 +1,258 @@
+import math
+import os
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from ..database import get_db_connection
+from .features import FEATURE_COLUMNS
+
+FEATURE_CHUNK_ROWS = int(os.getenv("FEATURE_CHUNK_ROWS", 50000))
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Urutan sama dengan sort (sender, timestamp) di build_feature_matrix; COLLATE "C"
+# supaya urutan string sama dengan pandas (per code point), NULL di akhir.
+_STREAM_SQL = """
+    SELECT tx_hash, sender, receiver, value::float8 AS value, timestamp
+    FROM transactions
+    WHERE sender = %s OR receiver = %s
+    ORDER BY sender COLLATE "C" NULLS LAST, timestamp, tx_hash
+"""
+
+
+class QuantileSketch:
+    """
+    Sketch kuantil mergeable ala DDSketch untuk nilai >= 0: bucket logaritmik
+    dengan galat relatif SKETCH_RELATIVE_ACCURACY, memori O(jumlah bucket terisi).
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero_count = 0
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        index = self.bucket_index(values)
+        positive = index[index > -np.inf]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            index, counts = np.unique(positive.astype('int64'), return_counts=True)
+            for i, c in zip(index.tolist(), counts.tolist()):
+                self.buckets[i] = self.buckets.get(i, 0) + c
+
+    def bucket_index(self, values):
+        """Indeks bucket per nilai (float); nilai <= 0 masuk bucket nol (-inf)."""
+        values = np.asarray(values, dtype='float64')
+        index = np.full(len(values), -np.inf)
+        positive = values > 0
+        index[positive] = np.ceil(np.log(values[positive]) / self._log_gamma)
+        return index
+
+    def merge(self, other):
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for i, c in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + c
+        return self
+
+    def quantile_bucket(self, q):
+        """Indeks bucket yang memuat kuantil q (-inf = bucket nol, nan jika kosong)."""
+        if not self.count:
+            return float('nan')
+        rank = q * (self.count - 1)
+        running = self.zero_count
+        if rank < running:
+            return -np.inf
+        for i in sorted(self.buckets):
+            running += self.buckets[i]
+            if rank < running:
+                return i
+        return max(self.buckets)
+
+    def quantile(self, q):
+        i = self.quantile_bucket(q)
+        if np.isnan(i):
+            return i
+        if i == -np.inf:
+            return 0.0
+        return 2 * self.gamma ** i / (self.gamma + 1)
+
+    def above_quantile(self, values, q):
+        """
+        Mask nilai di atas kuantil q dalam satuan bucket: hanya bucket di atas bucket
+        kuantil yang dihitung, jadi nilai yang sama persis dengan titik potong (umum
+        untuk nominal bulat) tidak pernah lolos, sama seperti `value > quantile` eksak.
+        """
+        return self.bucket_index(values) > self.quantile_bucket(q)
+
+
+class HashCounter:
+    """Hitung kemunculan key (hash uint64) dalam array terurut: 16 byte per key unik."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype='uint64')
+        self.counts = np.empty(0, dtype='int64')
+
+    def add(self, hashes):
+        keys, counts = np.unique(hashes, return_counts=True)
+        merged = np.concatenate([self.keys, keys])
+        weights = np.concatenate([self.counts, counts])
+        order = np.argsort(merged, kind='stable')
+        merged, weights = merged[order], weights[order]
+        starts = np.flatnonzero(np.r_[True, merged[1:] != merged[:-1]])
+        self.keys = merged[starts]
+        self.counts = np.add.reduceat(weights, starts) if len(weights) else weights
+
+    def lookup(self, hashes):
+        if not len(self.keys):
+            return np.zeros(len(hashes), dtype='int64')
+        pos = np.clip(np.searchsorted(self.keys, hashes), 0, len(self.keys) - 1)
+        return np.where(self.keys[pos] == hashes, self.counts[pos], 0)
+
+
+def _hash(frame, columns):
+    return pd.util.hash_pandas_object(frame[columns], index=False).to_numpy()
+
+
+class WalletStreamStats:
+    """Statistik global riwayat wallet hasil pass pertama (semua bisa di-merge)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.value = QuantileSketch()
+        self.inter_time = QuantileSketch()
+        self.sender = HashCounter()
+        self.receiver = HashCounter()
+        self.pair = HashCounter()
+        self.sender_value = HashCounter()
+
+
+def _stream(conn, wallet_address, chunk_rows):
+    """Riwayat wallet per potongan DataFrame lewat server-side (named) cursor."""
+    cur = conn.cursor(name=f"features_{uuid.uuid4().hex[:12]}")
+    cur.itersize = chunk_rows
+    try:
+        cur.execute(_STREAM_SQL, (wallet_address, wallet_address))
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            frame = pd.DataFrame(rows, columns=['tx_hash', 'sender', 'receiver', 'value', 'timestamp'])
+            frame['value'] = frame['value'].astype('float64').clip(lower=0)
+            frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+            yield frame
+    finally:
+        cur.close()
+
+
+def _inter_time(frame, carry):
+    """inter_time per sender dalam potongan terurut; `carry` = (sender, timestamp) baris terakhir potongan sebelumnya."""
+    prev_time = frame.groupby('sender', sort=False)['timestamp'].shift(1)
+    if carry is not None and pd.notna(carry[0]) and len(frame) and frame['sender'].iat[0] == carry[0]:
+        prev_time.iat[0] = carry[1]
+    return (frame['timestamp'] - prev_time).dt.total_seconds()
+
+
+def _valid(frame, columns):
+    return frame[columns].notna().all(axis=1).to_numpy()
+
+
+def _lookup(counter, frame, columns, missing):
+    valid = _valid(frame, columns)
+    counts = counter.lookup(_hash(frame, columns)).astype('float64')
+    counts[~valid] = missing
+    return counts
+
+
+def collect_wallet_stats(conn, wallet_address, chunk_rows=FEATURE_CHUNK_ROWS):
+    """Pass pertama: sketch nilai & inter_time dan semua counter, tanpa menyimpan baris."""
+    stats = WalletStreamStats()
+    carry = None
+    for frame in _stream(conn, wallet_address, chunk_rows):
+        stats.rows += len(frame)
+        stats.value.add(frame['value'].to_numpy())
+        stats.inter_time.add(_inter_time(frame, carry).to_numpy())
+        for counter, columns in ((stats.sender, ['sender']), (stats.receiver, ['receiver']),
+                                 (stats.pair, ['sender', 'receiver']),
+                                 (stats.sender_value, ['sender', 'value'])):
+            valid = _valid(frame, columns)
+            counter.add(_hash(frame[valid], columns))
+        carry = (frame['sender'].iat[-1], frame['timestamp'].iat[-1])
+    return stats
+
+
+def iter_wallet_features(wallet_address, chunk_rows=FEATURE_CHUNK_ROWS, conn=None):
+    """
+    Fitur riwayat wallet per potongan dengan memori terbatas (mode out-of-core untuk
+    wallet besar). Dua pass atas server-side cursor: pass pertama mengumpulkan statistik
+    global (bucket kuantil 95% & median lewat sketch, counter lewat hash), pass kedua
+    menghasilkan (tx_hash array, DataFrame FEATURE_COLUMNS) per potongan, urut
+    (sender, timestamp) seperti build_feature_matrix. is_large_global hanya bisa beda dari
+    versi in-memory untuk nilai sebucket dengan kuantil 95% (galat relatif 1%), median
+    inter_time aproksimasi dengan galat yang sama; counter eksak kecuali tabrakan hash 64-bit.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        stats = collect_wallet_stats(conn, wallet_address, chunk_rows)
+        inter_median = stats.inter_time.quantile(0.5)
+
+        carry = None
+        for frame in _stream(conn, wallet_address, chunk_rows):
+            value = frame['value'].to_numpy()
+            hour_angle = (2 * np.pi / 24) * frame['timestamp'].dt.hour.to_numpy(dtype='float64')
+            day_angle = (2 * np.pi / 7) * frame['timestamp'].dt.dayofweek.to_numpy(dtype='float64')
+            inter_time = _inter_time(frame, carry).to_numpy()
+            inter_time = np.where(np.isnan(inter_time), inter_median, inter_time)
+
+            features = pd.DataFrame({
+                'log_value': np.log1p(value),
+                'hour_sin': np.sin(hour_angle),
+                'hour_cos': np.cos(hour_angle),
+                'day_sin': np.sin(day_angle),
+                'day_cos': np.cos(day_angle),
+                'is_large_global': stats.value.above_quantile(value, 0.95).astype('int64'),
+                'sender_tx_count': _lookup(stats.sender, frame, ['sender'], np.nan),
+                'receiver_tx_count': _lookup(stats.receiver, frame, ['receiver'], np.nan),
+                'tx_pair_freq': _lookup(stats.pair, frame, ['sender', 'receiver'], 0),
+                'inter_time': inter_time,
+                'same_value_count': _lookup(stats.sender_value, frame, ['sender', 'value'], np.nan),
+            }, columns=FEATURE_COLUMNS)
+            carry = (frame['sender'].iat[-1], frame['timestamp'].iat[-1])
+            yield frame['tx_hash'].to_numpy(), features
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def profile_chunked_extraction(wallet_address, chunk_rows=FEATURE_CHUNK_ROWS):
+    """Jalankan iter_wallet_features sampai habis dan laporkan baris, potongan, durasi, dan puncak memori."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = chunks = 0
+    try:
+        for tx_hashes, _ in iter_wallet_features(wallet_address, chunk_rows):
+            rows += len(tx_hashes)
+            chunks += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "wallet": wallet_address,
+        "rows": rows,
+        "chunks": chunks,
+        "chunk_rows": chunk_rows,
+        "seconds": round(time.perf_counter() - started, 3),
+        "peak_mb": round(peak / 2 ** 20, 2),
+    }
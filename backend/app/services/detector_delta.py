@@ -0,0 +1,34 @@
+"""Jendela delta bersama untuk detektor bulk (lihat scheduler.run_all_detectors)."""
+
+# Transaksi yang perlu diperiksa per wallet: seluruh riwayat untuk wallet tanpa
+# watermark (since NULL), selain itu hanya yang masuk setelah watermark (index ingested_at).
+# Baris ke diri sendiri muncul dua kali (sent & received), sama seperti query per arah.
+DELTA_CTE = """
+    w AS (
+        SELECT * FROM unnest(%(wallets)s::text[], %(since)s::timestamp[]) AS w(address, since)
+    ),
+    delta AS (
+        SELECT w.address, 'sent' AS direction, t.tx_hash, t.sender, t.receiver, t.value, t.timestamp
+        FROM w JOIN transactions t ON t.sender = w.address
+        WHERE w.since IS NULL
+        UNION ALL
+        SELECT w.address, 'received', t.tx_hash, t.sender, t.receiver, t.value, t.timestamp
+        FROM w JOIN transactions t ON t.receiver = w.address
+        WHERE w.since IS NULL
+        UNION ALL
+        SELECT w.address, 'sent', t.tx_hash, t.sender, t.receiver, t.value, t.timestamp
+        FROM transactions t JOIN w ON t.sender = w.address
+        WHERE t.ingested_at > %(min_since)s AND t.ingested_at > w.since
+        UNION ALL
+        SELECT w.address, 'received', t.tx_hash, t.sender, t.receiver, t.value, t.timestamp
+        FROM transactions t JOIN w ON t.receiver = w.address
+        WHERE t.ingested_at > %(min_since)s AND t.ingested_at > w.since
+    )
+"""
+
+def delta_params(wallets, since):
+    """Parameter DELTA_CTE dari list wallet dan {wallet: since | None}."""
+    wallets = list(wallets)
+    marks = [(since or {}).get(wallet) for wallet in wallets]
+    known = [mark for mark in marks if mark is not None]
+    return {"wallets": wallets, "since": marks, "min_since": min(known) if known else None}
@@ -0,0 +1,116 @@
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+
+import psycopg2.extras
+
+from ..database import get_db_connection, collect_query_stats
+from .detectors import detector_names, get_bulk_detector
+
+_FIELDS = ('calls', 'wallets', 'wall_time', 'db_time', 'queries', 'rows_read', 'alerts')
+
+
+class DetectorMetrics:
+    """
+    Akumulator per detektor untuk satu run (atau satu shard): waktu wall, waktu DB,
+    jumlah query, baris yang dibaca, dan alert yang dihasilkan. Query dihitung lewat
+    InstrumentedCursor, termasuk koneksi yang dibuka sendiri oleh detektor per wallet.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _get(self, name):
+        if name not in self._metrics:
+            self._metrics[name] = {field: 0 for field in _FIELDS}
+        return self._metrics[name]
+
+    @contextmanager
+    def track(self, name, wallets=0):
+        # Dicatat juga saat detektor gagal: waktu & query sampai titik error tetap terlihat
+        metrics = self._get(name)
+        started = time.perf_counter()
+        with collect_query_stats() as stats:
+            try:
+                yield metrics
+            finally:
+                metrics['calls'] += 1
+                metrics['wallets'] += wallets
+                metrics['wall_time'] += time.perf_counter() - started
+                metrics['db_time'] += stats.db_time
+                metrics['queries'] += stats.queries
+                metrics['rows_read'] += stats.rows
+
+    def add_alerts(self, name, count):
+        self._get(name)['alerts'] += count
+
+    def as_dict(self):
+        return {name: {field: round(value, 4) if isinstance(value, float) else value
+                       for field, value in metrics.items()}
+                for name, metrics in self._metrics.items()}
+
+
+def save_detector_metrics(cur, run_id, shard, metrics):
+    """Simpan hasil DetectorMetrics.as_dict() untuk satu shard run. Commit oleh pemanggil."""
+    if not metrics:
+        return
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO detector_metrics
+            (run_id, shard, detector_name, calls, wallets, wall_time, db_time,
+             queries, rows_read, alerts)
+        VALUES %s
+    """, [(run_id, shard, name, *(m[field] for field in _FIELDS)) for name, m in metrics.items()])
+
+
+def list_detector_metrics(runs=10, detector=None):
+    """Metrik per run per detektor (dijumlah antar shard) untuk `runs` run terakhir."""
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("""
+        SELECT r.id AS run_id, r.started_at, r.status, m.detector_name,
+               SUM(m.calls) AS calls, SUM(m.wallets) AS wallets,
+               SUM(m.wall_time) AS wall_time, MAX(m.wall_time) AS slowest_shard_time,
+               SUM(m.db_time) AS db_time, SUM(m.queries) AS queries,
+               SUM(m.rows_read) AS rows_read, SUM(m.alerts) AS alerts
+        FROM (SELECT id, started_at, status FROM detector_runs
+              ORDER BY started_at DESC LIMIT %s) r
+        JOIN detector_metrics m ON m.run_id = r.id
+        WHERE %s::text IS NULL OR m.detector_name = %s
+        GROUP BY r.id, r.started_at, r.status, m.detector_name
+        ORDER BY r.started_at DESC, wall_time DESC
+    """, (runs, detector, detector))
+    rows = [dict(row) for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
+
+
+def profile_detector(name, wallet, limit=30, sort='cumulative', output=None):
+    """
+    Jalankan satu detektor untuk satu wallet (riwayat penuh) di bawah cProfile.
+    Mengembalikan metrik + ringkasan pstats; `output` menyimpan file .prof mentah.
+    """
+    if name not in detector_names():
+        raise KeyError(name)
+    conn = get_db_connection()
+    metrics = DetectorMetrics()
+    profiler = cProfile.Profile()
+    try:
+        with metrics.track(name, wallets=1):
+            profiler.enable()
+            try:
+                results = get_bulk_detector(name)([wallet], conn)
+            finally:
+                profiler.disable()
+        metrics.add_alerts(name, len(results.get(wallet, [])))
+    finally:
+        conn.rollback()
+        conn.close()
+
+    if output:
+        profiler.dump_stats(output)
+    buf = io.StringIO()
+    pstats.Stats(profiler, stream=buf).strip_dirs().sort_stats(sort).print_stats(limit)
+    return {"detector": name, "wallet": wallet, **metrics.as_dict()[name], "profile": buf.getvalue()}
@@ -1,24 +1,117 @@
+from itertools import groupby
+
 from .transaction_service import (
-    detect_large_tx_for_wallet, 
+    detect_large_tx_for_wallet,
     get_hourly_transaction_count,
-    detect_recurring_transactions_raw,
+    get_wallet_timestamps,
+    classify_recurring_pattern,
+    HOURLY_TX_SPIKE_THRESHOLD,
 )
+from .detector_delta import DELTA_CTE, delta_params
+from .large_tx import first_large_tx_bulk
+
+# nama → fn(wallet_address, conn) -> [alert]
 DETECTORS = {}
+# nama → fn(wallets, conn, since=None) -> {wallet: [alert]}; satu query/pass untuk sekumpulan wallet
+BULK_DETECTORS = {}
+# nama → field payload yang mengidentifikasi kejadian (dasar fingerprint dedup alert)
+ALERT_KEYS = {}
+
+# Lonjakan per jam: hanya bucket jam yang tersentuh delta dihitung ulang (penuh)
+_HOURLY_BULK_SQL = "WITH" + DELTA_CTE + """,
+    buckets AS (
+        SELECT DISTINCT address, direction, DATE_TRUNC('hour', timestamp) AS hour_bucket
+        FROM delta
+    )
+    SELECT address, direction, hour_bucket, cnt FROM (
+        SELECT b.address, b.direction, b.hour_bucket, COUNT(*) AS cnt
+        FROM buckets b
+        JOIN transactions t ON t.sender = b.address
+         AND t.timestamp >= b.hour_bucket AND t.timestamp < b.hour_bucket + INTERVAL '1 hour'
+        WHERE b.direction = 'sent'
+        GROUP BY b.address, b.direction, b.hour_bucket
+        HAVING COUNT(*) > %(threshold)s
+        UNION ALL
+        SELECT b.address, b.direction, b.hour_bucket, COUNT(*)
+        FROM buckets b
+        JOIN transactions t ON t.receiver = b.address
+         AND t.timestamp >= b.hour_bucket AND t.timestamp < b.hour_bucket + INTERVAL '1 hour'
+        WHERE b.direction = 'received'
+        GROUP BY b.address, b.direction, b.hour_bucket
+        HAVING COUNT(*) > %(threshold)s
+    ) spikes
+    ORDER BY address, direction = 'received', hour_bucket
+"""
+
+# Seluruh timestamp wallet yang punya delta; transaksi ke diri sendiri dihitung sekali,
+# sama seperti sender = w OR receiver = w
+_RECURRING_BULK_SQL = "WITH" + DELTA_CTE + """,
+    changed AS (SELECT DISTINCT address FROM delta)
+    SELECT address, timestamp FROM (
+        SELECT c.address, t.timestamp
+        FROM changed c JOIN transactions t ON t.sender = c.address
+        UNION ALL
+        SELECT c.address, t.timestamp
+        FROM changed c JOIN transactions t ON t.receiver = c.address
+        WHERE t.sender IS DISTINCT FROM t.receiver
+    ) wallet_tx
+    ORDER BY address, timestamp
+"""
 
-def register_detector(name):
+def register_detector(name, bulk=False, key=None):
+    """
+    Daftarkan detektor per wallet, atau versi bulk-nya dengan `bulk=True`.
+    Detektor yang hanya punya salah satu versi tetap bisa dipanggil dua-duanya
+    lewat adapter (lihat get_detector / get_bulk_detector).
+    `key`: field payload pembentuk fingerprint alert; wajib di registrasi pertama sebuah
+    nama detektor (fallback seluruh payload tidak cocok dengan backfill SQL migrasi 0014).
+    """
+    if not key and name not in ALERT_KEYS:
+        raise ValueError(f"Detektor {name} butuh key= (field identitas kejadian untuk dedup alert)")
     def deco(fn):
-        DETECTORS[name] = fn
+        (BULK_DETECTORS if bulk else DETECTORS)[name] = fn
+        if key:
+            ALERT_KEYS[name] = tuple(key)
         return fn
     return deco
 
-@register_detector('large_tx')
+def detector_names():
+    return list(dict.fromkeys([*DETECTORS, *BULK_DETECTORS]))
+
+def get_detector(name):
+    """Fungsi per wallet; untuk detektor bulk-only dibungkus sebagai bulk([wallet])."""
+    if name in DETECTORS:
+        return DETECTORS[name]
+    bulk_fn = BULK_DETECTORS[name]
+    return lambda wallet_address, conn: bulk_fn([wallet_address], conn).get(wallet_address, [])
+
+def get_bulk_detector(name):
+    """Fungsi bulk; detektor yang hanya per wallet dijalankan satu per satu (adapter)."""
+    if name in BULK_DETECTORS:
+        return BULK_DETECTORS[name]
+    fn = DETECTORS[name]
+    # Tanpa versi bulk tidak ada jendela delta: riwayat penuh diperiksa ulang
+    return lambda wallets, conn, since=None: {wallet: fn(wallet, conn) for wallet in wallets}
+
+@register_detector('large_tx', key=('sender', 'receiver', 'timestamp'))
 def detect_large_tx(wallet_address, conn):
-    # gunakan detect_large_tx_for_wallet yang sudah ada
-    anomalies = detect_large_tx_for_wallet(wallet_address)
-    return [{'detector': 'large_tx', 'data': {'sender': s, 'receiver': r, 'value': v, 'timestamp': ts}} 
+    anomalies = detect_large_tx_for_wallet(wallet_address, conn)
+    return [{'detector': 'large_tx', 'data': {'sender': s, 'receiver': r, 'value': v, 'timestamp': ts}}
             for s,r,v,ts in anomalies]
-    
-@register_detector('hourly_tx_spike')
+
+@register_detector('large_tx', bulk=True)
+def detect_large_tx_bulk(wallets, conn, since=None):
+    """
+    Sama dengan detect_large_tx untuk banyak wallet sekaligus (lihat large_tx.first_large_tx_bulk).
+    Alert hanya keluar jika transfer besar pertama pasangan itu ada di delta.
+    """
+    rows = first_large_tx_bulk(wallets, conn, since)
+    return {wallet: [{'detector': 'large_tx',
+                      'data': {'sender': s, 'receiver': r, 'value': v, 'timestamp': ts}}
+                     for s, r, v, ts in anomalies]
+            for wallet, anomalies in rows.items()}
+
+@register_detector('hourly_tx_spike', key=('direction', 'hour_bucket'))
 def detect_hourly_tx_spike(wallet_address, conn):
     """
     Deteksi jika dalam satu jam wallet mengirim atau menerima
@@ -34,7 +127,8 @@ def detect_hourly_tx_spike(wallet_address, conn):
             'data': {
                 'direction': 'sent',
                 'hour_bucket': hour_bucket.isoformat(),
-                'count': count
+                'count': count,
+                'timestamp': hour_bucket
             }
         })
 
@@ -45,24 +139,79 @@ def detect_hourly_tx_spike(wallet_address, conn):
             'data': {
                 'direction': 'received',
                 'hour_bucket': hour_bucket.isoformat(),
-                'count': count
+                'count': count,
+                'timestamp': hour_bucket
             }
         })
 
     return alerts
 
-@register_detector('recurring_tx')
+@register_detector('hourly_tx_spike', bulk=True)
+def detect_hourly_tx_spike_bulk(wallets, conn, since=None):
+    """
+    Lonjakan per jam untuk banyak wallet dengan satu GROUP BY address, hour.
+    Hanya bucket jam yang tersentuh delta yang dihitung ulang (penuh, termasuk
+    transaksi lama di jam yang sama).
+    """
+    cur = conn.cursor()
+    cur.execute(_HOURLY_BULK_SQL, {**delta_params(wallets, since), "threshold": HOURLY_TX_SPIKE_THRESHOLD})
+    rows = cur.fetchall()
+    cur.close()
+
+    results = {wallet: [] for wallet in wallets}
+    for address, direction, hour_bucket, count in rows:
+        results[address].append({
+            'detector': 'hourly_tx_spike',
+            'data': {
+                'direction': direction,
+                'hour_bucket': hour_bucket.isoformat(),
+                'count': count,
+                'timestamp': hour_bucket
+            }
+        })
+    return results
+
+@register_detector('recurring_tx', key=('pattern',))
 def detect_recurring_tx(wallet_address, conn):
     """
     Deteksi pola transaksi rutin (harian, mingguan, bulanan).
     """
-    pattern = detect_recurring_transactions_raw(wallet_address)
+    timestamps = get_wallet_timestamps(wallet_address)
+    pattern = classify_recurring_pattern(timestamps)
     if not pattern:
         return []
     return [{
         'detector': 'recurring_tx',
         'data': {
             'pattern': pattern,
-            'wallet': wallet_address
+            'wallet': wallet_address,
+            'timestamp': timestamps[-1]
         }
-    }]
\ No newline at end of file
+    }]
+
+@register_detector('recurring_tx', bulk=True)
+def detect_recurring_tx_bulk(wallets, conn, since=None):
+    """
+    Pola transaksi rutin untuk banyak wallet: satu query timestamp, dikelompokkan di memori.
+    Pola bergantung pada seluruh riwayat, jadi delta hanya menentukan wallet mana yang
+    dihitung ulang.
+    """
+    cur = conn.cursor()
+    cur.execute(_RECURRING_BULK_SQL, delta_params(wallets, since))
+    rows = cur.fetchall()
+    cur.close()
+
+    results = {wallet: [] for wallet in wallets}
+    for address, group in groupby(rows, key=lambda row: row[0]):
+        timestamps = [ts for _, ts in group]
+        pattern = classify_recurring_pattern(timestamps)
+        if pattern:
+            results[address].append({
+                'detector': 'recurring_tx',
+                'data': {
+                    'pattern': pattern,
+                    'wallet': address,
+                    'timestamp': timestamps[-1]
+                }
+            })
+    return results
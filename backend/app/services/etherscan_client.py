@@ -0,0 +1,76 @@
+import os
+import time
+
+import requests
+
+ETHERSCAN_API_URL = os.getenv("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
+ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
+
+# Etherscan hanya mengembalikan maksimal 10.000 hasil per jendela (page * offset <= 10000)
+ETHERSCAN_PAGE_SIZE = 10000
+END_BLOCK = 99999999
+
+
+class EtherscanError(Exception):
+    """Respons Etherscan bukan status sukses (rate limit, key salah, dll.)."""
+
+
+def _is_empty_result(data):
+    # Etherscan memakai status "0" juga untuk "tidak ada transaksi"
+    return data.get("status") == "0" and data.get("message", "").startswith("No transactions found")
+
+
+def fetch_txlist(address, start_block=0, api_key=None, session=None, timeout=30,
+                 deadline=None, api_url=None):
+    """
+    Ambil semua transaksi normal `address` mulai dari `start_block` (urut naik).
+    Jika hasil mencapai batas jendela 10k, permintaan diulang dari blok terakhir
+    yang diterima sampai tersusul. Mengembalikan (list tx Etherscan, blok tertinggi | None).
+    `deadline` (time.monotonic) membatasi total waktu untuk satu wallet.
+    """
+    http = session or requests
+    api_key = api_key or ETHERSCAN_API_KEY
+    api_url = api_url or ETHERSCAN_API_URL
+    results = []
+    seen = set()
+    block = start_block
+    max_block = None
+
+    while True:
+        if deadline is not None and time.monotonic() > deadline:
+            raise EtherscanError(f"Timeout sinkronisasi {address} (blok {block})")
+        response = http.get(api_url, params={
+            "module": "account",
+            "action": "txlist",
+            "address": address,
+            "startblock": block,
+            "endblock": END_BLOCK,
+            "page": 1,
+            "offset": ETHERSCAN_PAGE_SIZE,
+            "sort": "asc",
+            "apikey": api_key,
+        }, timeout=timeout)
+        data = response.json()
+
+        if _is_empty_result(data):
+            break
+        if data.get("status") != "1" or "result" not in data:
+            raise EtherscanError(f"{data.get('message')}: {data.get('result')}")
+
+        batch = data["result"]
+        for tx in batch:
+            if tx["hash"] not in seen:
+                seen.add(tx["hash"])
+                results.append(tx)
+        if batch:
+            max_block = max(max_block or 0, int(batch[-1]["blockNumber"]))
+
+        if len(batch) < ETHERSCAN_PAGE_SIZE:
+            break
+        # Blok terakhir mungkin terpotong, jadi diminta ulang; duplikat dibuang lewat `seen`
+        last_block = int(batch[-1]["blockNumber"])
+        if last_block == block:
+            break  # satu blok berisi >= 10k tx milik wallet: tidak bisa dipaging lebih jauh
+        block = last_block
+
+    return results, max_block
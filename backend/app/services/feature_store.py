@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pandas as pd
+import psycopg2.extras
+
+from .batch_scoring import load_wallet_frames
+from .chunked_features import iter_wallet_features
+from .features import FEATURE_COLUMNS, build_feature_matrix
+
+# Naikkan jika definisi fitur berubah supaya semua vektor lama dihitung ulang
+FEATURE_SET_VERSION = 1
+
+# Wallet dengan riwayat sebesar ini dihitung lewat mode chunked (memori terbatas)
+FEATURE_CHUNKED_MIN_TX = int(os.getenv("FEATURE_CHUNKED_MIN_TX", 200000))
+
+_LOOKUP_SQL = """
+    SELECT s.address,
+           s.inbound_tx + s.outbound_tx AS tx_count,
+           s.last_tx_hash,
+           s.last_tx_at,
+           f.features
+    FROM wallet_stats s
+    LEFT JOIN wallet_features f
+           ON f.address = s.address
+          AND f.feature_version = %(version)s
+          AND f.tx_count = s.inbound_tx + s.outbound_tx
+          AND f.last_tx_hash IS NOT DISTINCT FROM s.last_tx_hash
+    WHERE s.address = ANY(%(wallets)s)
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO wallet_features
+        (address, feature_version, features, tx_count, last_tx_hash, last_tx_at, computed_at)
+    VALUES %s
+    ON CONFLICT (address) DO UPDATE SET
+        feature_version = EXCLUDED.feature_version,
+        features        = EXCLUDED.features,
+        tx_count        = EXCLUDED.tx_count,
+        last_tx_hash    = EXCLUDED.last_tx_hash,
+        last_tx_at      = EXCLUDED.last_tx_at,
+        computed_at     = NOW()
+"""
+
+
+def wallet_feature_vector(frame):
+    """Vektor fitur wallet = baris pertama matriks fitur (urut sender, timestamp), NaN diisi median."""
+    frame = frame.sort_values(['timestamp', 'tx_hash'])
+    return build_feature_matrix(frame, fill_missing=True).to_numpy(dtype='float64')[0]
+
+
+def _chunked_feature_vector(cur, wallet_address):
+    """Vektor fitur wallet besar lewat iter_wallet_features: cukup potongan pertama pass kedua."""
+    chunks = iter_wallet_features(wallet_address, conn=cur.connection)
+    try:
+        _, features = next(chunks)
+    except StopIteration:
+        return None
+    finally:
+        chunks.close()
+    # Median potongan pertama sebagai pengganti median seluruh kolom (aproksimasi)
+    return features.fillna(features.median()).to_numpy(dtype='float64')[0]
+
+
+def get_wallet_feature_vectors(cur, wallets):
+    """
+    Vektor fitur untuk banyak wallet: dict alamat → ndarray (wallet tanpa transaksi tidak ada).
+    Cache hit jika watermark tersimpan (jumlah tx + tx_hash terakhir) sama dengan wallet_stats;
+    selain itu riwayat dimuat ulang, dihitung, dan disimpan. Memakai `cur` pemanggil sehingga
+    transaksi yang baru di-ingest (belum commit) ikut terlihat. Commit diserahkan ke pemanggil.
+    """
+    if not wallets:
+        return {}
+    cur.execute(_LOOKUP_SQL, {"version": FEATURE_SET_VERSION, "wallets": list(wallets)})
+    vectors = {}
+    watermarks = {}
+    for address, tx_count, last_tx_hash, last_tx_at, features in cur.fetchall():
+        if features is not None:
+            vectors[address] = np.asarray(features, dtype='float64')
+        else:
+            watermarks[address] = (tx_count, last_tx_hash, last_tx_at)
+
+    # Wallet tanpa baris wallet_stats tidak bisa divalidasi: selalu dihitung, tidak disimpan
+    misses = [wallet for wallet in wallets if wallet not in vectors]
+    if not misses:
+        return vectors
+
+    whales = {wallet for wallet in misses
+              if wallet in watermarks and watermarks[wallet][0] >= FEATURE_CHUNKED_MIN_TX}
+    computed = [(wallet, _chunked_feature_vector(cur, wallet)) for wallet in sorted(whales)]
+    computed += [(wallet, wallet_feature_vector(frame))
+                 for wallet, frame in load_wallet_frames(cur, [w for w in misses if w not in whales])]
+
+    rows = []
+    for wallet, vector in computed:
+        if vector is None:
+            continue
+        vectors[wallet] = vector
+        if wallet in watermarks:
+            tx_count, last_tx_hash, last_tx_at = watermarks[wallet]
+            rows.append((wallet, FEATURE_SET_VERSION, [float(v) for v in vector],
+                         tx_count, last_tx_hash, last_tx_at))
+    if rows:
+        psycopg2.extras.execute_values(cur, _UPSERT_SQL, rows,
+                                       template="(%s, %s, %s, %s, %s, %s, NOW())")
+    return vectors
+
+
+def feature_frame(vectors, wallets):
+    """DataFrame (kolom FEATURE_COLUMNS) untuk `wallets` yang punya vektor, urut sesuai `wallets`."""
+    present = [wallet for wallet in wallets if wallet in vectors]
+    matrix = np.vstack([vectors[wallet] for wallet in present]) if present else np.empty((0, len(FEATURE_COLUMNS)))
+    return present, pd.DataFrame(matrix, columns=FEATURE_COLUMNS)
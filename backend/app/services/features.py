@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Urutan kolom yang diharapkan scaler & model (Isolation Forest dan XGBoost)
+FEATURE_COLUMNS = [
+    'log_value', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
+    'is_large_global', 'sender_tx_count', 'receiver_tx_count',
+    'tx_pair_freq', 'inter_time', 'same_value_count'
+]
+
+
+def _sorted_features(df):
+    """
+    Hitung matriks fitur tanpa mengubah `df`. Baris hasil diurutkan per
+    (sender, timestamp) seperti implementasi lama; mengembalikan
+    (features, posisi baris df untuk setiap baris features).
+    """
+    timestamp = pd.to_datetime(df['timestamp'])
+    value = pd.to_numeric(df['value'], errors='coerce').astype('float64').clip(lower=0)
+    sender = df['sender']
+    receiver = df['receiver']
+
+    hour_angle = (2 * np.pi / 24) * timestamp.dt.hour.to_numpy(dtype='float64')
+    day_angle = (2 * np.pi / 7) * timestamp.dt.dayofweek.to_numpy(dtype='float64')
+
+    # groupby().transform('size') menggantikan df.apply per baris;
+    # pasangan dengan sender/receiver kosong bernilai 0 seperti sebelumnya.
+    pair_freq = (sender.groupby([sender, receiver], sort=False)
+                       .transform('size')
+                       .fillna(0)
+                       .astype('int64'))
+
+    frame = pd.DataFrame({
+        'sender': sender,
+        'timestamp': timestamp,
+        'value': value,
+        '_pos': np.arange(len(df), dtype='int64'),
+        'log_value': np.log1p(value),
+        'hour_sin': np.sin(hour_angle),
+        'hour_cos': np.cos(hour_angle),
+        'day_sin': np.sin(day_angle),
+        'day_cos': np.cos(day_angle),
+        'is_large_global': (value > value.quantile(0.95)).astype('int64'),
+        'sender_tx_count': sender.map(sender.value_counts()),
+        'receiver_tx_count': receiver.map(receiver.value_counts()),
+        'tx_pair_freq': pair_freq,
+    }, index=df.index)
+
+    # Sort multi-kolom pandas stabil (lexsort), sama dengan sort_values lama
+    frame = frame.sort_values(['sender', 'timestamp'])
+
+    prev_time = frame.groupby('sender', sort=False)['timestamp'].shift(1)
+    inter_time = (frame['timestamp'] - prev_time).dt.total_seconds()
+    frame['inter_time'] = inter_time.fillna(inter_time.median())
+    frame['same_value_count'] = (frame.groupby(['sender', 'value'], sort=False)['value']
+                                      .transform('count'))
+
+    return frame[FEATURE_COLUMNS], frame['_pos'].to_numpy()
+
+
+def build_feature_matrix(df, fill_missing=False):
+    """
+    Matriks 11 fitur per transaksi dari kolom sender, receiver, value, timestamp.
+    Hanya operasi vektor; `df` tidak diubah. Baris diurutkan per (sender, timestamp)
+    dengan index asli. `fill_missing` mengisi NaN dengan median kolom (jalur XGBoost).
+    """
+    features, _ = _sorted_features(df)
+    if fill_missing:
+        features = features.fillna(features.median())
+    return features
+
+
+def build_feature_matrix_with_order(df):
+    """Seperti build_feature_matrix, plus posisi baris `df` untuk setiap baris fitur."""
+    return _sorted_features(df)
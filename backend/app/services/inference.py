@@ -0,0 +1,326 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from .features import FEATURE_COLUMNS
+from .model_registry import get_model_set, ANOMALY_ARTIFACTS, CLASSIFIER_ARTIFACTS
+
+# 0 = inferensi inline di thread pemanggil (tanpa process pool)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+INFERENCE_MAX_BATCH_ROWS = int(os.getenv("INFERENCE_MAX_BATCH_ROWS", 20000))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 120))
+# spawn: worker tidak mewarisi thread/lock/koneksi DB proses web
+INFERENCE_START_METHOD = os.getenv("INFERENCE_START_METHOD", "spawn")
+# Berapa kali batch dikirim ulang setelah worker mati (OOM/SIGKILL) dan pool dibangun ulang
+INFERENCE_BROKEN_RETRIES = int(os.getenv("INFERENCE_BROKEN_RETRIES", 1))
+
+# jenis → (artefak, scaler dipanggil dengan DataFrame?) — sama dengan pemanggilan lama
+MODEL_SETS = {
+    'anomaly':    (ANOMALY_ARTIFACTS, True),
+    'classifier': (CLASSIFIER_ARTIFACTS, False),
+}
+
+_LATENCY_WINDOW = 1000
+
+
+def scale_features(kind, scaler, matrix):
+    """Transform scaler dengan bentuk input yang sama seperti saat model dilatih."""
+    scaled = scaler.transform(pd.DataFrame(matrix, columns=FEATURE_COLUMNS))
+    if MODEL_SETS[kind][1]:
+        return pd.DataFrame(scaled, columns=FEATURE_COLUMNS)
+    return scaled
+
+
+def predict_local(kind, matrix):
+    """Scaler + predict di proses ini. Mengembalikan (prediksi ndarray, versi model)."""
+    (scaler, model), version = get_model_set(MODEL_SETS[kind][0])
+    return np.asarray(model.predict(scale_features(kind, scaler, matrix))), version
+
+
+def _warm_up():
+    # Dijalankan sekali di tiap worker: muat semua model sebelum request pertama
+    for artifacts, _ in MODEL_SETS.values():
+        get_model_set(artifacts)
+
+
+class InferenceServiceClosed(RuntimeError):
+    """Service sudah dihentikan (restart/reload); request tidak dijalankan."""
+
+
+class _Request:
+    __slots__ = ('kind', 'matrix', 'future', 'enqueued_at', 'retries')
+
+    def __init__(self, kind, matrix):
+        self.kind = kind
+        self.matrix = matrix
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.retries = 0
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    return round(float(np.percentile(values, q)) * 1000, 2)
+
+
+class InferenceService:
+    """
+    Inferensi model di process pool dengan micro-batching: request yang tiba dalam
+    jendela INFERENCE_MAX_WAIT_MS (atau sampai INFERENCE_MAX_BATCH_ROWS baris)
+    digabung menjadi satu panggilan predict per jenis model, lalu hasilnya dibagi
+    kembali ke Future masing-masing. Thread pemanggil hanya menunggu Future
+    (tanpa memegang GIL) sehingga request web paralel tidak antre di evaluasi model.
+    """
+
+    def __init__(self, workers=INFERENCE_WORKERS, max_batch_rows=INFERENCE_MAX_BATCH_ROWS,
+                 max_wait_ms=INFERENCE_MAX_WAIT_MS, start_method=INFERENCE_START_METHOD):
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self._workers = workers
+        self._start_method = start_method
+        self._queue = queue.Queue()
+        self._pool = self._new_pool()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._in_flight = 0
+        self._stats = {"requests": 0, "rows": 0, "batches": 0, "errors": 0, "pool_rebuilds": 0}
+        self._queue_wait = deque(maxlen=_LATENCY_WINDOW)
+        self._latency = deque(maxlen=_LATENCY_WINDOW)
+        self._batch_sizes = deque(maxlen=_LATENCY_WINDOW)
+        self._dispatcher = threading.Thread(target=self._run, name="inference-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context(self._start_method),
+            initializer=_warm_up,
+        )
+
+    def submit(self, kind, matrix):
+        """Antrikan matriks fitur (n x 11); Future berisi (prediksi, versi model)."""
+        if kind not in MODEL_SETS:
+            raise ValueError(f"Jenis model tidak dikenal: {kind}")
+        request = _Request(kind, np.asarray(matrix, dtype='float64'))
+        with self._lock:
+            # Di bawah lock yang sama dengan shutdown: request tidak bisa masuk setelah sinyal stop
+            if self._closed:
+                raise InferenceServiceClosed("Inference service sudah dihentikan")
+            self._stats["requests"] += 1
+            self._stats["rows"] += len(request.matrix)
+            self._queue.put(request)
+        return request.future
+
+    def _collect(self, first):
+        batch, rows = [first], len(first.matrix)
+        deadline = first.enqueued_at + self.max_wait
+        while rows < self.max_batch_rows:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # sinyal stop diteruskan ke loop utama
+                break
+            batch.append(request)
+            rows += len(request.matrix)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            by_kind = {}
+            for request in batch:
+                by_kind.setdefault(request.kind, []).append(request)
+            for kind, requests in by_kind.items():
+                self._dispatch(kind, requests)
+
+    def _dispatch(self, kind, requests):
+        dispatched_at = time.monotonic()
+        matrix = requests[0].matrix if len(requests) == 1 else np.vstack([r.matrix for r in requests])
+        with self._lock:
+            self._in_flight += len(requests)
+            self._stats["batches"] += 1
+            self._batch_sizes.append(len(matrix))
+            self._queue_wait.extend(dispatched_at - r.enqueued_at for r in requests)
+        pool = self._pool
+        try:
+            future = pool.submit(predict_local, kind, matrix)
+        except BrokenProcessPool as e:
+            self._retry_broken(pool, requests, e)
+            return
+        except Exception as e:
+            if self._closed:
+                e = InferenceServiceClosed("Inference service dihentikan")
+            self._fail(requests, e)
+            return
+        future.add_done_callback(lambda f: self._complete(pool, requests, f))
+
+    def _fail(self, requests, error, dispatched=True):
+        with self._lock:
+            if dispatched:
+                self._in_flight -= len(requests)
+            self._stats["errors"] += len(requests)
+        for request in requests:
+            request.future.set_exception(error)
+
+    def _retry_broken(self, pool, requests, error):
+        """
+        Worker mati (OOM/SIGKILL) → pool rusak permanen. Pool diganti sekali (oleh batch
+        pertama yang melihatnya) dan request batch ini diantrikan ulang sampai
+        INFERENCE_BROKEN_RETRIES kali; setelah itu hanya batch ini yang gagal.
+        """
+        with self._lock:
+            if self._closed:
+                retry = []
+            else:
+                if self._pool is pool:
+                    self._pool = self._new_pool()
+                    self._stats["pool_rebuilds"] += 1
+                    pool.shutdown(wait=False, cancel_futures=True)
+                retry = [r for r in requests if r.retries < INFERENCE_BROKEN_RETRIES]
+                for request in retry:
+                    request.retries += 1
+                self._in_flight -= len(retry)
+                for request in retry:
+                    self._queue.put(request)
+        failed = [r for r in requests if r not in retry]
+        if failed:
+            self._fail(failed, error)
+
+    def _complete(self, pool, requests, future):
+        if future.cancelled():
+            # Dibatalkan oleh shutdown(cancel_futures=True) sebelum sempat dijalankan
+            self._fail(requests, InferenceServiceClosed("Inference service dihentikan"))
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._retry_broken(pool, requests, error)
+            return
+        if error is not None:
+            self._fail(requests, error)
+            return
+        predictions, version = future.result()
+        finished_at = time.monotonic()
+        offset = 0
+        with self._lock:
+            self._in_flight -= len(requests)
+            self._latency.extend(finished_at - r.enqueued_at for r in requests)
+        for request in requests:
+            n = len(request.matrix)
+            request.future.set_result((predictions[offset:offset + n], version))
+            offset += n
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "avg_batch_rows": round(float(np.mean(self._batch_sizes)), 1) if self._batch_sizes else None,
+                "queue_wait_ms_p50": _percentile(self._queue_wait, 50),
+                "queue_wait_ms_p95": _percentile(self._queue_wait, 95),
+                "latency_ms_p50": _percentile(self._latency, 50),
+                "latency_ms_p95": _percentile(self._latency, 95),
+            }
+
+    def shutdown(self):
+        """
+        Tolak submit baru, hentikan dispatcher, dan batalkan batch yang belum berjalan.
+        Semua request yang belum selesai mendapat InferenceServiceClosed (tidak menggantung).
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._dispatcher.join(timeout=5)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        # Request yang masih di antrian (dispatcher belum sempat/berhenti) digagalkan
+        pending = []
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                pending.append(request)
+        if pending:
+            self._fail(pending, InferenceServiceClosed("Inference service dihentikan"), dispatched=False)
+
+
+_service = None
+_service_pid = None
+_service_lock = threading.Lock()
+
+
+def get_inference_service():
+    """Service milik proses ini (dibuat ulang setelah fork); None jika INFERENCE_WORKERS = 0."""
+    global _service, _service_pid
+    if INFERENCE_WORKERS <= 0:
+        return None
+    pid = os.getpid()
+    if _service is None or _service_pid != pid:
+        with _service_lock:
+            if _service is None or _service_pid != pid:
+                _service = InferenceService()
+                _service_pid = pid
+                atexit.register(_service.shutdown)
+    return _service
+
+
+def restart_inference_service():
+    """Hentikan pool worker; service baru (dengan model terbaru) dibuat saat predict berikutnya."""
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None and _service_pid == os.getpid():
+        service.shutdown()
+        return True
+    return False
+
+
+def predict(kind, matrix, timeout=INFERENCE_TIMEOUT):
+    """
+    Prediksi `kind` ('anomaly' | 'classifier') untuk matriks fitur n x 11.
+    Mengembalikan (prediksi ndarray, versi model). Lewat process pool bila aktif,
+    selain itu inline.
+    """
+    if len(matrix) == 0:
+        return np.empty(0), None
+    service = get_inference_service()
+    if service is None:
+        return predict_local(kind, matrix)
+    try:
+        return service.submit(kind, matrix).result(timeout=timeout)
+    except InferenceServiceClosed:
+        # Service diganti (restart_inference_service) saat request berjalan: coba sekali
+        # di service baru. Saat proses keluar service yang sama dikembalikan → gagal lagi.
+        replacement = get_inference_service()
+        if replacement is service:
+            raise
+        return replacement.submit(kind, matrix).result(timeout=timeout)
+
+
+def inference_metrics():
+    service = _service if _service_pid == os.getpid() else None
+    if service is None:
+        return {"mode": "inline" if INFERENCE_WORKERS <= 0 else "idle", "workers": INFERENCE_WORKERS}
+    return {"mode": "process_pool", "workers": INFERENCE_WORKERS, **service.metrics()}
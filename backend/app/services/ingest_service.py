@@ -0,0 +1,113 @@
+import io
+
+from .wallet_stats import apply_new_transactions
+
+_STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS tx_staging (
+        tx_hash     TEXT,
+        sender      TEXT,
+        receiver    TEXT,
+        value       NUMERIC,
+        ts_epoch    BIGINT,
+        is_anomaly  BOOLEAN,
+        anomaly_model_version TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Satu statement set-based: insert baris baru, perbarui flag anomaly baris lama
+# (hanya jika flag ikut dikirim), dan laporkan mana yang benar-benar baru (xmax = 0).
+_MERGE_SQL = """
+    INSERT INTO transactions (tx_hash, sender, receiver, value, timestamp,
+                              is_anomaly, anomaly_model_version)
+    SELECT DISTINCT ON (tx_hash)
+           tx_hash, sender, receiver, value, TO_TIMESTAMP(ts_epoch),
+           is_anomaly, anomaly_model_version
+    FROM tx_staging
+    ORDER BY tx_hash
+    ON CONFLICT (tx_hash) DO UPDATE SET
+        is_anomaly = EXCLUDED.is_anomaly,
+        anomaly_model_version = EXCLUDED.anomaly_model_version
+        WHERE EXCLUDED.is_anomaly IS NOT NULL
+    RETURNING tx_hash, (xmax = 0) AS inserted
+"""
+
+
+def parse_etherscan_tx(tx):
+    """Satu item `result` Etherscan txlist → dict baris transactions."""
+    return {
+        "tx_hash": tx["hash"],
+        "sender": tx["from"],
+        "receiver": tx["to"],
+        "value": int(tx["value"]) / 1e18,
+        "timestamp": int(tx["timeStamp"]),
+        "block_number": int(tx.get("blockNumber") or 0),
+    }
+
+
+def _copy_field(value):
+    """Format teks COPY: NULL = \\N, escape backslash/tab/newline."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def ingest_transactions(cur, rows, anomaly_flags=None, model_version=None):
+    """
+    Masukkan banyak transaksi sekaligus: COPY ke tabel staging sementara,
+    lalu satu INSERT ... ON CONFLICT ke transactions. Flag anomaly
+    (dict tx_hash → 0/1) ditulis di statement yang sama, ditandai `model_version`.
+    wallet_stats diperbarui hanya untuk baris yang baru masuk.
+    Mengembalikan list tx_hash yang baru di-insert. Commit diserahkan ke pemanggil.
+    """
+    if not rows:
+        return []
+    anomaly_flags = anomaly_flags or {}
+
+    buf = io.StringIO()
+    for row in rows:
+        flag = anomaly_flags.get(row["tx_hash"])
+        buf.write("\t".join(_copy_field(v) for v in (
+            row["tx_hash"], row["sender"], row["receiver"], row["value"],
+            row["timestamp"], None if flag is None else bool(flag),
+            None if flag is None else model_version
+        )))
+        buf.write("\n")
+    buf.seek(0)
+
+    cur.execute(_STAGING_DDL)
+    cur.execute("TRUNCATE tx_staging")
+    cur.copy_expert(
+        "COPY tx_staging (tx_hash, sender, receiver, value, ts_epoch, is_anomaly, "
+        "anomaly_model_version) FROM STDIN",
+        buf
+    )
+    cur.execute(_MERGE_SQL)
+    inserted = [tx_hash for tx_hash, is_new in cur.fetchall() if is_new]
+
+    apply_new_transactions(cur, inserted)
+    return inserted
+
+
+def get_sync_start_block(cur, address):
+    """Blok awal sinkronisasi berikutnya: watermark + 1, atau 0 untuk wallet baru."""
+    cur.execute("SELECT last_synced_block FROM wallet_history WHERE address = %s", (address,))
+    row = cur.fetchone()
+    if row and row[0] is not None:
+        return row[0] + 1
+    return 0
+
+
+def record_sync_watermark(cur, address, max_block):
+    """Catat wallet di wallet_history: queried_at = NOW(), watermark blok tidak pernah mundur."""
+    cur.execute("""
+        INSERT INTO wallet_history (address, queried_at, last_synced_block)
+        VALUES (%s, NOW(), %s)
+        ON CONFLICT (address) DO UPDATE SET
+            queried_at = NOW(),
+            last_synced_block = GREATEST(wallet_history.last_synced_block,
+                                         EXCLUDED.last_synced_block)
+    """, (address, max_block))
@@ -0,0 +1,90 @@
+from .job_service import register_job
+from .refresh_engine import refresh_wallets
+from .wallet_service import (
+    ETHERSCAN_API_KEY,
+    calculate_risk_all_logic,
+    update_all_wallets_logic,
+)
+from .batch_scoring import score_transactions
+from .rescoring import rescore_anomalies, rescore_blacklist
+from .scheduler import run_scheduled_detectors
+from .neo4j_sync import is_neo4j_running, migrate_transactions, label_blacklisted_wallets
+
+
+@register_job('refresh_wallets')
+def refresh_wallets_job(ctx, classify=False):
+    """Refresh semua wallet di wallet_history dari Etherscan (opsional + klasifikasi XGBoost)."""
+    if classify:
+        success, failed = update_all_wallets_logic(on_progress=ctx.progress)
+        return {"success": success, "failed": failed}
+
+    result = refresh_wallets(api_key=ETHERSCAN_API_KEY, on_progress=ctx.progress)
+    # Transaksi baru sudah dinilai saat ingest (fitur online); sisa yang belum bernilai
+    # (mis. ingest lama atau model gagal dimuat) dinilai sekaligus di sini
+    scoring = score_transactions() if result["new_transactions"] else None
+    return {
+        "success": result["success"],
+        "failed": result["failed"],
+        "new_transactions": result["new_transactions"],
+        "elapsed": round(result["elapsed"], 2),
+        "errors": result["errors"],
+        "scoring": scoring,
+    }
+
+
+@register_job('calculate_risk_all')
+def calculate_risk_all_job(ctx):
+    """Hitung risiko untuk wallet yang belum punya baris wallet_risk."""
+    count = calculate_risk_all_logic(on_progress=ctx.progress)
+    return {"processed": count}
+
+
+@register_job('sync_neo4j')
+def sync_neo4j_job(ctx):
+    """Migrasi transaksi ke Neo4j, beri label blacklist, lalu hitung risiko wallet baru."""
+    ctx.progress(0, 3, "Cek Neo4j")
+    if not is_neo4j_running():
+        raise RuntimeError("Neo4j tidak berjalan")
+    ctx.progress(0, 3, "Migrasi transaksi")
+    migrate_transactions()
+    ctx.progress(1, 3, "Label wallet blacklist")
+    label_blacklisted_wallets()
+    ctx.progress(2, 3, "Hitung risiko wallet")
+    count = calculate_risk_all_logic()
+    ctx.progress(3, 3, "Selesai")
+    return {"risk_processed": count}
+
+
+@register_job('score_anomalies')
+def score_anomalies_job(ctx, rescore_all=False):
+    """Beri skor anomaly batch untuk baris is_anomaly IS NULL (atau semua baris)."""
+    ctx.progress(0, None, "Menilai transaksi")
+    return score_transactions(rescore_all=rescore_all)
+
+
+@register_job('rescore_anomalies')
+def rescore_anomalies_job(ctx, restart=False, sleep=0.0):
+    """Backfill flag anomaly dengan model aktif (lanjut dari checkpoint)."""
+    return rescore_anomalies(
+        restart=restart, sleep=sleep,
+        echo=lambda message: ctx.progress(0, None, message)
+    )
+
+
+@register_job('rescore_blacklist')
+def rescore_blacklist_job(ctx, restart=False, sleep=0.0):
+    """Klasifikasi ulang blacklist ML dengan model XGBoost aktif (lanjut dari checkpoint)."""
+    return rescore_blacklist(
+        restart=restart, sleep=sleep,
+        echo=lambda message: ctx.progress(0, None, message)
+    )
+
+
+@register_job('run_detectors')
+def run_detectors_job(ctx, full=False):
+    """Sapuan detektor sharded (dilewati jika run lain memegang advisory lock)."""
+    ctx.progress(0, None, "Menjalankan detektor")
+    run = run_scheduled_detectors(full=full)
+    if run is None:
+        return {"skipped": True, "reason": "Sapuan detektor lain sedang berjalan"}
+    return run
@@ -0,0 +1,268 @@
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2.extras
+
+from ..database import get_db_connection
+
+# 'local'  = job dijalankan thread pool di proses web yang menerima request
+# 'worker' = job hanya diantrikan; dijalankan oleh proses `flask jobs-worker`
+JOB_EXECUTION = os.getenv("JOB_EXECUTION", "local")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+# Job running memperbarui updated_at tiap JOB_HEARTBEAT_INTERVAL detik; yang tidak
+# diperbarui selama JOB_STALE_TIMEOUT dianggap prosesnya mati dan diambil ulang.
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", 30))
+JOB_STALE_TIMEOUT = float(os.getenv("JOB_STALE_TIMEOUT", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+JOB_HANDLERS = {}
+
+_JOB_COLUMNS = """
+    id, kind, status, params, progress_done, progress_total, message,
+    result, error, created_by, worker, attempts, created_at, started_at, updated_at, finished_at
+"""
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def register_job(kind):
+    """Daftarkan handler job: fn(ctx, **params) → hasil yang bisa di-JSON-kan."""
+    def deco(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return deco
+
+
+def load_job_handlers():
+    """Impor modul handler (sekali) sehingga JOB_HANDLERS terisi."""
+    # Handler hidup di modul terpisah supaya job_service tidak mengimpor service berat
+    from . import job_handlers  # noqa: F401
+
+
+def _worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+class JobContext:
+    """Diberikan ke handler untuk melaporkan progres (commit di koneksi sendiri)."""
+
+    def __init__(self, job_id, params):
+        self.job_id = job_id
+        self.params = params
+
+    def progress(self, done, total=None, message=None):
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE jobs
+            SET progress_done = %s,
+                progress_total = COALESCE(%s, progress_total),
+                message = COALESCE(%s, message),
+                updated_at = NOW()
+            WHERE id = %s
+        """, (done, total, message, self.job_id))
+        conn.commit()
+        cur.close()
+        conn.close()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+                _executor_pid = pid
+    return _executor
+
+
+def enqueue_job(kind, params=None, created_by=None):
+    """Simpan job baru berstatus queued dan (mode local) langsung jadwalkan. Mengembalikan id."""
+    load_job_handlers()
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Job tidak dikenal: {kind}")
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO jobs (kind, params, created_by)
+        VALUES (%s, %s, %s)
+        RETURNING id
+    """, (kind, psycopg2.extras.Json(params or {}), created_by))
+    job_id = str(cur.fetchone()[0])
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    if JOB_EXECUTION == "local":
+        # Tanpa proses worker, job macet dari proses web yang mati diambil ulang di sini
+        for stale_id in reclaim_stale_jobs():
+            _get_executor().submit(run_next_job, stale_id)
+        _get_executor().submit(run_next_job, job_id)
+    return job_id
+
+
+def reclaim_stale_jobs(timeout=JOB_STALE_TIMEOUT, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Job running yang heartbeat-nya berhenti (proses mati) diantrikan ulang, atau
+    ditandai failed jika sudah dicoba `max_attempts` kali. Mengembalikan id yang diantrikan ulang.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE jobs
+        SET status = CASE WHEN attempts >= %(max_attempts)s THEN 'failed' ELSE 'queued' END,
+            error = CASE WHEN attempts >= %(max_attempts)s
+                         THEN 'Worker berhenti tanpa menyelesaikan job (' || worker || ')'
+                         ELSE error END,
+            finished_at = CASE WHEN attempts >= %(max_attempts)s THEN NOW() END,
+            message = CASE WHEN attempts >= %(max_attempts)s THEN message
+                           ELSE 'Diambil ulang: worker ' || worker || ' berhenti' END,
+            updated_at = NOW()
+        WHERE id IN (
+            SELECT id FROM jobs
+            WHERE status = 'running'
+              AND updated_at < NOW() - make_interval(secs => %(timeout)s)
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, status
+    """, {"timeout": timeout, "max_attempts": max_attempts})
+    rows = cur.fetchall()
+    conn.commit()
+    cur.close()
+    conn.close()
+    for job_id, status in rows:
+        print(f"⚠️ Job {job_id} macet, {'diantrikan ulang' if status == 'queued' else 'ditandai failed'}")
+    return [str(job_id) for job_id, status in rows if status == 'queued']
+
+
+def _claim(job_id=None):
+    """Ambil satu job queued (tertentu atau tertua) dan tandai running secara atomik."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE jobs SET status = 'running', started_at = NOW(), updated_at = NOW(), worker = %s,
+                        attempts = attempts + 1
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status = 'queued' AND (%s::uuid IS NULL OR id = %s::uuid)
+            ORDER BY created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, kind, params
+    """, (_worker_name(), job_id, job_id))
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    return row
+
+
+def _heartbeat(job_id, stop, interval=JOB_HEARTBEAT_INTERVAL):
+    """Perbarui updated_at job selama handler berjalan (lihat reclaim_stale_jobs)."""
+    while not stop.wait(interval):
+        try:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.execute("UPDATE jobs SET updated_at = NOW() WHERE id = %s AND status = 'running'",
+                        (job_id,))
+            conn.commit()
+            cur.close()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Heartbeat job {job_id} gagal: {e}")
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=str)
+
+
+def _finish(job_id, status, result=None, error=None):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE jobs
+        SET status = %s, result = %s, error = %s,
+            finished_at = NOW(), updated_at = NOW()
+        WHERE id = %s
+    """, (status, None if result is None else psycopg2.extras.Json(result, dumps=_dumps),
+          error, job_id))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def run_next_job(job_id=None):
+    """Klaim lalu jalankan satu job. False jika tidak ada job yang bisa diklaim."""
+    load_job_handlers()
+    claimed = _claim(job_id)
+    if claimed is None:
+        return False
+
+    job_id, kind, params = str(claimed[0]), claimed[1], claimed[2] or {}
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True,
+                     name=f"job-heartbeat-{job_id}").start()
+    try:
+        handler = JOB_HANDLERS[kind]
+        result = handler(JobContext(job_id, params), **params)
+        _finish(job_id, 'succeeded', result=result)
+    except Exception as e:
+        print(f"❌ Job {kind} ({job_id}) gagal: {e}")
+        _finish(job_id, 'failed', error=traceback.format_exc())
+    finally:
+        stop.set()
+    return True
+
+
+def run_worker(poll_interval=JOB_POLL_INTERVAL, once=False):
+    """Loop worker terpisah: klaim job queued satu per satu sampai dihentikan."""
+    while True:
+        reclaim_stale_jobs()
+        ran = run_next_job()
+        if once and not ran:
+            return
+        if not ran:
+            time.sleep(poll_interval)
+
+
+def _row_to_dict(row):
+    job = dict(row)
+    job["id"] = str(job["id"])
+    return job
+
+
+def get_job(job_id):
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = %s", (job_id,))
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    return _row_to_dict(row) if row else None
+
+
+def list_jobs(limit=20, status=None, kind=None):
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute(f"""
+        SELECT {_JOB_COLUMNS} FROM jobs
+        WHERE (%s::text IS NULL OR status = %s)
+          AND (%s::text IS NULL OR kind = %s)
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, (status, status, kind, kind, limit))
+    rows = [_row_to_dict(row) for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
@@ -1,4 +1,5 @@
 from ..database import get_db_connection
+from .wallet_aggregate import get_wallet_aggregate
 from decimal import Decimal
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
@@ -8,53 +9,8 @@ import requests, time, socks, socket
 from bs4 import BeautifulSoup
 
 def get_wallet_summary(wallet_address):
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Total ETH yang diterima oleh wallet
-    cur.execute("""
-        SELECT COALESCE(SUM(value), 0) FROM transactions 
-        WHERE receiver = %s
-    """, (wallet_address,))
-    total_received = cur.fetchone()[0]
-
-    # Total ETH yang dikirim oleh wallet
-    cur.execute("""
-        SELECT COALESCE(SUM(value), 0) FROM transactions 
-        WHERE sender = %s
-    """, (wallet_address,))
-    total_sent = cur.fetchone()[0]
-
-    # Saldo = Total diterima - Total dikirim
-    balance = total_received - total_sent
-
-    # Transaksi pertama berdasarkan timestamp
-    cur.execute("""
-        SELECT sender, receiver, value, timestamp FROM transactions 
-        WHERE sender = %s OR receiver = %s
-        ORDER BY timestamp ASC LIMIT 1
-    """, (wallet_address, wallet_address))
-    first_transaction = cur.fetchone()
-
-    # Transaksi terakhir berdasarkan timestamp
-    cur.execute("""
-        SELECT sender, receiver, value, timestamp FROM transactions 
-        WHERE sender = %s OR receiver = %s
-        ORDER BY timestamp DESC LIMIT 1
-    """, (wallet_address, wallet_address))
-    last_transaction = cur.fetchone()
-
-    cur.close()
-    conn.close()
-
-    return {
-        "balance": balance,
-        "total_received": total_received,
-        "total_sent": total_sent,
-        "first_transaction": first_transaction,
-        "last_transaction": last_transaction
-    }
+    """Ringkasan saldo, total kirim/terima, dan transaksi pertama/terakhir wallet."""
+    return get_wallet_aggregate(wallet_address, with_top_lists=False).as_summary()
 
 def get_top_transactions(wallet_address):
     """Mengambil 3 transaksi terbesar dari/ke wallet."""
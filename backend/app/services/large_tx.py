@@ -0,0 +1,86 @@
+"""
+Deteksi transaksi besar: transfer pertama di atas ambang per pasangan sender-receiver.
+Satu pass window function (ROW_NUMBER per pasangan), dipakai versi per wallet maupun bulk.
+"""
+import os
+
+from ..database import get_db_connection
+from .detector_delta import DELTA_CTE, delta_params
+
+DEFAULT_ASSET = "ETH"
+# Ambang default per aset; override lewat env LARGE_TX_THRESHOLD_<ASET>, mis. LARGE_TX_THRESHOLD_ETH=5000
+LARGE_TX_THRESHOLDS = {"ETH": 10000}
+
+# Transaksi di atas ambang yang menyentuh wallet; pasangan (sender, receiver) selalu memuat
+# wallet itu, jadi baris pertama per partisi = transfer besar pertama pasangan tersebut.
+_WALLET_SQL = """
+    SELECT sender, receiver, value, timestamp FROM (
+        SELECT sender, receiver, value, timestamp,
+               ROW_NUMBER() OVER (PARTITION BY sender, receiver ORDER BY timestamp, tx_hash) AS rn
+        FROM transactions
+        WHERE value >= %(threshold)s
+          AND (sender = %(wallet)s OR receiver = %(wallet)s)
+    ) ranked
+    WHERE rn = 1
+    ORDER BY timestamp ASC
+"""
+
+# Pasangan yang punya transfer besar di delta diurutkan ulang dari seluruh riwayatnya
+# (idx_transactions_pair_ts); alert hanya keluar jika transfer pertamanya ada di delta.
+_BULK_SQL = "WITH" + DELTA_CTE + """,
+    pairs AS (
+        SELECT DISTINCT sender, receiver FROM delta WHERE value >= %(threshold)s
+    ),
+    firsts AS (
+        SELECT tx_hash FROM (
+            SELECT t.tx_hash,
+                   ROW_NUMBER() OVER (PARTITION BY t.sender, t.receiver
+                                      ORDER BY t.timestamp, t.tx_hash) AS rn
+            FROM pairs p
+            JOIN transactions t ON t.sender = p.sender AND t.receiver = p.receiver
+            WHERE t.value >= %(threshold)s
+        ) ranked
+        WHERE rn = 1
+    )
+    SELECT DISTINCT d.address, d.tx_hash, d.sender, d.receiver, d.value, d.timestamp
+    FROM delta d
+    JOIN firsts f ON f.tx_hash = d.tx_hash
+    WHERE d.value >= %(threshold)s
+    ORDER BY d.timestamp ASC
+"""
+
+
+def large_tx_threshold(asset=DEFAULT_ASSET):
+    """Ambang transaksi besar untuk aset (env LARGE_TX_THRESHOLD_<ASET> > default)."""
+    asset = asset.upper()
+    override = os.getenv(f"LARGE_TX_THRESHOLD_{asset}")
+    if override:
+        return float(override)
+    return LARGE_TX_THRESHOLDS[asset]
+
+
+def first_large_tx_for_wallet(wallet, conn=None, asset=DEFAULT_ASSET):
+    """[(sender, receiver, value, timestamp)] transfer besar pertama per pasangan yang melibatkan wallet."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(_WALLET_SQL, {"wallet": wallet, "threshold": large_tx_threshold(asset)})
+    rows = cur.fetchall()
+    cur.close()
+    if own_conn:
+        conn.close()
+    return rows
+
+
+def first_large_tx_bulk(wallets, conn, since=None, asset=DEFAULT_ASSET):
+    """{wallet: [(sender, receiver, value, timestamp)]} untuk banyak wallet dalam satu query delta."""
+    cur = conn.cursor()
+    cur.execute(_BULK_SQL, {**delta_params(wallets, since), "threshold": large_tx_threshold(asset)})
+    rows = cur.fetchall()
+    cur.close()
+
+    results = {wallet: [] for wallet in wallets}
+    for address, _, sender, receiver, value, ts in rows:
+        results[address].append((sender, receiver, value, ts))
+    return results
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import joblib
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(BASE_DIR, 'models'))
+
+# Detik antar pengecekan mtime artefak; 0 = hanya reload manual
+MODEL_RELOAD_CHECK_INTERVAL = float(os.getenv("MODEL_RELOAD_CHECK_INTERVAL", 30))
+
+# nama logis → file di MODEL_DIR
+MODEL_ARTIFACTS = {
+    'isolation_forest': 'isolation_forest_best_model.pkl',
+    'scaler_if':        'scaler_if.pkl',
+    'xgboost':          'model_xgboost_aml.pkl',
+    'scaler_xgb':       'scaler_xgb.pkl',
+}
+
+# Artefak yang selalu dipakai berpasangan (scaler + model)
+ANOMALY_ARTIFACTS = ('scaler_if', 'isolation_forest')
+CLASSIFIER_ARTIFACTS = ('scaler_xgb', 'xgboost')
+
+# version = 12 karakter awal sha256 isi file
+LoadedModel = namedtuple('LoadedModel', [
+    'name', 'obj', 'path', 'version', 'mtime', 'loaded_at', 'load_seconds', 'pid'
+])
+
+_models = {}
+_last_checked = {}
+_file_versions = {}
+_lock = threading.RLock()
+
+
+def _artifact_path(name):
+    if name not in MODEL_ARTIFACTS:
+        raise KeyError(f"Model tidak dikenal: {name}")
+    return os.path.join(MODEL_DIR, MODEL_ARTIFACTS[name])
+
+
+def _file_version(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _load(name):
+    path = _artifact_path(name)
+    started = time.perf_counter()
+    mtime = os.path.getmtime(path)
+    version = _file_version(path)
+    obj = joblib.load(path)
+    return LoadedModel(
+        name=name, obj=obj, path=path, version=version, mtime=mtime,
+        loaded_at=datetime.now(), load_seconds=time.perf_counter() - started,
+        pid=os.getpid(),
+    )
+
+
+def _changed_on_disk(entry):
+    """Cek mtime paling sering sekali per interval supaya get_model tetap murah."""
+    if not MODEL_RELOAD_CHECK_INTERVAL:
+        return False
+    now = time.monotonic()
+    if now - _last_checked.get(entry.name, 0) < MODEL_RELOAD_CHECK_INTERVAL:
+        return False
+    _last_checked[entry.name] = now
+    try:
+        return os.path.getmtime(entry.path) != entry.mtime
+    except OSError:
+        return False  # file sedang diganti: tetap pakai versi di memori
+
+
+def get_model(name):
+    """
+    Artefak model `name`, dimuat sekali per proses saat pertama dipakai.
+    Jika file di disk berubah (dicek tiap MODEL_RELOAD_CHECK_INTERVAL detik) dimuat ulang.
+    """
+    return get_model_entry(name).obj
+
+
+def get_model_entry(name):
+    """LoadedModel `name` (objek + versi + waktu muat), lihat get_model."""
+    entry = _models.get(name)
+    if entry is not None and not _changed_on_disk(entry):
+        return entry
+    with _lock:
+        current = _models.get(name)
+        if current is None or current is entry:
+            try:
+                _models[name] = _load(name)
+            except Exception:
+                if current is None:
+                    raise
+                print(f"❌ Gagal memuat ulang model {name}, tetap memakai versi {current.version}")
+        return _models[name]
+
+
+def get_model_set(names):
+    """
+    Beberapa artefak sekaligus (mis. ANOMALY_ARTIFACTS) beserta versi gabungannya,
+    diambil di bawah lock supaya scaler dan model berasal dari snapshot yang sama.
+    """
+    with _lock:
+        entries = [get_model_entry(name) for name in names]
+    return [entry.obj for entry in entries], '+'.join(entry.version for entry in entries)
+
+
+def artifact_version(names):
+    """
+    Versi gabungan artefak seperti get_model_set, tapi dihitung dari file tanpa memuat
+    model (di-cache per mtime). Dipakai proses yang inferensinya didelegasikan ke worker.
+    """
+    versions = []
+    for name in names:
+        path = _artifact_path(name)
+        mtime = os.path.getmtime(path)
+        cached = _file_versions.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _file_versions[path] = (mtime, _file_version(path))
+        versions.append(cached[1])
+    return '+'.join(versions)
+
+
+def reload_model(name=None, force=False):
+    """
+    Muat ulang satu atau semua artefak tanpa restart. Model lama tetap dipakai
+    sampai model baru selesai dimuat (tukar atomik). Mengembalikan info model yang dimuat ulang.
+    """
+    names = [name] if name else list(MODEL_ARTIFACTS)
+    reloaded = []
+    with _lock:
+        for n in names:
+            current = _models.get(n)
+            path = _artifact_path(n)
+            if current is not None and not force and _file_version(path) == current.version:
+                continue
+            _models[n] = _load(n)
+            _last_checked[n] = time.monotonic()
+            reloaded.append(model_info(n))
+    return reloaded
+
+
+def preload(names=None):
+    """
+    Muat artefak lebih awal, mis. di proses master sebelum fork (gunicorn --preload)
+    sehingga worker berbagi memori model lewat copy-on-write.
+    """
+    for name in names or MODEL_ARTIFACTS:
+        get_model(name)
+
+
+def model_info(name):
+    entry = _models.get(name)
+    info = {
+        'name': name,
+        'path': _artifact_path(name),
+        'loaded': entry is not None,
+    }
+    if entry is not None:
+        info.update({
+            'version': entry.version,
+            'mtime': datetime.fromtimestamp(entry.mtime),
+            'loaded_at': entry.loaded_at,
+            'load_seconds': round(entry.load_seconds, 4),
+            'pid': entry.pid,
+            'type': type(entry.obj).__name__,
+        })
+    return info
+
+
+def list_models():
+    return [model_info(name) for name in MODEL_ARTIFACTS]
@@ -0,0 +1,278 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+import psycopg2.extras
+
+from .features import FEATURE_COLUMNS
+
+ONLINE_STATE_CACHE_WALLETS = int(os.getenv("ONLINE_STATE_CACHE_WALLETS", 1000))
+
+# Histogram log untuk kuantil nilai (is_large_global) dan median inter_time:
+# bucket = floor(log1p(x) * HIST_SCALE), dibatasi HIST_BUCKETS - 1.
+HIST_BUCKETS = 128
+HIST_SCALE = 4.0
+LARGE_QUANTILE = 0.95
+
+UNINITIALIZED = -1
+
+# Flag dari fitur online bersifat sementara: fitur prefix + kuantil histogram tidak sama
+# persis dengan fitur riwayat penuh di batch_scoring / rescoring. Versi model disimpan
+# dengan akhiran ini sehingga rescore_anomalies menganggapnya usang dan menilainya ulang;
+# hasil batch (riwayat penuh) yang otoritatif.
+ONLINE_VERSION_SUFFIX = "+online"
+
+_DAY_ANGLE = 2 * math.pi / 7
+_HOUR_ANGLE = 2 * math.pi / 24
+
+
+def _bucket(x):
+    return min(HIST_BUCKETS - 1, int(math.log1p(max(x, 0.0)) * HIST_SCALE))
+
+
+def _hist_quantile(hist, q):
+    """Batas atas bucket yang memuat kuantil q; None jika histogram kosong."""
+    total = sum(hist)
+    if not total:
+        return None
+    target = q * total
+    running = 0
+    for index, count in enumerate(hist):
+        running += count
+        if running >= target:
+            return math.expm1((index + 1) / HIST_SCALE)
+    return math.expm1(HIST_BUCKETS / HIST_SCALE)
+
+
+def _value_key(value):
+    return repr(float(value))
+
+
+def _to_datetime(timestamp):
+    """Epoch (Etherscan) atau datetime naif UTC (DB) → datetime naif UTC."""
+    if isinstance(timestamp, datetime):
+        return timestamp
+    return datetime.fromtimestamp(int(timestamp), timezone.utc).replace(tzinfo=None)
+
+
+class WalletFeatureState:
+    """
+    Counter fitur dalam konteks satu wallet, setara kolom-kolom matriks fitur batch
+    tetapi dihitung sebagai prefix (transaksi sampai dan termasuk yang sedang diproses).
+    """
+
+    def __init__(self, wallet, tx_count=0, value_hist=None, inter_hist=None):
+        self.wallet = wallet
+        self.tx_count = tx_count
+        self.value_hist = list(value_hist or [0] * HIST_BUCKETS)
+        self.inter_hist = list(inter_hist or [0] * HIST_BUCKETS)
+        # (kind, key) → [count, last_seen]
+        self.counters = {}
+        self.dirty = set()
+
+    def _bump(self, kind, key, seen_at=None):
+        entry = self.counters.get((kind, key))
+        if entry is None:
+            entry = self.counters[(kind, key)] = [0, None]
+        entry[0] += 1
+        if seen_at is not None:
+            entry[1] = seen_at
+        self.dirty.add((kind, key))
+        return entry
+
+    def update(self, sender, receiver, value, timestamp):
+        """Tambahkan satu transaksi; mengembalikan vektor fitur 11 kolom untuk transaksi itu. O(1)."""
+        value = max(float(value), 0.0)
+        ts = _to_datetime(timestamp)
+
+        sender_entry = self.counters.get(('sender', sender))
+        previous = sender_entry[1] if sender_entry else None
+        inter_time = (ts - previous).total_seconds() if previous is not None else None
+
+        self.tx_count += 1
+        self.value_hist[_bucket(value)] += 1
+        if inter_time is not None:
+            self.inter_hist[_bucket(inter_time)] += 1
+
+        sender_count = self._bump('sender', sender, seen_at=ts)[0]
+        receiver_count = self._bump('receiver', receiver)[0]
+        pair_count = self._bump('pair', f"{sender}|{receiver}")[0]
+        same_value = self._bump('sender_value', f"{sender}|{_value_key(value)}")[0]
+
+        if inter_time is None:
+            # Sama seperti batch: transaksi pertama sender diisi median inter_time
+            inter_time = _hist_quantile(self.inter_hist, 0.5) or 0.0
+        threshold = _hist_quantile(self.value_hist, LARGE_QUANTILE)
+
+        hour = ts.hour * _HOUR_ANGLE
+        day = ts.weekday() * _DAY_ANGLE
+        return [
+            math.log1p(value),
+            math.sin(hour), math.cos(hour),
+            math.sin(day), math.cos(day),
+            1.0 if threshold is not None and value > threshold else 0.0,
+            float(sender_count), float(receiver_count), float(pair_count),
+            float(inter_time), float(same_value),
+        ]
+
+
+class OnlineFeatureEngine:
+    """
+    State fitur online per wallet: di memori (LRU) dan di Postgres. Setiap pemakaian
+    mengunci baris online_feature_wallets (FOR UPDATE) dan memvalidasi cache memori
+    lewat tx_count, sehingga aman dipakai banyak thread/proses dan tahan rollback.
+    """
+
+    def __init__(self, max_wallets=ONLINE_STATE_CACHE_WALLETS):
+        self.max_wallets = max_wallets
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, wallet):
+        with self._lock:
+            state = self._states.get(wallet)
+            if state is not None:
+                self._states.move_to_end(wallet)
+            return state
+
+    def _remember(self, state):
+        with self._lock:
+            self._states[state.wallet] = state
+            self._states.move_to_end(state.wallet)
+            while len(self._states) > self.max_wallets:
+                self._states.popitem(last=False)
+
+    def _create_rows(self, cur, wallets):
+        """Baris state belum-bootstrap untuk wallet yang belum punya state."""
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO online_feature_wallets (wallet, tx_count, value_hist, inter_hist)
+            VALUES %s
+            ON CONFLICT (wallet) DO NOTHING
+        """, [(w, UNINITIALIZED, [0] * HIST_BUCKETS, [0] * HIST_BUCKETS) for w in wallets])
+
+    def _lock_rows(self, cur, wallets):
+        cur.execute("""
+            SELECT wallet, tx_count, value_hist, inter_hist
+            FROM online_feature_wallets
+            WHERE wallet = ANY(%s)
+            ORDER BY wallet
+            FOR UPDATE
+        """, (list(wallets),))
+        return {row[0]: row[1:] for row in cur.fetchall()}
+
+    def _load(self, cur, wallet, tx_count, value_hist, inter_hist):
+        state = self._cached(wallet)
+        if state is not None and state.tx_count == tx_count:
+            return state
+        state = WalletFeatureState(wallet, tx_count, value_hist, inter_hist)
+        cur.execute("""
+            SELECT kind, key, count, last_seen
+            FROM online_feature_counters WHERE wallet = %s
+        """, (wallet,))
+        for kind, key, count, last_seen in cur.fetchall():
+            state.counters[(kind, key)] = [count, last_seen]
+        return state
+
+    def _bootstrap(self, cur, wallet, exclude):
+        """State awal dari riwayat wallet (sekali per wallet), tanpa transaksi di `exclude`."""
+        state = WalletFeatureState(wallet)
+        cur.execute("""
+            SELECT tx_hash, sender, receiver, value, timestamp
+            FROM transactions
+            WHERE sender = %s OR receiver = %s
+            ORDER BY timestamp, tx_hash
+        """, (wallet, wallet))
+        for tx_hash, sender, receiver, value, timestamp in cur.fetchall():
+            if tx_hash not in exclude:
+                state.update(sender, receiver, value, timestamp)
+        return state
+
+    def _checkpoint(self, cur, state):
+        if state.dirty:
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO online_feature_counters (wallet, kind, key, count, last_seen)
+                VALUES %s
+                ON CONFLICT (wallet, kind, key) DO UPDATE SET
+                    count = EXCLUDED.count,
+                    last_seen = COALESCE(EXCLUDED.last_seen, online_feature_counters.last_seen)
+            """, [(state.wallet, kind, key, *state.counters[(kind, key)])
+                  for kind, key in state.dirty])
+            state.dirty.clear()
+        cur.execute("""
+            UPDATE online_feature_wallets
+            SET tx_count = %s, value_hist = %s, inter_hist = %s, updated_at = NOW()
+            WHERE wallet = %s
+        """, (state.tx_count, state.value_hist, state.inter_hist, state.wallet))
+        self._remember(state)
+
+    def process(self, cur, wallet, rows):
+        """
+        Perbarui state untuk transaksi baru `rows` (dict hasil parse_etherscan_tx yang baru
+        di-insert) dan kembalikan matriks fitur (len(rows) x 11) dalam konteks `wallet`.
+        Counter endpoint lain yang sudah punya state ikut diperbarui. Checkpoint ditulis
+        memakai `cur`; commit diserahkan ke pemanggil (satu transaksi dengan ingest).
+        """
+        if not rows:
+            return np.empty((0, len(FEATURE_COLUMNS)))
+        rows = sorted(rows, key=lambda r: (r["timestamp"], r["tx_hash"]))
+        others = {r["sender"] for r in rows} | {r["receiver"] for r in rows}
+        others.discard(wallet)
+        others.discard(None)
+
+        # Satu SELECT ... FOR UPDATE berurutan alamat untuk semua wallet supaya tidak deadlock
+        self._create_rows(cur, [wallet])
+        locked = self._lock_rows(cur, [wallet, *sorted(others)])
+        tx_count, value_hist, inter_hist = locked.pop(wallet)
+        if tx_count == UNINITIALIZED:
+            state = self._bootstrap(cur, wallet, exclude={r["tx_hash"] for r in rows})
+        else:
+            state = self._load(cur, wallet, tx_count, value_hist, inter_hist)
+
+        other_states = [
+            self._load(cur, other, count, v_hist, i_hist)
+            for other, (count, v_hist, i_hist) in locked.items()
+            if count != UNINITIALIZED
+        ]
+
+        try:
+            matrix = []
+            for r in rows:
+                matrix.append(state.update(r["sender"], r["receiver"], r["value"], r["timestamp"]))
+                for other in other_states:
+                    if other.wallet in (r["sender"], r["receiver"]):
+                        other.update(r["sender"], r["receiver"], r["value"], r["timestamp"])
+            for s in [state, *other_states]:
+                self._checkpoint(cur, s)
+        except Exception:
+            # State memori mungkin sudah maju; buang supaya dimuat ulang dari Postgres
+            with self._lock:
+                for s in [state, *other_states]:
+                    self._states.pop(s.wallet, None)
+            raise
+        return np.asarray(matrix, dtype='float64')
+
+
+engine = OnlineFeatureEngine()
+
+
+def score_new_transactions(cur, wallet, rows, inserted):
+    """
+    Beri skor anomaly untuk transaksi yang baru di-insert memakai fitur online (tanpa
+    memuat ulang riwayat). Flag ditandai versi `<model>+online` (sementara, lihat
+    ONLINE_VERSION_SUFFIX). Mengembalikan jumlah anomaly. Commit diserahkan ke pemanggil.
+    """
+    from .batch_scoring import score_matrices, write_flags
+
+    inserted = set(inserted)
+    new_rows = [r for r in rows if r["tx_hash"] in inserted]
+    if not new_rows:
+        return 0
+    new_rows = list({r["tx_hash"]: r for r in new_rows}.values())
+    matrix = engine.process(cur, wallet, new_rows)
+    hashes = [r["tx_hash"] for r in sorted(new_rows, key=lambda r: (r["timestamp"], r["tx_hash"]))]
+    flags, version = score_matrices([matrix])
+    write_flags(cur, hashes, flags, f"{version}{ONLINE_VERSION_SUFFIX}")
+    return int(flags.sum())
@@ -0,0 +1,220 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..database import get_db_connection
+from .etherscan_client import fetch_txlist, EtherscanError, ETHERSCAN_API_KEY
+from .online_features import score_new_transactions
+from .ingest_service import (
+    ingest_transactions,
+    parse_etherscan_tx,
+    get_sync_start_block,
+    record_sync_watermark,
+)
+
+# Sesuaikan dengan tier API key (free tier Etherscan: 5 panggilan/detik)
+ETHERSCAN_RATE_LIMIT = float(os.getenv("ETHERSCAN_RATE_LIMIT", 5))
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", 8))
+REFRESH_MAX_RETRIES = int(os.getenv("REFRESH_MAX_RETRIES", 4))
+REFRESH_BACKOFF = float(os.getenv("REFRESH_BACKOFF", 0.5))            # detik, dikali 2^percobaan
+REFRESH_REQUEST_TIMEOUT = float(os.getenv("REFRESH_REQUEST_TIMEOUT", 30))
+REFRESH_WALLET_TIMEOUT = float(os.getenv("REFRESH_WALLET_TIMEOUT", 300))
+
+
+class TokenBucket:
+    """Rate limiter token bucket yang aman dipakai banyak thread."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _JsonResponse:
+    """Respons yang JSON-nya sudah di-parse (dipakai ulang oleh fetch_txlist)."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class _Retryable(Exception):
+    pass
+
+
+def _is_rate_limited(data):
+    result = data.get("result")
+    return data.get("status") == "0" and isinstance(result, str) and "rate limit" in result.lower()
+
+
+class RateLimitedSession:
+    """
+    Session HTTP ber-pool untuk Etherscan: setiap request menunggu token dari
+    limiter, dan error jaringan / HTTP 429 / 5xx / "Max rate limit reached"
+    diulang dengan exponential backoff + jitter.
+    """
+
+    def __init__(self, limiter, pool_size=REFRESH_WORKERS,
+                 max_retries=REFRESH_MAX_RETRIES, backoff=REFRESH_BACKOFF):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, params=None, timeout=None):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise _Retryable(f"HTTP {response.status_code}")
+                data = response.json()
+                if _is_rate_limited(data):
+                    raise _Retryable(data["result"])
+                return _JsonResponse(data)
+            except (requests.RequestException, ValueError, _Retryable) as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * (2 ** attempt) + random.uniform(0, self.backoff))
+        raise EtherscanError(f"Gagal setelah {self.max_retries + 1} percobaan: {last_error}")
+
+    def close(self):
+        self.session.close()
+
+
+def _refresh_one(wallet_address, http, api_key, after_ingest):
+    """Sinkronkan satu wallet: baca watermark, ambil dari Etherscan, ingest, geser watermark."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        start_block = get_sync_start_block(cur, wallet_address)
+        conn.rollback()  # jangan menahan transaksi terbuka selama menunggu jaringan
+
+        transactions, max_block = fetch_txlist(
+            wallet_address, start_block, api_key, session=http,
+            timeout=REFRESH_REQUEST_TIMEOUT,
+            deadline=time.monotonic() + REFRESH_WALLET_TIMEOUT
+        )
+        rows = [parse_etherscan_tx(tx) for tx in transactions]
+        inserted = ingest_transactions(cur, rows)
+        score_new_transactions(cur, wallet_address, rows, inserted)
+        if after_ingest:
+            after_ingest(conn, cur, wallet_address, inserted)
+
+        record_sync_watermark(cur, wallet_address, max_block)
+        conn.commit()
+        return len(inserted)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def refresh_wallets(wallets=None, api_key=None, workers=REFRESH_WORKERS,
+                    rate_limit=ETHERSCAN_RATE_LIMIT, after_ingest=None, on_progress=None):
+    """
+    Refresh banyak wallet secara paralel (thread pool) dengan rate limit bersama.
+    `wallets` default = semua alamat di wallet_history.
+    `after_ingest(conn, cur, address, inserted_hashes)` dipanggil di transaksi yang sama.
+    `on_progress(done, total)` dipanggil setiap satu wallet selesai.
+    Setiap thread meminjam koneksinya sendiri dari pool (DB_POOL_MAX >= workers).
+    """
+    if wallets is None:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT address FROM wallet_history")
+        wallets = [row[0] for row in cur.fetchall()]
+        cur.close()
+        conn.close()
+
+    api_key = api_key or ETHERSCAN_API_KEY
+    http = RateLimitedSession(TokenBucket(rate_limit), pool_size=workers)
+    result = {
+        "success": 0,
+        "failed": 0,
+        "new_transactions": 0,
+        "errors": {},
+    }
+    started = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_refresh_one, address, http, api_key, after_ingest): address
+                for address in wallets
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                address = futures[future]
+                try:
+                    result["new_transactions"] += future.result()
+                    result["success"] += 1
+                except Exception as e:
+                    print(f"Error saat update {address}: {e}")
+                    result["failed"] += 1
+                    result["errors"][address] = str(e)
+                if on_progress:
+                    on_progress(done, len(wallets))
+    finally:
+        http.close()
+
+    result["elapsed"] = time.monotonic() - started
+    return result
+
+
+def fetch_many(wallets, api_key=None, workers=REFRESH_WORKERS,
+               rate_limit=ETHERSCAN_RATE_LIMIT, api_url=None, start_blocks=None):
+    """
+    Hanya fase jaringan dari refresh_wallets (tanpa database), untuk benchmark/tes offline.
+    Mengembalikan dict alamat → jumlah transaksi, atau exception jika gagal.
+    """
+    start_blocks = start_blocks or {}
+    http = RateLimitedSession(TokenBucket(rate_limit), pool_size=workers)
+
+    def _fetch(address):
+        transactions, _ = fetch_txlist(
+            address, start_blocks.get(address, 0), api_key, session=http,
+            timeout=REFRESH_REQUEST_TIMEOUT,
+            deadline=time.monotonic() + REFRESH_WALLET_TIMEOUT,
+            api_url=api_url
+        )
+        return len(transactions)
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_fetch, address): address for address in wallets}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    results[futures[future]] = e
+    finally:
+        http.close()
+    return results
@@ -0,0 +1,294 @@
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import psycopg2.extras
+
+from ..database import get_db_connection
+from .batch_scoring import (
+    CONTEXT_WALLET_SQL,
+    load_wallet_frames,
+    context_features,
+    score_matrices,
+    write_flags,
+)
+from .feature_store import get_wallet_feature_vectors, feature_frame
+from .inference import predict
+from .model_registry import artifact_version, ANOMALY_ARTIFACTS, CLASSIFIER_ARTIFACTS
+
+RESCORE_CHUNK_ROWS = int(os.getenv("RESCORE_CHUNK_ROWS", 10000))
+RESCORE_WALLET_CHUNK = int(os.getenv("RESCORE_WALLET_CHUNK", 500))
+# Batas baris fitur per-wallet yang disimpan di memori selama backfill (LRU)
+RESCORE_FEATURE_CACHE_ROWS = int(os.getenv("RESCORE_FEATURE_CACHE_ROWS", 500000))
+
+ANOMALY_CHECKPOINT = 'rescore_anomalies'
+BLACKLIST_CHECKPOINT = 'rescore_blacklist'
+
+_CHUNK_SQL = f"""
+    SELECT t.tx_hash, t.timestamp,
+           t.anomaly_model_version IS DISTINCT FROM %(version)s AS stale,
+           {CONTEXT_WALLET_SQL} AS context
+    FROM transactions t
+    WHERE (t.timestamp, t.tx_hash) > (%(ts)s, %(tx_hash)s)
+    ORDER BY t.timestamp, t.tx_hash
+    LIMIT %(limit)s
+"""
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def get_checkpoint(cur, name):
+    cur.execute("""
+        SELECT model_version, last_key, rows_processed, rows_updated, finished_at
+        FROM backfill_checkpoints WHERE name = %s
+    """, (name,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(('model_version', 'last_key', 'rows_processed', 'rows_updated', 'finished_at'), row))
+
+
+def _start_checkpoint(cur, name, model_version, restart):
+    """Lanjutkan checkpoint versi yang sama; versi model baru atau `restart` mulai dari awal."""
+    checkpoint = get_checkpoint(cur, name)
+    if checkpoint and checkpoint['model_version'] == model_version and not restart:
+        return checkpoint
+    cur.execute("""
+        INSERT INTO backfill_checkpoints (name, model_version)
+        VALUES (%s, %s)
+        ON CONFLICT (name) DO UPDATE SET
+            model_version = EXCLUDED.model_version, last_key = NULL,
+            rows_processed = 0, rows_updated = 0,
+            started_at = NOW(), updated_at = NOW(), finished_at = NULL
+    """, (name, model_version))
+    return get_checkpoint(cur, name)
+
+
+def _save_checkpoint(cur, name, last_key, processed, updated, finished=False):
+    cur.execute("""
+        UPDATE backfill_checkpoints
+        SET last_key = %s,
+            rows_processed = rows_processed + %s,
+            rows_updated = rows_updated + %s,
+            updated_at = NOW(),
+            finished_at = CASE WHEN %s THEN NOW() END
+        WHERE name = %s
+    """, (psycopg2.extras.Json(last_key), processed, updated, finished, name))
+
+
+# ---------------------------------------------------------------------------
+# Rescoring flag anomaly (Isolation Forest)
+# ---------------------------------------------------------------------------
+
+class _FeatureCache:
+    """LRU fitur per wallet konteks: tx_hash → baris matriks, dibatasi jumlah baris."""
+
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        self.rows = 0
+        self._entries = OrderedDict()
+
+    def get(self, wallet):
+        entry = self._entries.get(wallet)
+        if entry is not None:
+            self._entries.move_to_end(wallet)
+        return entry
+
+    def put(self, wallet, matrix, tx_hashes):
+        entry = (matrix, {tx_hash: i for i, tx_hash in enumerate(tx_hashes)})
+        self._entries[wallet] = entry
+        self.rows += len(tx_hashes)
+        while self.rows > self.max_rows and len(self._entries) > 1:
+            _, (old, _) = self._entries.popitem(last=False)
+            self.rows -= len(old)
+        return entry
+
+
+def _chunk_features(cur, chunk, cache):
+    """Matriks fitur untuk baris `chunk` (tx_hash, context) yang basi, dalam konteks wallet masing-masing."""
+    # Entri potongan ini dipegang lokal supaya tidak hilang oleh eviction LRU di tengah jalan
+    entries = {}
+    missing = []
+    for context in sorted({context for _, context in chunk}):
+        entry = cache.get(context)
+        if entry is None:
+            missing.append(context)
+        else:
+            entries[context] = entry
+    for i in range(0, len(missing), RESCORE_WALLET_CHUNK):
+        for wallet, frame in load_wallet_frames(cur, missing[i:i + RESCORE_WALLET_CHUNK]):
+            matrix, tx_hashes = context_features(wallet, frame, rescore_all=True)
+            entries[wallet] = cache.put(wallet, matrix, tx_hashes)
+
+    rows, hashes = [], []
+    for tx_hash, context in chunk:
+        entry = entries.get(context)
+        index = entry[1].get(tx_hash) if entry else None
+        if index is None:
+            continue  # transaksi tanpa sender/receiver: tidak bisa dibuat fiturnya
+        rows.append(entry[0][index])
+        hashes.append(tx_hash)
+    return rows, hashes
+
+
+def rescore_anomalies(chunk_rows=RESCORE_CHUNK_ROWS, restart=False, sleep=0.0,
+                      max_chunks=None, echo=None):
+    """
+    Backfill flag anomaly dengan model Isolation Forest yang aktif. Tabel transactions
+    dibaca per potongan keyset (timestamp, tx_hash); hanya baris dengan versi model lain
+    yang dinilai ulang. Flag + checkpoint ditulis dalam satu transaksi per potongan,
+    sehingga proses bisa dihentikan dan dilanjutkan kapan saja. `sleep` memberi jeda
+    antar potongan agar beban ke database tetap ringan selama aplikasi melayani.
+    Fitur riwayat penuh di sini otoritatif: flag online (versi `<model>+online`) juga
+    dianggap usang dan diganti, termasuk yang ditulis setelah checkpoint selesai
+    jika backfill dijalankan ulang dengan `restart`.
+    """
+    version = artifact_version(ANOMALY_ARTIFACTS)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cache = _FeatureCache(RESCORE_FEATURE_CACHE_ROWS)
+    stats = {"model_version": version, "chunks": 0, "processed": 0, "updated": 0}
+    started = time.monotonic()
+    try:
+        checkpoint = _start_checkpoint(cur, ANOMALY_CHECKPOINT, version, restart)
+        conn.commit()
+        last_key = checkpoint['last_key'] or ['-infinity', '']
+        while max_chunks is None or stats["chunks"] < max_chunks:
+            cur.execute(_CHUNK_SQL, {"version": version, "ts": last_key[0],
+                                     "tx_hash": last_key[1], "limit": chunk_rows})
+            rows = cur.fetchall()
+            if not rows:
+                _save_checkpoint(cur, ANOMALY_CHECKPOINT, last_key, 0, 0, finished=True)
+                conn.commit()
+                break
+
+            stale = [(tx_hash, context) for tx_hash, _, is_stale, context in rows
+                     if is_stale and context]
+            updated = 0
+            if stale:
+                matrix_rows, hashes = _chunk_features(cur, stale, cache)
+                if hashes:
+                    # Versi yang benar-benar dipakai predict (bisa berubah karena hot reload
+                    # di tengah backfill); baris bertanda versi lama dinilai ulang run berikutnya
+                    flags, used_version = score_matrices([np.asarray(matrix_rows)])
+                    write_flags(cur, hashes, flags, used_version)
+                    stats["model_version"] = used_version
+                    updated = len(hashes)
+
+            last_key = [rows[-1][1].isoformat(), rows[-1][0]]
+            _save_checkpoint(cur, ANOMALY_CHECKPOINT, last_key, len(rows), updated)
+            conn.commit()
+
+            stats["chunks"] += 1
+            stats["processed"] += len(rows)
+            stats["updated"] += updated
+            if echo:
+                echo(f"  {stats['processed']} baris dibaca, {stats['updated']} dinilai ulang "
+                     f"(posisi {last_key[0]})")
+            if sleep:
+                time.sleep(sleep)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    stats["elapsed"] = round(time.monotonic() - started, 2)
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Rescoring blacklist ML (XGBoost)
+# ---------------------------------------------------------------------------
+
+def rescore_blacklist(chunk_wallets=RESCORE_WALLET_CHUNK, restart=False, sleep=0.0,
+                      max_chunks=None, echo=None):
+    """
+    Klasifikasi ulang semua wallet di wallet_history dengan model XGBoost yang aktif,
+    per potongan keyset alamat. Entri blacklist 'ML-XGBoost' diperbarui versinya atau
+    dihapus bila model baru tidak lagi menandainya; entri dari sumber lain tidak disentuh.
+    """
+    from .wallet_service import save_ml_blacklist, ML_BLACKLIST_SOURCE
+
+    version = artifact_version(CLASSIFIER_ARTIFACTS)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    stats = {"model_version": version, "chunks": 0, "processed": 0, "flagged": 0, "removed": 0}
+    started = time.monotonic()
+    try:
+        checkpoint = _start_checkpoint(cur, BLACKLIST_CHECKPOINT, version, restart)
+        conn.commit()
+        last_address = (checkpoint['last_key'] or [''])[0]
+        while max_chunks is None or stats["chunks"] < max_chunks:
+            cur.execute("""
+                SELECT address FROM wallet_history
+                WHERE address > %s
+                ORDER BY address
+                LIMIT %s
+            """, (last_address, chunk_wallets))
+            wallets = [row[0] for row in cur.fetchall()]
+            if not wallets:
+                _save_checkpoint(cur, BLACKLIST_CHECKPOINT, [last_address], 0, 0, finished=True)
+                conn.commit()
+                break
+
+            # Vektor fitur dari feature store (tidak bergantung versi model); satu predict per potongan
+            vectors = get_wallet_feature_vectors(cur, wallets)
+            classified, features_df = feature_frame(vectors, wallets)
+
+            flagged, cleared = [], []
+            used_version = version
+            if classified:
+                predictions, used_version = predict('classifier', features_df.to_numpy(dtype='float64'))
+                stats["model_version"] = used_version
+                for wallet, prediction in zip(classified, predictions):
+                    (flagged if prediction == 1 else cleared).append(wallet)
+            save_ml_blacklist(cur, flagged, used_version)
+            if cleared:
+                cur.execute("""
+                    DELETE FROM blacklist_addresses
+                    WHERE address = ANY(%s) AND source = %s
+                """, (cleared, ML_BLACKLIST_SOURCE))
+                stats["removed"] += cur.rowcount
+
+            last_address = wallets[-1]
+            _save_checkpoint(cur, BLACKLIST_CHECKPOINT, [last_address], len(wallets), len(classified))
+            conn.commit()
+
+            stats["chunks"] += 1
+            stats["processed"] += len(wallets)
+            stats["flagged"] += len(flagged)
+            if echo:
+                echo(f"  {stats['processed']} wallet diklasifikasi ulang, {stats['flagged']} ditandai, "
+                     f"{stats['removed']} dihapus dari blacklist")
+            if sleep:
+                time.sleep(sleep)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    stats["elapsed"] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def checkpoint_status():
+    """Status semua checkpoint backfill (untuk CLI / API)."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT name, model_version, last_key, rows_processed, rows_updated,
+               started_at, updated_at, finished_at
+        FROM backfill_checkpoints ORDER BY name
+    """)
+    columns = [desc[0] for desc in cur.description]
+    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
@@ -1,6 +1,7 @@
 from decimal import Decimal
 from ..database import get_db_connection
 from .kyc_service import get_wallet_summary
+from .wallet_aggregate import get_wallet_aggregate
 
 THRESHOLD_TX_COUNT = 50
 THRESHOLD_UNIQUE_WALLETS = 20
@@ -9,39 +10,14 @@ THRESHOLD_OUTBOUND_RATIO = Decimal("0.9")
 
 def calculate_wallet_risk(wallet_address):
     """Menghitung profil risiko dari wallet berdasarkan transaksi yang tersimpan di database."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Ambil data transaksi wallet
-    cur.execute("""
-        SELECT COUNT(*) FROM transactions WHERE sender = %s
-    """, (wallet_address,))
-    outbound_tx = cur.fetchone()[0]
-
-    cur.execute("""
-        SELECT COUNT(DISTINCT receiver) FROM transactions WHERE sender = %s
-    """, (wallet_address,))
-    unique_receivers = cur.fetchone()[0]
-
-    cur.execute("""
-        SELECT COUNT(*) FROM transactions WHERE receiver = %s
-    """, (wallet_address,))
-    inbound_tx = cur.fetchone()[0]
-
-    cur.execute("""
-        SELECT COUNT(DISTINCT sender) FROM transactions WHERE receiver = %s
-    """, (wallet_address,))
-    unique_senders = cur.fetchone()[0]
-
-    cur.execute("""
-        SELECT COALESCE(SUM(value), 0) FROM transactions WHERE sender = %s
-    """, (wallet_address,))
-    outbound_value = float(cur.fetchone()[0])
-
-    cur.execute("""
-        SELECT COALESCE(SUM(value), 0) FROM transactions WHERE receiver = %s
-    """, (wallet_address,))
-    inbound_value = float(cur.fetchone()[0])
+    # Ambil data transaksi wallet (satu query agregat)
+    agg = get_wallet_aggregate(wallet_address, with_top_lists=False)
+    outbound_tx = agg.outbound_tx
+    unique_receivers = agg.unique_receivers
+    inbound_tx = agg.inbound_tx
+    unique_senders = agg.unique_senders
+    outbound_value = float(agg.total_sent)
+    inbound_value = float(agg.total_received)
 
     total_value = inbound_value + outbound_value
 
@@ -68,9 +44,6 @@ def calculate_wallet_risk(wallet_address):
     else:
         risk_profile = "Low Risk"
 
-    cur.close()
-    conn.close()
-
     return risk_profile, risk_score
 
 def fetch_transactions_from_db(wallet_address):
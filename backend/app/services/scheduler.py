@@ -1,24 +1,288 @@
-from .detectors import DETECTORS
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import psycopg2.extras
+
+from .detectors import detector_names, get_bulk_detector
 from ..database import get_db_connection
-from .alert_service import save_alert, alert_exists
+from .alert_service import AlertSink
+from .detector_metrics import DetectorMetrics, save_detector_metrics
+
+# Wallet per panggilan detektor bulk (satu query grouped per detektor per batch)
+DETECTOR_BATCH_WALLETS = int(os.getenv("DETECTOR_BATCH_WALLETS", 500))
+# Jendela delta dimulai sedikit sebelum watermark: transaksi ingest yang commit
+# setelah run sebelumnya tetapi dengan NOW() lebih awal tetap ikut terbaca.
+DETECTOR_WATERMARK_OVERLAP = timedelta(seconds=int(os.getenv("DETECTOR_WATERMARK_OVERLAP", 600)))
+# Wallet dibagi ke shard berdasarkan hash alamat; shard dijalankan di process pool
+DETECTOR_SHARDS = int(os.getenv("DETECTOR_SHARDS", 8))
+DETECTOR_WORKERS = int(os.getenv("DETECTOR_WORKERS", 4))  # 0 = shard dijalankan berurutan
+DETECTOR_START_METHOD = os.getenv("DETECTOR_START_METHOD", "spawn")
+DETECTOR_SCHEDULE_MINUTE = os.getenv("DETECTOR_SCHEDULE_MINUTE", "0")
+
+# Kunci advisory lock: hanya satu run terjadwal per cluster (lihat migrate.MIGRATION_LOCK_KEY)
+DETECTOR_LOCK_KEY = 7301002
+
+# Filter shard: hashtext stabil di semua proses/node, tidak seperti hash() Python
+_SHARD_FILTER = "(%(shards)s = 1 OR abs(hashtext({column})::bigint) %% %(shards)s = %(shard)s)"
+
+def load_watermarks(cur, detector_name, shard=0, shards=1):
+    """{wallet: processed_until} untuk satu detektor (hanya wallet di shard ini)."""
+    cur.execute("""
+        SELECT wallet_address, processed_until FROM detector_watermarks
+        WHERE detector_name = %(name)s AND """ + _SHARD_FILTER.format(column='wallet_address'),
+        {"name": detector_name, "shard": shard, "shards": shards})
+    return dict(cur.fetchall())
+
+def save_watermarks(cur, detector_name, wallets, processed_until):
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO detector_watermarks (detector_name, wallet_address, processed_until)
+        VALUES %s
+        ON CONFLICT (detector_name, wallet_address) DO UPDATE SET
+            processed_until = GREATEST(detector_watermarks.processed_until, EXCLUDED.processed_until),
+            updated_at = NOW()
+    """, [(detector_name, wallet, processed_until) for wallet in wallets])
 
-def run_all_detectors():
+def pending_wallets(wallets, watermarks, last_ingested):
+    """
+    Wallet yang perlu diperiksa beserta awal jendela delta (None = seluruh riwayat):
+    wallet tanpa watermark, atau yang menerima transaksi baru setelah watermark.
+    """
+    pending = {}
+    for wallet in wallets:
+        mark = watermarks.get(wallet)
+        if mark is None:
+            pending[wallet] = None
+            continue
+        since = mark - DETECTOR_WATERMARK_OVERLAP
+        updated = last_ingested.get(wallet)
+        if updated is not None and updated > since:
+            pending[wallet] = since
+    return pending
+
+def run_all_detectors(batch_size=DETECTOR_BATCH_WALLETS, full=False, shard=0, shards=1,
+                      run_started=None):
+    """
+    Jalankan semua detektor secara incremental: setiap detektor hanya menerima wallet
+    yang punya transaksi baru sejak watermark-nya, dengan jendela delta per wallet.
+    `full` mengabaikan watermark (pindai ulang seluruh riwayat). `shard`/`shards`
+    membatasi ke sebagian wallet; `run_started` = batas atas watermark run ini.
+    Alert ditulis lewat AlertSink (dedup fingerprint) dalam commit yang sama dengan
+    watermark batch-nya. Mengembalikan {detektor: {wallets, inserted, duplicates, metrics}}.
+    """
     conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        # Batas atas run ini; transaksi yang masuk setelahnya diproses run berikutnya
+        if run_started is None:
+            cur.execute("SELECT NOW()")
+            run_started = cur.fetchone()[0]
+            conn.commit()
+
+        # 1) Ambil wallet (di shard ini) + kapan terakhir kali menerima transaksi baru
+        cur.execute("""
+            SELECT h.address, s.updated_at
+            FROM wallet_history h
+            LEFT JOIN wallet_stats s ON s.address = h.address
+            WHERE """ + _SHARD_FILTER.format(column='h.address') + """
+            ORDER BY h.address
+        """, {"shard": shard, "shards": shards})
+        rows = cur.fetchall()
+        wallets = [address for address, _ in rows]
+        last_ingested = {address: updated for address, updated in rows}
+
+        # 2) Untuk setiap detektor, jalankan per batch wallet yang punya delta
+        summary = {}
+        metrics = DetectorMetrics()
+        for name in detector_names():
+            watermarks = {} if full else load_watermarks(cur, name, shard, shards)
+            pending = pending_wallets(wallets, watermarks, last_ingested)
+            detector_fn = get_bulk_detector(name)
+            sink = AlertSink(conn)
+            targets = list(pending)
+            for start in range(0, len(targets), batch_size):
+                batch = targets[start:start + batch_size]
+                with metrics.track(name, wallets=len(batch)):
+                    results = detector_fn(batch, conn, since={w: pending[w] for w in batch})
+                # 3) Duplikat dibuang oleh unique index (wallet, detektor, fingerprint)
+                for wallet, alerts in results.items():
+                    metrics.add_alerts(name, len(alerts))
+                    for res in alerts:
+                        sink.add(wallet, name, res['data'])
+                sink.flush()
+                save_watermarks(cur, name, batch, run_started)
+                conn.commit()
+            summary[name] = {"wallets": len(pending), **sink.stats(),
+                             "metrics": metrics.as_dict().get(name)}
+    finally:
+        cur.close()
+        conn.close()
+    return summary
+
+def run_shard(run_id, shard, shards, full, run_started):
+    """
+    Jalankan satu shard (di worker process) dan catat waktu/hasil/kegagalannya
+    ke detector_run_shards. Kegagalan tidak dilempar: shard lain tetap jalan.
+    """
+    started = time.monotonic()
+    try:
+        summary = run_all_detectors(full=full, shard=shard, shards=shards, run_started=run_started)
+        status, error = 'done', None
+    except Exception:
+        summary, status, error = {}, 'failed', traceback.format_exc(limit=5)
+    result = {
+        "shard": shard,
+        "status": status,
+        "elapsed": round(time.monotonic() - started, 3),
+        "wallets": sum(s["wallets"] for s in summary.values()),
+        "inserted": sum(s["inserted"] for s in summary.values()),
+        "duplicates": sum(s["duplicates"] for s in summary.values()),
+        "detectors": summary,
+        "error": error,
+    }
+    _record_shard(run_id, result)
+    return result
 
-    # 1) Ambil semua wallet
+def _record_shard(run_id, result):
+    conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT address FROM wallet_history")
-    wallets = [r[0] for r in cur.fetchall()]
+    save_detector_metrics(cur, run_id, result["shard"],
+                          {name: s["metrics"] for name, s in result["detectors"].items() if s.get("metrics")})
+    cur.execute("""
+        INSERT INTO detector_run_shards
+            (run_id, shard, status, wallets, inserted, duplicates, elapsed, detectors, error)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (run_id, shard) DO UPDATE SET
+            status = EXCLUDED.status, wallets = EXCLUDED.wallets, inserted = EXCLUDED.inserted,
+            duplicates = EXCLUDED.duplicates, elapsed = EXCLUDED.elapsed,
+            detectors = EXCLUDED.detectors, error = EXCLUDED.error, finished_at = NOW()
+    """, (run_id, result["shard"], result["status"], result["wallets"], result["inserted"],
+          result["duplicates"], result["elapsed"], psycopg2.extras.Json(result["detectors"]),
+          result["error"]))
+    conn.commit()
     cur.close()
+    conn.close()
 
-    # 2) Untuk setiap wallet dan detektor
-    for wallet in wallets:
-        for name, detector_fn in DETECTORS.items():
-            results = detector_fn(wallet, conn)
-            for res in results:
-                ts = res['data']['timestamp']
-                # 3) Simpan hanya jika belum ada
-                if not alert_exists(conn, wallet, name, ts):
-                    save_alert(wallet, name, res['data'])
-
-    conn.close()
\ No newline at end of file
+def _run_shards(run_id, shards, workers, full, run_started):
+    if workers <= 0:
+        return [run_shard(run_id, shard, shards, full, run_started) for shard in range(shards)]
+
+    results = []
+    pool = ProcessPoolExecutor(max_workers=min(workers, shards),
+                               mp_context=multiprocessing.get_context(DETECTOR_START_METHOD))
+    with pool:
+        futures = {pool.submit(run_shard, run_id, shard, shards, full, run_started): shard
+                   for shard in range(shards)}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception:
+                # Worker mati sebelum sempat mencatat (mis. OOM): catat dari sini
+                result = {"shard": futures[future], "status": 'failed', "elapsed": None,
+                          "wallets": 0, "inserted": 0, "duplicates": 0, "detectors": {},
+                          "error": traceback.format_exc(limit=5)}
+                _record_shard(run_id, result)
+                results.append(result)
+    return sorted(results, key=lambda r: r["shard"])
+
+def list_detector_runs(limit=20):
+    """Run terakhir beserta hasil per shard."""
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("""
+        SELECT r.id, r.status, r.shards, r.full_scan, r.started_at, r.finished_at, r.summary,
+               COALESCE(json_agg(json_build_object(
+                   'shard', s.shard, 'status', s.status, 'wallets', s.wallets,
+                   'inserted', s.inserted, 'duplicates', s.duplicates,
+                   'elapsed', s.elapsed, 'error', s.error
+               ) ORDER BY s.shard) FILTER (WHERE s.shard IS NOT NULL), '[]') AS shard_results
+        FROM detector_runs r
+        LEFT JOIN detector_run_shards s ON s.run_id = r.id
+        GROUP BY r.id
+        ORDER BY r.started_at DESC
+        LIMIT %s
+    """, (limit,))
+    rows = [dict(row) for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
+
+def run_scheduled_detectors(full=False, shards=DETECTOR_SHARDS, workers=DETECTOR_WORKERS):
+    """
+    Satu sapuan detektor per cluster: dilindungi pg_try_advisory_lock sehingga jika
+    proses lain (worker gunicorn lain, node lain) sedang menjalankannya, pemanggil ini
+    langsung kembali dengan None. Wallet dibagi ke `shards` shard hash dan dijalankan
+    di process pool. Mengembalikan ringkasan run (juga tersimpan di detector_runs).
+    """
+    lock_conn = get_db_connection()
+    cur = lock_conn.cursor()
+    cur.execute("SELECT pg_try_advisory_lock(%s)", (DETECTOR_LOCK_KEY,))
+    acquired = cur.fetchone()[0]
+    lock_conn.commit()
+    if not acquired:
+        cur.close()
+        lock_conn.close()
+        return None
+
+    started = time.monotonic()
+    try:
+        cur.execute("""
+            INSERT INTO detector_runs (shards, full_scan) VALUES (%s, %s)
+            RETURNING id, started_at
+        """, (shards, full))
+        run_id, run_started = cur.fetchone()
+        lock_conn.commit()
+
+        try:
+            results = _run_shards(run_id, shards, workers, full, run_started)
+        except Exception:
+            lock_conn.rollback()
+            cur.execute("""
+                UPDATE detector_runs SET status = 'failed', finished_at = NOW(), summary = %s
+                WHERE id = %s
+            """, (psycopg2.extras.Json({"error": traceback.format_exc(limit=5)}), run_id))
+            lock_conn.commit()
+            raise
+
+        status = 'failed' if any(r["status"] != 'done' for r in results) else 'done'
+        summary = {
+            "elapsed": round(time.monotonic() - started, 3),
+            "wallets": sum(r["wallets"] for r in results),
+            "inserted": sum(r["inserted"] for r in results),
+            "duplicates": sum(r["duplicates"] for r in results),
+            "failed_shards": [r["shard"] for r in results if r["status"] != 'done'],
+        }
+        cur.execute("""
+            UPDATE detector_runs SET status = %s, finished_at = NOW(), summary = %s
+            WHERE id = %s
+        """, (status, psycopg2.extras.Json(summary), run_id))
+        lock_conn.commit()
+        return {"run_id": run_id, "status": status, **summary, "shards": results}
+    finally:
+        lock_conn.rollback()
+        cur.execute("SELECT pg_advisory_unlock(%s)", (DETECTOR_LOCK_KEY,))
+        lock_conn.commit()
+        cur.close()
+        lock_conn.close()
+
+_background_scheduler = None
+
+def start_background_scheduler():
+    """
+    APScheduler di proses ini: sapuan detektor tiap jam (menit DETECTOR_SCHEDULE_MINUTE).
+    Aman dijalankan di setiap worker gunicorn karena run_scheduled_detectors memakai
+    advisory lock; worker yang kalah berebut lock hanya melewati jadwal itu.
+    """
+    global _background_scheduler
+    if _background_scheduler is None:
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        _background_scheduler = BackgroundScheduler(timezone='Asia/Jakarta')
+        _background_scheduler.add_job(run_scheduled_detectors, 'cron', minute=DETECTOR_SCHEDULE_MINUTE,
+                                      id='detectors', max_instances=1, coalesce=True)
+        _background_scheduler.start()
+    return _background_scheduler
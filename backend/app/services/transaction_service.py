@@ -1,8 +1,15 @@
 from ..database import get_db_connection
+from .address_search import resolve_address_query
+from .large_tx import large_tx_threshold, first_large_tx_for_wallet
 from neo4j import GraphDatabase
-from collections import Counter,defaultdict
+from collections import Counter,OrderedDict,defaultdict
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import base64
 import hashlib
+import json
+import threading
+import time
 # Konfigurasi koneksi ke Neo4j
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
@@ -78,46 +85,224 @@ def get_transitive_risk_graph(wallet_address: str, max_hops: int = 3, limit: int
 
 def get_transactions_from_neo4j(wallet=None, sort_by="timestamp", order="desc", limit=10, offset=0):
     """Mengambil transaksi dari Neo4j dengan filter dan sorting"""
+    # Teks pencarian di-resolve ke alamat konkret lewat index PostgreSQL,
+    # sehingga Neo4j cukup mencocokkan alamat persis (bukan CONTAINS atas semua node).
+    addresses = resolve_address_query(wallet).addresses if wallet else None
     query = """
     MATCH (s:Wallet)-[t:SEND]->(r:Wallet)
-    WHERE $wallet IS NULL OR s.address CONTAINS $wallet OR r.address CONTAINS $wallet
+    WHERE $addresses IS NULL OR s.address IN $addresses OR r.address IN $addresses
     RETURN s.address AS sender, r.address AS receiver, t.value AS value, t.timestamp AS timestamp
     ORDER BY """ + sort_by + " " + order + """
     SKIP $offset LIMIT $limit
     """
     with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
         with driver.session() as session:
-            result = session.run(query, wallet=wallet, offset=offset, limit=limit)
+            result = session.run(query, addresses=addresses, offset=offset, limit=limit)
             return [record.values() for record in result]
 
-THRESHOLD_LARGE_TX = 10000  # Ambang batas transaksi besar (ETH)
+# Keyset pagination: kolom urut → tipe untuk cast nilai cursor
+SORTABLE_COLUMNS = {"timestamp": "timestamp", "value": "numeric"}
+# Sumber halaman keyset (kolom pertama tx_hash, lalu kolom yang ditampilkan)
+_TRANSACTIONS_PAGE_SQL = "SELECT tx_hash, sender, receiver, value, timestamp FROM transactions"
+_ANOMALY_PAGE_SQL = """
+    SELECT tx_hash, sender, receiver, value, timestamp
+    FROM transactions
+    WHERE is_anomaly = TRUE
+"""
+COUNT_CACHE_TTL = 60  # detik
+COUNT_CACHE_MAX_ENTRIES = 1024  # kunci = himpunan alamat, dibatasi agar tidak tumbuh tanpa batas
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+def encode_cursor(sort_value, tx_hash):
+    """Cursor keyset (nilai kolom urut, tx_hash) → token string aman-URL."""
+    raw = json.dumps([str(sort_value), tx_hash])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(token):
+    """Kebalikan encode_cursor; token tidak valid dianggap halaman pertama."""
+    if not token:
+        return None
+    try:
+        sort_value, tx_hash = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return sort_value, tx_hash
+    except (ValueError, TypeError):
+        return None
+
+def _parse_cursor_value(sort_by, raw):
+    """Nilai cursor sesuai tipe SORTABLE_COLUMNS[sort_by]; None jika tidak valid."""
+    try:
+        if SORTABLE_COLUMNS[sort_by] == "timestamp":
+            return datetime.fromisoformat(raw)
+        value = Decimal(raw)
+        return value if value.is_finite() else None
+    except (ValueError, TypeError, InvalidOperation):
+        return None
+
+def _keyset_page_sql(base_sql, sort_by, scan_desc, with_cursor):
+    """SQL satu halaman keyset; parameter: params base_sql, [nilai urut, tx_hash], limit."""
+    op = "<" if scan_desc else ">"
+    scan_order = "DESC" if scan_desc else "ASC"
+    where = f" AND ({sort_by}, tx_hash) {op} (%s::{SORTABLE_COLUMNS[sort_by]}, %s)" if with_cursor else ""
+    return f"""
+        SELECT * FROM ({base_sql}) page_src
+        WHERE TRUE{where}
+        ORDER BY {sort_by} {scan_order}, tx_hash {scan_order}
+        LIMIT %s
+    """
+
+def _keyset_page(base_sql, params, sort_by, order, cursor, direction, per_page):
+    """
+    Ambil satu halaman dengan keyset (sort_by, tx_hash) alih-alih OFFSET.
+    `direction='prev'` membaca mundur dari cursor lalu membalik hasilnya.
+    Kolom pertama hasil base_sql harus tx_hash, lalu kolom yang ditampilkan.
+    """
+    if sort_by not in SORTABLE_COLUMNS:
+        sort_by = "timestamp"
+    descending = order != "asc"
+    backwards = direction == "prev"
+    scan_desc = descending != backwards
+
+    position = decode_cursor(cursor)
+    if position:
+        # Cursor hasil rekayasa atau dari sort_by lain diabaikan (halaman pertama),
+        # bukan diteruskan ke cast SQL yang akan gagal.
+        sort_value = _parse_cursor_value(sort_by, position[0])
+        position = (sort_value, position[1]) \
+            if sort_value is not None and isinstance(position[1], str) else None
+    query_params = list(params)
+    if position:
+        query_params.extend(position)
+    sql = _keyset_page_sql(base_sql, sort_by, scan_desc, bool(position))
+    query_params.append(per_page + 1)
 
-def detect_large_tx_for_wallet(wallet):
-    """Deteksi transaksi besar terkait dengan wallet tertentu sebagai sender atau receiver."""
     conn = get_db_connection()
     cur = conn.cursor()
+    cur.execute(sql, query_params)
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
 
-    # Query untuk mendapatkan transaksi pertama kali di atas threshold untuk wallet tertentu
-    cur.execute("""
-        SELECT sender, receiver, value, timestamp
-        FROM transactions t1
-        WHERE value >= %s
-        AND (sender = %s OR receiver = %s)
-        AND timestamp = (
-            SELECT MIN(timestamp) 
-            FROM transactions t2
-            WHERE t1.sender = t2.sender 
-            AND t1.receiver = t2.receiver
-        )
-        ORDER BY timestamp ASC
-    """, (THRESHOLD_LARGE_TX, wallet, wallet))
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    sort_idx = {"timestamp": 4, "value": 3}[sort_by]
+    first_key = encode_cursor(rows[0][sort_idx], rows[0][0]) if rows else None
+    last_key = encode_cursor(rows[-1][sort_idx], rows[-1][0]) if rows else None
+    if backwards:
+        next_cursor = last_key
+        prev_cursor = first_key if has_more else None
+    else:
+        next_cursor = last_key if has_more else None
+        prev_cursor = first_key if position else None
 
-    anomalies = cur.fetchall()
+    return {
+        "rows": rows,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
 
+def _empty_page():
+    return {"rows": [], "next_cursor": None, "prev_cursor": None}
+
+def get_transactions_page(addresses=None, sort_by="timestamp", order="desc",
+                          cursor=None, direction="next", per_page=10):
+    """
+    Satu halaman transaksi dengan keyset pagination.
+    `addresses` = hasil resolve_address_query (None = tanpa filter).
+    """
+    base_sql = _TRANSACTIONS_PAGE_SQL
+    params = ()
+    if addresses is not None:
+        if not addresses:
+            return _empty_page()
+        base_sql += " WHERE sender = ANY(%s) OR receiver = ANY(%s)"
+        params = (list(addresses), list(addresses))
+    return _keyset_page(base_sql, params, sort_by, order, cursor, direction, per_page)
+
+def get_anomaly_page(addresses=None, cursor=None, direction="next", per_page=10):
+    """Satu halaman transaksi anomaly, urut timestamp naik, dengan keyset pagination."""
+    base_sql = _ANOMALY_PAGE_SQL
+    params = ()
+    if addresses is not None:
+        if not addresses:
+            return _empty_page()
+        base_sql += " AND (sender = ANY(%s) OR receiver = ANY(%s))"
+        params = (list(addresses), list(addresses))
+    return _keyset_page(base_sql, params, "timestamp", "asc", cursor, direction, per_page)
+
+def _cached_count(key, sql, params):
+    """COUNT(*) yang di-cache per proses selama COUNT_CACHE_TTL detik (LRU, maks. COUNT_CACHE_MAX_ENTRIES)."""
+    now = time.monotonic()
+    with _count_cache_lock:
+        hit = _count_cache.get(key)
+        if hit and now - hit[1] < COUNT_CACHE_TTL:
+            _count_cache.move_to_end(key)
+            return hit[0]
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    count = cur.fetchone()[0]
     cur.close()
     conn.close()
+    # Query di luar lock; akses cache dikunci karena Flask melayani request multi-thread
+    with _count_cache_lock:
+        _count_cache[key] = (count, now)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.popitem(last=False)
+    return count
+
+def estimate_transaction_count(addresses=None):
+    """
+    Perkiraan jumlah transaksi untuk tampilan pagination.
+    Tanpa filter: statistik planner (pg_class.reltuples), tanpa scan tabel.
+    Satu alamat: dari wallet_stats (lookup primary key).
+    Beberapa alamat: COUNT(*) yang di-cache sebentar.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    if addresses is not None:
+        if not addresses:
+            estimate = 0
+        elif len(addresses) == 1:
+            cur.execute("""
+                SELECT inbound_tx + outbound_tx FROM wallet_stats WHERE address = %s
+            """, (addresses[0],))
+            row = cur.fetchone()
+            estimate = row[0] if row else None
+        else:
+            estimate = None
+        cur.close()
+        conn.close()
+        if estimate is None:
+            key = ("transactions", tuple(sorted(addresses)))
+            estimate = _cached_count(
+                key,
+                "SELECT COUNT(*) FROM transactions WHERE sender = ANY(%s) OR receiver = ANY(%s)",
+                (list(addresses), list(addresses))
+            )
+        return estimate
+
+    cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'transactions'::regclass")
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    estimate = row[0] if row else -1
+    if estimate is None or estimate < 0:
+        # Tabel belum pernah di-ANALYZE
+        return _cached_count(("transactions", None), "SELECT COUNT(*) FROM transactions", ())
+    return estimate
+
+# Ambang transaksi besar (ETH); dikonfigurasi per aset di large_tx.LARGE_TX_THRESHOLDS
+THRESHOLD_LARGE_TX = large_tx_threshold()
+HOURLY_TX_SPIKE_THRESHOLD = 50  # Transaksi per jam (kirim atau terima) yang dianggap lonjakan
 
-    return anomalies
+def detect_large_tx_for_wallet(wallet, conn=None):
+    """Transfer pertama di atas threshold per pasangan sender-receiver yang melibatkan wallet."""
+    return first_large_tx_for_wallet(wallet, conn)
 
 def get_first_large_tx_api(wallet_address: str):
     """
@@ -134,32 +319,30 @@ def get_first_large_tx_api(wallet_address: str):
         for sender, receiver, value, ts in anomalies
     ]
 
+# Jumlah transaksi per 1 jam sebagai sender / receiver (kolom diisi dari daftar tetap)
+_HOURLY_COUNT_SQL = """
+    SELECT DATE_TRUNC('hour', timestamp) AS hour_bucket, COUNT(*)
+    FROM transactions
+    WHERE {column} = %s
+    GROUP BY hour_bucket
+    HAVING COUNT(*) > %s
+    ORDER BY hour_bucket ASC
+"""
+_HOURLY_SENDER_SQL = _HOURLY_COUNT_SQL.format(column="sender")
+_HOURLY_RECEIVER_SQL = _HOURLY_COUNT_SQL.format(column="receiver")
+
 def get_hourly_transaction_count(wallet):
     """Mengambil jumlah transaksi per 1 jam untuk wallet tertentu sebagai sender dan receiver."""
     conn = get_db_connection()
     cur = conn.cursor()
 
     # Hitung jumlah transaksi sebagai sender per 1 jam
-    cur.execute("""
-        SELECT DATE_TRUNC('hour', timestamp) AS hour_bucket, COUNT(*) 
-        FROM transactions
-        WHERE sender = %s
-        GROUP BY hour_bucket
-        HAVING COUNT(*) > 50
-        ORDER BY hour_bucket ASC
-    """, (wallet,))
+    cur.execute(_HOURLY_SENDER_SQL, (wallet, HOURLY_TX_SPIKE_THRESHOLD))
 
     sender_hourly_tx_counts = cur.fetchall()
 
     # Hitung jumlah transaksi sebagai receiver per 1 jam
-    cur.execute("""
-        SELECT DATE_TRUNC('hour', timestamp) AS hour_bucket, COUNT(*) 
-        FROM transactions
-        WHERE receiver = %s
-        GROUP BY hour_bucket
-        HAVING COUNT(*) > 50
-        ORDER BY hour_bucket ASC
-    """, (wallet,))
+    cur.execute(_HOURLY_RECEIVER_SQL, (wallet, HOURLY_TX_SPIKE_THRESHOLD))
 
     receiver_hourly_tx_counts = cur.fetchall()
 
@@ -243,17 +426,26 @@ def get_blacklist_interactions(wallet_address):
     return blacklist_interactions
 
 def detect_recurring_transactions_raw(wallet_address):
+    return classify_recurring_pattern(get_wallet_timestamps(wallet_address))
+
+_WALLET_TIMESTAMPS_SQL = """
+    SELECT timestamp FROM transactions
+    WHERE sender = %s OR receiver = %s
+    ORDER BY timestamp ASC
+"""
+
+def get_wallet_timestamps(wallet_address):
+    """Timestamp semua transaksi wallet (kirim atau terima), urut naik."""
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("""
-        SELECT timestamp FROM transactions 
-        WHERE sender = %s OR receiver = %s
-        ORDER BY timestamp ASC
-    """, (wallet_address, wallet_address))
+    cur.execute(_WALLET_TIMESTAMPS_SQL, (wallet_address, wallet_address))
     timestamps = [row[0] for row in cur.fetchall()]
     cur.close()
     conn.close()
+    return timestamps
 
+def classify_recurring_pattern(timestamps):
+    """Pola 'daily' / 'weekly' / 'monthly' dari timestamp transaksi (urut naik), atau None."""
     if len(timestamps) < 5:
         return None  # terlalu sedikit
 
@@ -346,6 +538,14 @@ def get_high_risk_address_count(threshold: float = 0.8):
     conn.close()
     return {"high_risk_addresses": int(count), "threshold": threshold}
 
+_ANOMALY_CASES_SQL = """
+    SELECT tx_hash, sender, value, timestamp
+    FROM transactions
+    WHERE is_anomaly = TRUE
+    ORDER BY timestamp DESC
+    LIMIT %s
+"""
+
 def get_anomaly_cases(limit: int = 10):
     """
     Mengambil transaksi anomalous terbaru (ETH saja)
@@ -353,13 +553,7 @@ def get_anomaly_cases(limit: int = 10):
     """
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("""
-        SELECT tx_hash, sender, value, timestamp
-        FROM transactions
-        WHERE is_anomaly = TRUE
-        ORDER BY timestamp DESC
-        LIMIT %s
-    """, (limit,))
+    cur.execute(_ANOMALY_CASES_SQL, (limit,))
     rows = cur.fetchall()
     cur.close()
     conn.close()
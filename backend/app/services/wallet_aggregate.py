@@ -0,0 +1,170 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from ..database import get_db_connection
+from .wallet_stats import get_wallet_stats
+
+TOP_N = 3
+
+# Satu scan per wallet: baris wallet diambil sekali ke CTE `tx`,
+# lalu semua agregat dihitung dari CTE itu dengan FILTER.
+_AGGREGATE_SQL = """
+    WITH tx AS (
+        SELECT tx_hash, sender, receiver, value, timestamp
+        FROM transactions
+        WHERE sender = %(wallet)s OR receiver = %(wallet)s
+    )
+    SELECT
+        COALESCE(SUM(value) FILTER (WHERE receiver = %(wallet)s), 0) AS total_received,
+        COALESCE(SUM(value) FILTER (WHERE sender = %(wallet)s), 0)   AS total_sent,
+        COUNT(*) FILTER (WHERE receiver = %(wallet)s)                AS inbound_tx,
+        COUNT(*) FILTER (WHERE sender = %(wallet)s)                  AS outbound_tx,
+        COUNT(DISTINCT sender) FILTER (WHERE receiver = %(wallet)s)  AS unique_senders,
+        COUNT(DISTINCT receiver) FILTER (WHERE sender = %(wallet)s)  AS unique_receivers,
+        (SELECT json_build_array(sender, receiver, value, timestamp)::text
+           FROM tx ORDER BY timestamp ASC LIMIT 1)                   AS first_tx,
+        (SELECT json_build_array(sender, receiver, value, timestamp)::text
+           FROM tx ORDER BY timestamp DESC LIMIT 1)                  AS last_tx
+        {top_lists}
+    FROM tx
+"""
+
+_TOP_LISTS_ONLY_SQL = """
+    WITH tx AS (
+        SELECT tx_hash, sender, receiver, value, timestamp
+        FROM transactions
+        WHERE sender = %(wallet)s OR receiver = %(wallet)s
+    )
+    SELECT NULL {top_lists}
+"""
+
+_TOP_LISTS_SQL = """,
+        (SELECT COALESCE(json_agg(json_build_array(tx_hash, sender, receiver, value, timestamp)
+                                  ORDER BY value DESC), '[]')::text
+           FROM (SELECT * FROM tx ORDER BY value DESC LIMIT %(top_n)s) t)   AS top_transactions,
+        (SELECT COALESCE(json_agg(json_build_array(receiver, n) ORDER BY n DESC), '[]')::text
+           FROM (SELECT receiver, COUNT(*) AS n FROM tx WHERE sender = %(wallet)s
+                 GROUP BY receiver ORDER BY n DESC LIMIT %(top_n)s) t)       AS top_receivers,
+        (SELECT COALESCE(json_agg(json_build_array(sender, n) ORDER BY n DESC), '[]')::text
+           FROM (SELECT sender, COUNT(*) AS n FROM tx WHERE receiver = %(wallet)s
+                 GROUP BY sender ORDER BY n DESC LIMIT %(top_n)s) t)         AS top_senders
+"""
+
+
+@dataclass(frozen=True)
+class WalletAggregate:
+    """Ringkasan angka wallet yang dipakai bersama KYC, skor risiko, dan API."""
+    address: str
+    total_received: Decimal = Decimal(0)
+    total_sent: Decimal = Decimal(0)
+    inbound_tx: int = 0
+    outbound_tx: int = 0
+    unique_senders: int = 0
+    unique_receivers: int = 0
+    # (sender, receiver, value, timestamp)
+    first_transaction: Optional[Tuple] = None
+    last_transaction: Optional[Tuple] = None
+    # (tx_hash, sender, receiver, value, timestamp)
+    top_transactions: List[Tuple] = field(default_factory=list)
+    # (address, jumlah transaksi)
+    top_receivers: List[Tuple] = field(default_factory=list)
+    top_senders: List[Tuple] = field(default_factory=list)
+
+    @property
+    def balance(self):
+        return self.total_received - self.total_sent
+
+    @property
+    def tx_count(self):
+        return self.inbound_tx + self.outbound_tx
+
+    def as_summary(self):
+        """Bentuk dict yang sama dengan get_wallet_summary lama."""
+        return {
+            "balance": self.balance,
+            "total_received": self.total_received,
+            "total_sent": self.total_sent,
+            "first_transaction": self.first_transaction,
+            "last_transaction": self.last_transaction
+        }
+
+
+def _parse_json(text):
+    return json.loads(text, parse_float=Decimal) if text else None
+
+
+def _to_value(v):
+    return v if isinstance(v, Decimal) else Decimal(v)
+
+
+def _to_tx(row):
+    """[.., value, timestamp] dari JSON → tuple dengan Decimal dan datetime."""
+    if row is None:
+        return None
+    *head, value, ts = row
+    return (*head, _to_value(value), datetime.fromisoformat(ts))
+
+
+def get_wallet_aggregate(wallet_address, with_top_lists=True, conn=None):
+    """
+    Menghitung semua angka ringkasan wallet (total, jumlah transaksi, counterparty unik,
+    transaksi pertama/terakhir, dan daftar top-3) dalam satu query,
+    atau dari wallet_stats jika statistik wallet sudah dimaterialisasi.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    params = {"wallet": wallet_address, "top_n": TOP_N}
+    top_lists = _TOP_LISTS_SQL if with_top_lists else ""
+    cur = conn.cursor()
+
+    # Angka wallet diambil dari wallet_stats (lookup primary key); scan agregat
+    # atas transactions hanya untuk wallet yang belum punya baris statistik.
+    stats = get_wallet_stats(wallet_address, conn=conn)
+    if stats is not None:
+        tops = []
+        if with_top_lists:
+            cur.execute(_TOP_LISTS_ONLY_SQL.format(top_lists=top_lists), params)
+            tops = cur.fetchone()[1:]
+        first_tx = stats["first_transaction"]
+        last_tx = stats["last_transaction"]
+        numbers = (stats["inbound_value"], stats["outbound_value"],
+                   stats["inbound_tx"], stats["outbound_tx"],
+                   stats["unique_senders"], stats["unique_receivers"])
+    else:
+        cur.execute(_AGGREGATE_SQL.format(top_lists=top_lists), params)
+        row = cur.fetchone()
+        numbers = row[:6]
+        first_tx = _to_tx(_parse_json(row[6]))
+        last_tx = _to_tx(_parse_json(row[7]))
+        tops = row[8:]
+    cur.close()
+    if own_conn:
+        conn.close()
+
+    (total_received, total_sent, inbound_tx, outbound_tx,
+     unique_senders, unique_receivers) = numbers
+
+    top_transactions, top_receivers, top_senders = [], [], []
+    if with_top_lists:
+        top_transactions = [_to_tx(r) for r in _parse_json(tops[0])]
+        top_receivers = [tuple(r) for r in _parse_json(tops[1])]
+        top_senders = [tuple(r) for r in _parse_json(tops[2])]
+
+    return WalletAggregate(
+        address=wallet_address,
+        total_received=total_received,
+        total_sent=total_sent,
+        inbound_tx=inbound_tx,
+        outbound_tx=outbound_tx,
+        unique_senders=unique_senders,
+        unique_receivers=unique_receivers,
+        first_transaction=first_tx,
+        last_transaction=last_tx,
+        top_transactions=top_transactions,
+        top_receivers=top_receivers,
+        top_senders=top_senders
+    )
@@ -1,34 +1,34 @@
 from ..database import get_db_connection
 from ..services.risk_analysis import calculate_wallet_risk, fetch_transactions_from_db
 from ..services.neo4j_sync import is_neo4j_running, migrate_transactions, label_blacklisted_wallets
-from ..services.kyc_service import is_wallet_blacklisted, get_top_transactions, get_top_receivers, get_top_senders
+from ..services.kyc_service import is_wallet_blacklisted
+from ..services.wallet_aggregate import get_wallet_aggregate
+from ..services.ingest_service import (
+    ingest_transactions,
+    parse_etherscan_tx,
+    get_sync_start_block,
+    record_sync_watermark,
+)
+from ..services.etherscan_client import fetch_txlist, EtherscanError
+from ..services.refresh_engine import refresh_wallets
+from ..services.inference import predict
+from ..services.features import build_feature_matrix, build_feature_matrix_with_order
+from ..services.feature_store import get_wallet_feature_vectors, feature_frame
+from ..services.online_features import score_new_transactions
 
 import requests
 import pandas as pd
-import numpy as np
-import joblib
 import os
 import psycopg2
 import psycopg2.extras
 
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-MODEL_DIR = os.path.join(BASE_DIR, 'models')
-
-IF_MODEL_PATH   = os.path.join(MODEL_DIR, 'isolation_forest_best_model.pkl')
-XGB_MODEL_PATH  = os.path.join(MODEL_DIR, 'model_xgboost_aml.pkl')
-SCALER_PATH     = os.path.join(MODEL_DIR, 'scaler_if.pkl')
-SCALER_XGB_PATH = os.path.join(MODEL_DIR, 'scaler_xgb.pkl')
-
-# Load model deteksi anomali
-model       = joblib.load(IF_MODEL_PATH)
-xgb_model   = joblib.load(XGB_MODEL_PATH)
-scaler      = joblib.load(SCALER_PATH)
-scaler_xgb  = joblib.load(SCALER_XGB_PATH)
-
-def fetch_transactions_df(wallet_address):
-    conn = get_db_connection()
+def fetch_transactions_df(wallet_address, conn=None):
+    # `conn` dari pemanggil ikut membaca transaksi yang belum di-commit
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
     query = """
         SELECT tx_hash, sender, receiver, value, timestamp
         FROM transactions
@@ -36,7 +36,8 @@ def fetch_transactions_df(wallet_address):
         ORDER BY timestamp ASC
     """
     df = pd.read_sql(query, conn, params=(wallet_address, wallet_address))
-    conn.close()
+    if own_conn:
+        conn.close()
     return df
 
 def fetch_all_transactions(wallet_address: str):
@@ -77,160 +78,53 @@ def fetch_all_transactions(wallet_address: str):
     ]
 
 def extract_wallet_features(df, wallet_address):
-    # Pastikan kolom timestamp sebagai datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-    # Fitur waktu: jam dan hari
-    df['hour_of_day'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-    df['hour_sin'] = np.sin(2 * np.pi * df['hour_of_day'] / 24)
-    df['hour_cos'] = np.cos(2 * np.pi * df['hour_of_day'] / 24)
-    df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-    df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-
-    # Transformasi nilai transaksi
-    df['value'] = df['value'].clip(lower=0)
-    df['log_value'] = np.log1p(df['value'])
-
-    # Flag transaksi besar berdasarkan kuantil 95%
-    threshold_95 = df['value'].quantile(0.95)
-    df['is_large_global'] = (df['value'] > threshold_95).astype(int)
-
-    # Jumlah transaksi per sender/receiver
-    sender_counts = df['sender'].value_counts().to_dict()
-    receiver_counts = df['receiver'].value_counts().to_dict()
-    df['sender_tx_count'] = df['sender'].map(sender_counts)
-    df['receiver_tx_count'] = df['receiver'].map(receiver_counts)
-
-    # Frekuensi pasangan.sender-receiver
-    pair_counts = df.groupby(['sender', 'receiver']).size().to_dict()
-    df['tx_pair_freq'] = df.apply(
-        lambda row: pair_counts.get((row['sender'], row['receiver']), 0),
-        axis=1
-    )
-
-    # Waktu antar transaksi per sender
-    df.sort_values(['sender', 'timestamp'], inplace=True)
-    df['prev_time'] = df.groupby('sender')['timestamp'].shift(1)
-    df['inter_time'] = (df['timestamp'] - df['prev_time']).dt.total_seconds()
-    df['inter_time'] = df['inter_time'].fillna(df['inter_time'].median())
-
-    # Hitung kemunculan nilai yang sama per sender
-    df['same_value_count'] = df.groupby(['sender', 'value'])['value'].transform('count')
-
-    # Pilih kolom fitur sesuai model
-    feature_cols = [
-        'log_value', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
-        'is_large_global', 'sender_tx_count', 'receiver_tx_count',
-        'tx_pair_freq', 'inter_time', 'same_value_count'
-    ]
-    features_df = df[feature_cols].copy()
-    features_df = features_df.fillna(features_df.median())
-    return features_df
+    """Fitur per transaksi untuk klasifikasi wallet (XGBoost); NaN diisi median."""
+    return build_feature_matrix(df, fill_missing=True)
 
 def prepare_features(df):
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['hour_of_day'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-
-    df['hour_sin'] = np.sin(2 * np.pi * df['hour_of_day'] / 24)
-    df['hour_cos'] = np.cos(2 * np.pi * df['hour_of_day'] / 24)
-    df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-    df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-
-    df['value'] = df['value'].clip(lower=0)
-    df['log_value'] = np.log1p(df['value'])
+    """Fitur per transaksi untuk deteksi anomali (Isolation Forest)."""
+    return build_feature_matrix(df)
 
-    threshold_95 = df['value'].quantile(0.95)
-    df['is_large_global'] = (df['value'] > threshold_95).astype(int)
-
-    sender_counts = df['sender'].value_counts().to_dict()
-    receiver_counts = df['receiver'].value_counts().to_dict()
-    df['sender_tx_count'] = df['sender'].map(sender_counts)
-    df['receiver_tx_count'] = df['receiver'].map(receiver_counts)
-
-    pair_counts = df.groupby(['sender', 'receiver']).size().to_dict()
-    df['tx_pair_freq'] = df.apply(lambda row: pair_counts.get((row['sender'], row['receiver']), 0), axis=1)
-
-    df.sort_values(['sender', 'timestamp'], inplace=True)
-    df['prev_time'] = df.groupby('sender')['timestamp'].shift(1)
-    df['inter_time'] = (df['timestamp'] - df['prev_time']).dt.total_seconds()
-    df['inter_time'] = df['inter_time'].fillna(df['inter_time'].median())
-
-    df['same_value_count'] = df.groupby(['sender', 'value'])['value'].transform('count')
-
-    return df[[
-        'log_value', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
-        'is_large_global', 'sender_tx_count', 'receiver_tx_count',
-        'tx_pair_freq', 'inter_time', 'same_value_count'
-    ]]
-
-def detect_anomalies(df):
-    features = prepare_features(df)
-    features_scaled = pd.DataFrame(scaler.transform(features), columns=features.columns)
-    df['is_anomaly'] = model.predict(features_scaled)
-    df['is_anomaly'] = df['is_anomaly'].apply(lambda x: 1 if x == -1 else 0)
-    return df
+def detect_anomalies(df, return_version=False):
+    """
+    Kembalikan salinan `df` (urut sender, timestamp) dengan kolom is_anomaly 0/1.
+    `return_version` → (df, versi model yang dipakai).
+    """
+    features, order = build_feature_matrix_with_order(df)
+    predictions, version = predict('anomaly', features.to_numpy(dtype='float64'))
+    result = df.iloc[order].copy()
+    result['is_anomaly'] = (predictions == -1).astype('int64')
+    return (result, version) if return_version else result
 
 def fetch_and_analyze_wallet(wallet_address):
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # Ambil transaksi dari Etherscan
-    url = f"https://api.etherscan.io/api?module=account&action=txlist&address={wallet_address}&sort=asc&apikey={ETHERSCAN_API_KEY}"
-    response = requests.get(url).json()
-
-    if response.get("status") != "1" or "result" not in response:
+    # Ambil hanya transaksi setelah watermark blok terakhir dari Etherscan
+    start_block = get_sync_start_block(cur, wallet_address)
+    try:
+        transactions, max_block = fetch_txlist(wallet_address, start_block, ETHERSCAN_API_KEY)
+    except (EtherscanError, requests.RequestException, ValueError):
         cur.close()
         conn.close()
         return False, "Gagal mengambil data dari Etherscan."
 
-    transactions = response["result"]
-    inserted_tx = []
-
-    for tx in transactions:
-        tx_hash = tx["hash"]
-        sender = tx["from"]
-        receiver = tx["to"]
-        value = int(tx["value"]) / 1e18
-        timestamp = tx["timeStamp"]
-
-        cur.execute("""
-            INSERT INTO transactions (tx_hash, sender, receiver, value, timestamp)
-            VALUES (%s, %s, %s, %s, TO_TIMESTAMP(%s))
-            ON CONFLICT (tx_hash) DO NOTHING
-        """, (tx_hash, sender, receiver, value, timestamp))
-
-        inserted_tx.append({
-            "tx_hash": tx_hash,
-            "sender": sender,
-            "receiver": receiver,
-            "value": value,
-            "timestamp": pd.to_datetime(int(timestamp), unit='s')
-        })
+    rows = [parse_etherscan_tx(tx) for tx in transactions]
 
-    if inserted_tx:
-        df_new = pd.DataFrame(inserted_tx)
-        df_new = detect_anomalies(df_new)
+    # Flag anomaly transaksi baru dihitung dari fitur online (tanpa memuat ulang riwayat)
+    # dan ditulis di transaksi yang sama dengan ingest.
+    inserted = ingest_transactions(cur, rows)
+    score_new_transactions(cur, wallet_address, rows, inserted)
 
-        for _, row in df_new.iterrows():
-            cur.execute("""
-                UPDATE transactions SET is_anomaly = %s::boolean WHERE tx_hash = %s
-            """, (row['is_anomaly'], row['tx_hash']))
-
-    # Simpan wallet ke wallet_history
-    cur.execute("""
-        INSERT INTO wallet_history (address, queried_at)
-        VALUES (%s, NOW())
-        ON CONFLICT (address) DO UPDATE SET queried_at = NOW()
-    """, (wallet_address,))
+    # Simpan wallet ke wallet_history beserta watermark bloknya
+    record_sync_watermark(cur, wallet_address, max_block)
 
     conn.commit()
     cur.close()
     conn.close()
     return True, "Data transaksi berhasil diambil dan dianalisis."
 
-def calculate_risk_all_logic():
+def calculate_risk_all_logic(on_progress=None):
     conn = get_db_connection()
     cur = conn.cursor()
 
@@ -243,7 +137,9 @@ def calculate_risk_all_logic():
     wallets_to_process = list(all_wallets - wallets_with_risk)
 
     count = 0
-    for wallet_address in wallets_to_process:
+    for done, wallet_address in enumerate(wallets_to_process, start=1):
+        if on_progress:
+            on_progress(done - 1, len(wallets_to_process))
         transactions = fetch_transactions_from_db(wallet_address)
         if transactions:
             risk_profile, risk_score = calculate_wallet_risk(wallet_address)
@@ -259,71 +155,36 @@ def calculate_risk_all_logic():
     conn.close()
     return count
 
-def update_all_wallets_logic():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute("SELECT address FROM wallet_history")
-    wallets = cur.fetchall()
-
-    success_count = 0
-    fail_count = 0
-
-    for (wallet_address,) in wallets:
-        try:
-            url = f"https://api.etherscan.io/api?module=account&action=txlist&address={wallet_address}&sort=asc&apikey={ETHERSCAN_API_KEY}"
-            response = requests.get(url).json()
-
-            if response.get("status") != "1" or "result" not in response:
-                fail_count += 1
-                continue
-
-            transactions = response["result"]
-
-            for tx in transactions:
-                tx_hash = tx["hash"]
-                sender = tx["from"]
-                receiver = tx["to"]
-                value = int(tx["value"]) / 1e18
-                timestamp = tx["timeStamp"]
-
-                cur.execute("""
-                    INSERT INTO transactions (tx_hash, sender, receiver, value, timestamp)
-                    VALUES (%s, %s, %s, %s, TO_TIMESTAMP(%s))
-                    ON CONFLICT (tx_hash) DO NOTHING
-                """, (tx_hash, sender, receiver, value, timestamp))
-                
-            # klasifikasi dan blacklist
-            df_tx = fetch_transactions_df(wallet_address)
-            if not df_tx.empty:
-                features_df = extract_wallet_features(df_tx, wallet_address)
-                scaled = scaler_xgb.transform(features_df)
-                prediction = xgb_model.predict(scaled)[0]
-                if prediction == 1:
-                    cur.execute("""
-                        INSERT INTO blacklist_addresses (address, source, reason, added_on, category)
-                        VALUES (%s, %s, %s, NOW(), %s)
-                        ON CONFLICT (address) DO NOTHING
-                    """, (wallet_address, 'ML-XGBoost', 'Detected as suspicious wallet by ML model', 'suspicious'))
-
-            # update queried_at
-            cur.execute("""
-                UPDATE wallet_history
-                SET queried_at = NOW()
-                WHERE address = %s
-            """, (wallet_address,))
-            conn.commit()
-            success_count += 1
-            
-        except Exception as e:
-            print(f"Error saat update {wallet_address}: {e}")
-            fail_count += 1
-            conn.rollback()
-
-    cur.close()
-    conn.close()
-
-    return success_count, fail_count
+ML_BLACKLIST_SOURCE = 'ML-XGBoost'
+
+def save_ml_blacklist(cur, addresses, model_version):
+    """Masukkan wallet hasil klasifikasi ML ke blacklist; entri dari sumber lain tidak ditimpa."""
+    if not addresses:
+        return
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO blacklist_addresses (address, source, reason, added_on, category, model_version)
+        VALUES %s
+        ON CONFLICT (address) DO UPDATE SET model_version = EXCLUDED.model_version
+            WHERE blacklist_addresses.source = EXCLUDED.source
+    """, [(address, ML_BLACKLIST_SOURCE, 'Detected as suspicious wallet by ML model',
+           'suspicious', model_version) for address in addresses],
+        template="(%s, %s, %s, NOW(), %s, %s)")
+
+def _classify_wallet_xgb(conn, cur, wallet_address, inserted):
+    """Klasifikasi wallet dengan XGBoost dan masukkan ke blacklist jika mencurigakan."""
+    # Vektor fitur dari feature store: riwayat hanya dimuat ulang jika ada transaksi baru
+    vectors = get_wallet_feature_vectors(cur, [wallet_address])
+    present, features_df = feature_frame(vectors, [wallet_address])
+    if not present:
+        return
+    predictions, version = predict('classifier', features_df.to_numpy(dtype='float64'))
+    if predictions[0] == 1:
+        save_ml_blacklist(cur, [wallet_address], version)
+
+def update_all_wallets_logic(on_progress=None):
+    result = refresh_wallets(api_key=ETHERSCAN_API_KEY, after_ingest=_classify_wallet_xgb,
+                             on_progress=on_progress)
+    return result["success"], result["failed"]
 
 def sync_database_logic():
     if not is_neo4j_running():
@@ -332,46 +193,12 @@ def sync_database_logic():
     return True
 
 def get_wallet_kyc(wallet_address):
+    agg = get_wallet_aggregate(wallet_address)
+    first_tx = agg.first_transaction
+    last_tx = agg.last_transaction
+
     conn = get_db_connection()
     cur = conn.cursor()
-
-    # Total ETH yang diterima oleh wallet
-    cur.execute("""
-        SELECT COALESCE(SUM(value), 0) 
-        FROM transactions 
-        WHERE receiver = %s
-    """, (wallet_address,))
-    total_received = cur.fetchone()[0]
-
-    # Total ETH yang dikirim oleh wallet
-    cur.execute("""
-        SELECT COALESCE(SUM(value), 0) 
-        FROM transactions 
-        WHERE sender = %s
-    """, (wallet_address,))
-    total_sent = cur.fetchone()[0]
-
-    # Saldo = Total diterima - Total dikirim
-    balance = total_received - total_sent
-
-    # Transaksi pertama berdasarkan timestamp
-    cur.execute("""
-        SELECT sender, receiver, value, timestamp 
-        FROM transactions 
-        WHERE sender = %s OR receiver = %s
-        ORDER BY timestamp ASC LIMIT 1
-    """, (wallet_address, wallet_address))
-    first_tx = cur.fetchone()
-
-    # Transaksi terakhir berdasarkan timestamp
-    cur.execute("""
-        SELECT sender, receiver, value, timestamp 
-        FROM transactions 
-        WHERE sender = %s OR receiver = %s
-        ORDER BY timestamp DESC LIMIT 1
-    """, (wallet_address, wallet_address))
-    last_tx = cur.fetchone()
-
     cur.execute("""
         SELECT risk_score, risk_profile
         FROM wallet_risk
@@ -388,9 +215,9 @@ def get_wallet_kyc(wallet_address):
 
     # Build summary
     summary = {
-        "balance": balance,
-        "total_received": total_received,
-        "total_sent": total_sent,
+        "balance": agg.balance,
+        "total_received": agg.total_received,
+        "total_sent": agg.total_sent,
         "first_transaction": {
             "sender": first_tx[0],
             "receiver": first_tx[1],
@@ -404,9 +231,9 @@ def get_wallet_kyc(wallet_address):
             "timestamp": last_tx[3].isoformat()
         } if last_tx else None,
         
-        "top_transactions": get_top_transactions(wallet_address),
-        "top_receivers": get_top_receivers(wallet_address),
-        "top_senders": get_top_senders(wallet_address),
+        "top_transactions": agg.top_transactions,
+        "top_receivers": agg.top_receivers,
+        "top_senders": agg.top_senders,
         "blacklist_info": is_wallet_blacklisted(wallet_address),
         "risk_profile": {
             "risk_score": risk_score,
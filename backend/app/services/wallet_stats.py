@@ -0,0 +1,177 @@
+from ..database import get_db_connection
+
+# Setiap transaksi menjadi dua "edge": satu untuk sender (out) dan satu untuk receiver (in).
+_EDGES_SQL = """
+    edges AS (
+        SELECT sender AS address, receiver AS counterparty, 'out' AS direction,
+               tx_hash, value, timestamp
+        FROM src WHERE sender IS NOT NULL
+        UNION ALL
+        SELECT receiver, sender, 'in', tx_hash, value, timestamp
+        FROM src WHERE receiver IS NOT NULL
+    ),
+    delta AS (
+        SELECT address,
+               COUNT(*) FILTER (WHERE direction = 'in')                AS inbound_tx,
+               COUNT(*) FILTER (WHERE direction = 'out')               AS outbound_tx,
+               COALESCE(SUM(value) FILTER (WHERE direction = 'in'), 0)  AS inbound_value,
+               COALESCE(SUM(value) FILTER (WHERE direction = 'out'), 0) AS outbound_value,
+               MIN(timestamp)                                          AS first_tx_at,
+               (ARRAY_AGG(tx_hash ORDER BY timestamp ASC))[1]          AS first_tx_hash,
+               MAX(timestamp)                                          AS last_tx_at,
+               (ARRAY_AGG(tx_hash ORDER BY timestamp DESC))[1]         AS last_tx_hash
+        FROM edges
+        GROUP BY address
+    )
+"""
+
+_APPLY_SQL = """
+    WITH src AS (
+        SELECT tx_hash, sender, receiver, value, timestamp
+        FROM transactions
+        WHERE tx_hash = ANY(%s)
+    ),
+    """ + _EDGES_SQL + """,
+    new_cp AS (
+        INSERT INTO wallet_counterparties (address, direction, counterparty)
+        SELECT DISTINCT address, direction, counterparty
+        FROM edges WHERE counterparty IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING address, direction
+    ),
+    cp_delta AS (
+        SELECT address,
+               COUNT(*) FILTER (WHERE direction = 'in')  AS new_senders,
+               COUNT(*) FILTER (WHERE direction = 'out') AS new_receivers
+        FROM new_cp
+        GROUP BY address
+    )
+    INSERT INTO wallet_stats (
+        address, inbound_tx, outbound_tx, inbound_value, outbound_value,
+        unique_senders, unique_receivers,
+        first_tx_at, first_tx_hash, last_tx_at, last_tx_hash, updated_at
+    )
+    SELECT d.address, d.inbound_tx, d.outbound_tx, d.inbound_value, d.outbound_value,
+           COALESCE(c.new_senders, 0), COALESCE(c.new_receivers, 0),
+           d.first_tx_at, d.first_tx_hash, d.last_tx_at, d.last_tx_hash, NOW()
+    FROM delta d
+    LEFT JOIN cp_delta c USING (address)
+    ON CONFLICT (address) DO UPDATE SET
+        inbound_tx       = wallet_stats.inbound_tx + EXCLUDED.inbound_tx,
+        outbound_tx      = wallet_stats.outbound_tx + EXCLUDED.outbound_tx,
+        inbound_value    = wallet_stats.inbound_value + EXCLUDED.inbound_value,
+        outbound_value   = wallet_stats.outbound_value + EXCLUDED.outbound_value,
+        unique_senders   = wallet_stats.unique_senders + EXCLUDED.unique_senders,
+        unique_receivers = wallet_stats.unique_receivers + EXCLUDED.unique_receivers,
+        first_tx_hash    = CASE WHEN wallet_stats.first_tx_at IS NULL
+                                  OR EXCLUDED.first_tx_at < wallet_stats.first_tx_at
+                                THEN EXCLUDED.first_tx_hash ELSE wallet_stats.first_tx_hash END,
+        first_tx_at      = LEAST(wallet_stats.first_tx_at, EXCLUDED.first_tx_at),
+        last_tx_hash     = CASE WHEN wallet_stats.last_tx_at IS NULL
+                                  OR EXCLUDED.last_tx_at > wallet_stats.last_tx_at
+                                THEN EXCLUDED.last_tx_hash ELSE wallet_stats.last_tx_hash END,
+        last_tx_at       = GREATEST(wallet_stats.last_tx_at, EXCLUDED.last_tx_at),
+        updated_at       = NOW()
+"""
+
+_REBUILD_SQL = """
+    WITH src AS (
+        SELECT tx_hash, sender, receiver, value, timestamp FROM transactions
+    ),
+    """ + _EDGES_SQL + """,
+    cp AS (
+        SELECT address,
+               COUNT(DISTINCT counterparty) FILTER (WHERE direction = 'in')  AS unique_senders,
+               COUNT(DISTINCT counterparty) FILTER (WHERE direction = 'out') AS unique_receivers
+        FROM edges
+        GROUP BY address
+    )
+    INSERT INTO wallet_stats (
+        address, inbound_tx, outbound_tx, inbound_value, outbound_value,
+        unique_senders, unique_receivers,
+        first_tx_at, first_tx_hash, last_tx_at, last_tx_hash, updated_at
+    )
+    SELECT d.address, d.inbound_tx, d.outbound_tx, d.inbound_value, d.outbound_value,
+           cp.unique_senders, cp.unique_receivers,
+           d.first_tx_at, d.first_tx_hash, d.last_tx_at, d.last_tx_hash, NOW()
+    FROM delta d
+    JOIN cp USING (address)
+"""
+
+
+_STATS_SQL = """
+    SELECT s.inbound_tx, s.outbound_tx, s.inbound_value, s.outbound_value,
+           s.unique_senders, s.unique_receivers,
+           f.sender, f.receiver, f.value, f.timestamp,
+           l.sender, l.receiver, l.value, l.timestamp
+    FROM wallet_stats s
+    LEFT JOIN transactions f ON f.tx_hash = s.first_tx_hash
+    LEFT JOIN transactions l ON l.tx_hash = s.last_tx_hash
+    WHERE s.address = %s
+"""
+
+
+def apply_new_transactions(cur, tx_hashes):
+    """
+    Tambahkan kontribusi transaksi yang BARU di-insert ke wallet_stats.
+    Harus dipanggil di transaksi database yang sama dengan INSERT-nya,
+    dan hanya dengan tx_hash yang benar-benar ter-insert (bukan yang kena ON CONFLICT).
+    """
+    if not tx_hashes:
+        return
+    cur.execute(_APPLY_SQL, (list(tx_hashes),))
+
+
+def rebuild_wallet_stats():
+    """Hitung ulang wallet_stats dan wallet_counterparties dari seluruh tabel transactions."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    # Ingest yang berjalan bersamaan akan menunggu sampai rebuild selesai,
+    # lalu menambahkan delta-nya di atas hasil rebuild.
+    cur.execute("LOCK TABLE wallet_counterparties, wallet_stats IN EXCLUSIVE MODE")
+    cur.execute("TRUNCATE wallet_counterparties, wallet_stats")
+    cur.execute("""
+        INSERT INTO wallet_counterparties (address, direction, counterparty)
+        SELECT sender, 'out', receiver FROM transactions
+        WHERE sender IS NOT NULL AND receiver IS NOT NULL
+        UNION
+        SELECT receiver, 'in', sender FROM transactions
+        WHERE sender IS NOT NULL AND receiver IS NOT NULL
+    """)
+    cur.execute(_REBUILD_SQL)
+    count = cur.rowcount
+    conn.commit()
+    cur.close()
+    conn.close()
+    return count
+
+
+def get_wallet_stats(wallet_address, conn=None):
+    """
+    Ambil baris wallet_stats beserta transaksi pertama/terakhir (lookup primary key).
+    Mengembalikan None jika wallet belum punya statistik.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(_STATS_SQL, (wallet_address,))
+    row = cur.fetchone()
+    cur.close()
+    if own_conn:
+        conn.close()
+
+    if row is None:
+        return None
+    first_tx = tuple(row[6:10]) if row[9] is not None else None
+    last_tx = tuple(row[10:14]) if row[13] is not None else None
+    return {
+        "inbound_tx": row[0],
+        "outbound_tx": row[1],
+        "inbound_value": row[2],
+        "outbound_value": row[3],
+        "unique_senders": row[4],
+        "unique_receivers": row[5],
+        "first_transaction": first_tx,
+        "last_transaction": last_tx
+    }
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.devtools.bench_features import check_parity, synthetic_transactions
+from app.services.chunked_features import QuantileSketch
+from app.services.features import FEATURE_COLUMNS, build_feature_matrix
+
+COLUMNS = ['tx_hash', 'sender', 'receiver', 'value', 'timestamp']
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def test_parity_synthetic():
+    check_parity(synthetic_transactions(2000))
+
+
+def test_parity_empty():
+    df = _frame([])
+    check_parity(df)
+    features = build_feature_matrix(df)
+    assert list(features.columns) == FEATURE_COLUMNS
+    assert features.empty
+
+
+def test_parity_single_row():
+    df = _frame([['h1', '0xa', '0xb', 1.5, pd.Timestamp('2023-01-01 10:00')]])
+    check_parity(df)
+    # Tanpa transaksi sebelumnya inter_time tetap NaN; fill_missing tidak punya median
+    assert np.isnan(build_feature_matrix(df)['inter_time'].iloc[0])
+
+
+def test_parity_decimal_values():
+    df = _frame([
+        ['h1', '0xa', '0xb', Decimal('1.5'), pd.Timestamp('2023-01-01 10:00')],
+        ['h2', '0xa', '0xc', Decimal('30000.123456'), pd.Timestamp('2023-01-02 11:00')],
+        ['h3', '0xb', '0xa', Decimal('0'), pd.Timestamp('2023-01-03 12:00')],
+    ])
+    check_parity(df)
+    assert build_feature_matrix(df)['log_value'].dtype == np.float64
+
+
+@pytest.mark.parametrize('column', ['sender', 'receiver', 'value'])
+def test_parity_none_values(column):
+    df = _frame([
+        ['h1', '0xa', '0xb', 1.5, pd.Timestamp('2023-01-01 10:00')],
+        ['h2', '0xa', '0xc', 2.0, pd.Timestamp('2023-01-02 10:00')],
+        ['h3', '0xb', '0xc', 2.0, pd.Timestamp('2023-01-03 10:00')],
+    ])
+    df.loc[1, column] = None
+    check_parity(df)
+
+
+def test_input_not_mutated():
+    df = synthetic_transactions(100)
+    before = df.copy()
+    build_feature_matrix(df, fill_missing=True)
+    pd.testing.assert_frame_equal(df, before)
+
+
+def _sketch_large(values):
+    sketch = QuantileSketch()
+    sketch.add(values)
+    return sketch.above_quantile(values, 0.95).astype('int64')
+
+
+def test_sketch_large_ties_at_cut():
+    # Kuantil 95% jatuh tepat di 2.0: semua transfer bernilai 2.0 tidak termasuk besar
+    values = np.random.default_rng(0).permutation(
+        np.repeat([0.1, 0.5, 1.0, 2.0, 10.0], [300, 300, 200, 160, 40]))
+    df = _frame([[f'h{i}', '0xa', '0xb', v, pd.Timestamp('2023-01-01') + pd.Timedelta(minutes=i)]
+                 for i, v in enumerate(values)])
+    expected = build_feature_matrix(df)['is_large_global'].sort_index().to_numpy()
+    assert expected.sum() == 40
+    np.testing.assert_array_equal(_sketch_large(values), expected)
+
+
+def test_sketch_large_round_amounts():
+    values = np.random.default_rng(1).choice([0.1, 0.5, 1.0, 2.0, 10.0], size=3000,
+                                              p=[0.3, 0.3, 0.2, 0.161, 0.039])
+    expected = (pd.Series(values) > pd.Series(values).quantile(0.95)).astype('int64').to_numpy()
+    np.testing.assert_array_equal(_sketch_large(values), expected)